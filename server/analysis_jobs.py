@@ -0,0 +1,156 @@
+"""
+Background video analysis jobs
+Runs long analyses on a bounded worker pool so they don't hold a Flask
+worker, and tracks progress, running statistics and partial results
+that clients can poll or stream while the job runs.
+"""
+
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation was requested"""
+
+
+class AnalysisJob:
+    """State of one analysis job, updated by the worker and read by requests"""
+
+    def __init__(self, total_frames, options=None):
+        self.id = uuid.uuid4().hex
+        self.status = 'queued'  # queued | running | completed | cancelled | failed
+        self.total_frames = total_frames
+        self.options = options or {}
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.frames_done = 0
+        self.samples = []  # {'frame_number', 'count'} in the order they were analyzed
+        self.result = None
+        self.error = None
+        self._cancel = Event()
+        self._lock = Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def add_samples(self, frame_numbers, counts, frames_done):
+        """Record analyzed frames and how far into the video the job is"""
+        with self._lock:
+            for frame_number, count in zip(frame_numbers, counts):
+                self.samples.append({'frame_number': int(frame_number), 'count': int(count)})
+            self.frames_done = max(self.frames_done, frames_done)
+
+    def results_since(self, cursor=0):
+        """Samples added after cursor, plus the cursor to use next time"""
+        with self._lock:
+            return self.samples[cursor:], len(self.samples)
+
+    def progress(self):
+        """Frames done, ETA and running statistics"""
+        with self._lock:
+            counts = [s['count'] for s in self.samples]
+            frames_done = self.frames_done
+        now = self.finished or time.time()
+        elapsed = now - self.started if self.started else 0.0
+
+        eta = None
+        if self.status == 'running' and frames_done > 0 and self.total_frames > 0:
+            rate = frames_done / elapsed if elapsed > 0 else 0
+            eta = (self.total_frames - frames_done) / rate if rate > 0 else None
+
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'frames_done': frames_done,
+            'total_frames': self.total_frames,
+            'percent': frames_done / self.total_frames * 100 if self.total_frames > 0 else 0.0,
+            'elapsed': elapsed,
+            'eta': eta,
+            'sampled_frames': len(counts),
+            'average_count': sum(counts) / len(counts) if counts else 0.0,
+            'max_count': max(counts) if counts else 0,
+            'min_count': min(counts) if counts else 0,
+            'error': self.error
+        }
+
+
+class JobManager:
+    """Runs AnalysisJobs on a bounded thread pool"""
+
+    def __init__(self, max_workers=2, max_finished_jobs=50):
+        """
+        Args:
+            max_workers: Jobs allowed to run at the same time (others queue)
+            max_finished_jobs: Finished jobs kept for result retrieval
+        """
+        self.max_workers = max_workers
+        self.max_finished_jobs = max_finished_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis')
+        self._jobs = {}
+        self._lock = Lock()
+
+    def submit(self, fn, total_frames, options=None):
+        """
+        Queue fn(job) to run in the pool
+
+        fn should call job.add_samples() as it goes, job.check_cancelled()
+        between units of work, and return the final result dict.
+        """
+        job = AnalysisJob(total_frames, options)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        if job.cancelled:
+            job.status = 'cancelled'
+            job.finished = time.time()
+            return
+        job.status = 'running'
+        job.started = time.time()
+        try:
+            job.result = fn(job)
+            job.status = 'completed'
+        except JobCancelled:
+            job.status = 'cancelled'
+        except Exception as e:
+            print(f"Error in analysis job {job.id}: {str(e)}")
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished = time.time()
+
+    def _prune(self):
+        """Forget the oldest finished jobs past max_finished_jobs (lock held)"""
+        finished = [j for j in self._jobs.values() if j.finished is not None]
+        finished.sort(key=lambda j: j.finished)
+        for job in finished[:max(len(finished) - self.max_finished_jobs, 0)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def list(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.progress() for job in jobs]
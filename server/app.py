@@ -3,19 +3,47 @@ from flask_cors import CORS
 import os
 from dotenv import load_dotenv
 from huggingface_hub import InferenceClient
-import cv2
-import numpy as np
-from ultralytics import YOLO
+import atexit
 import base64
+import contextlib
+import functools
 import json
-from threading import Thread, Lock
+import multiprocessing
+import struct
+import uuid
+from collections import deque
+from threading import Thread, Lock, Condition
 import time
+from flask_sock import Sock
+from simple_websocket import ConnectionClosed
+from analysis_jobs import JobManager
+from inference_scheduler import InferenceTimeout, SchedulerOverloaded
+from model_backends import BACKENDS, QUANTIZATION_MODES
+from resolution_controller import ResolutionController, parse_levels
+from lazy_imports import lazy_import, loaded_modules
+
+# Vision stack, imported on first use so chat-only workers never load it
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+video_decoder = lazy_import('video_decoder')
+keyframe_index = lazy_import('seek_index')
+detection_cache_store = lazy_import('detection_cache')
+parallel_analysis = lazy_import('parallel_analysis')
+detection_utils = lazy_import('detection_utils')
+frame_encoding = lazy_import('frame_encoding')
+annotation = lazy_import('annotation')
+tracking = lazy_import('tracking')
+motion_gate_module = lazy_import('motion_gate')
+tiling = lazy_import('tiling')
+model_registry = lazy_import('model_registry')
+inference_workers = lazy_import('inference_workers')
 
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
+sock = Sock(app)  # WebSocket routes
 
 # Hugging Face API configuration
 HUGGINGFACE_API_KEY = os.getenv('HUGGINGFACE_API_KEY')
@@ -24,13 +52,42 @@ HUGGINGFACE_API_KEY = os.getenv('HUGGINGFACE_API_KEY')
 client = InferenceClient(token=HUGGINGFACE_API_KEY) if HUGGINGFACE_API_KEY else None
 
 # YOLOv8 Configuration
+YOLO_MODEL_NAME = 'yolov8n.pt'  # Using nano model for faster processing
+# Weights that requests and streams may select with "model" (kept resident side by side)
+ALLOWED_MODELS = tuple(dict.fromkeys(
+    [YOLO_MODEL_NAME] + [m.strip() for m in os.getenv('YOLO_MODELS', 'yolov8s.pt,yolov8m.pt').split(',') if m.strip()]
+))
+# Least recently used models beyond this estimate are unloaded (the default model never is)
+MODEL_MEMORY_BUDGET_MB = float(os.getenv('YOLO_MODEL_BUDGET_MB', '1024'))
+# Frames allowed to wait per model before requests get 503, and how long a request waits
+INFERENCE_MAX_QUEUE = int(os.getenv('INFERENCE_MAX_QUEUE', '32'))
+INFERENCE_TIMEOUT = float(os.getenv('INFERENCE_TIMEOUT', '10'))
+# Most processes a parallel analysis may start, each loading its own model
+ANALYSIS_MAX_WORKERS = int(os.getenv('ANALYSIS_MAX_WORKERS', str(os.cpu_count() or 1)))
+# Run the default model in this many worker processes fed through shared memory (0 = in-process)
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', '0'))
 yolo_model = None
+inference_scheduler = None  # Owns yolo_model and batches frames across requests
+default_model = None  # Registry id of yolo_model, e.g. 'yolov8n.pt:torch'
+worker_pool = None  # InferenceWorkerPool for the default model when INFERENCE_WORKERS > 0
+# Swapping worker_pool and taking a lease on it happen under this lock
+worker_pool_lock = Lock()
+# One model (re)load at a time, so concurrent initialize calls can't both build a pool
+model_init_lock = Lock()
 video_path = None
 video_cap = None
 detection_config = {
     'conf_threshold': 0.5,
     'iou_threshold': 0.45,
-    'use_gpu': True
+    'use_gpu': True,
+    'tiled': False,  # Also detect on overlapping full-resolution tiles
+    'tile_size': 640,
+    'tile_overlap': 0.2,
+    'tile_crowd_threshold': 0,  # Only tile where the full frame has this many people (0 = everywhere)
+    'target_latency_ms': None,  # Step model input size to meet this per-frame latency (None = fixed)
+    'imgsz_levels': [320, 416, 512, 640],
+    'backend': os.getenv('YOLO_BACKEND', 'torch'),  # 'torch', 'onnx' or 'openvino'
+    'quantize': os.getenv('YOLO_QUANTIZE') or None  # 'int8' serves a calibrated INT8 ONNX model
 }
 detection_results = {
     'frame': None,
@@ -41,14 +98,180 @@ detection_results = {
     'fps': 0
 }
 results_lock = Lock()
-fps_tracker = []
+
+class FpsTracker:
+    """Rolling FPS over the last frame times, shared by all request threads"""
+    
+    def __init__(self, window=30):
+        self._times = deque(maxlen=window)
+        self._lock = Lock()
+    
+    def record(self, elapsed):
+        """Add one frame's processing time and return the current FPS"""
+        with self._lock:
+            self._times.append(elapsed)
+            avg_time = sum(self._times) / len(self._times)
+        return 1.0 / avg_time if avg_time > 0 else 0
+
+fps_tracker = FpsTracker()
+# Latest detections per MJPEG stream, read by the detections side channel
+stream_states = {}
+# Side channel comment interval, and how long it waits for a stream that sends nothing
+STREAM_KEEPALIVE = 15.0
+STREAM_IDLE_TIMEOUT = 60.0
+
+class DetectionSubsystem:
+    """
+    Vision-side state, created on first use
+    
+    Chat-only workers never touch it, so they never import cv2, numpy or
+    torch. Accessing any component (vision.decoder_pool, ...) starts the
+    subsystem; warmup() also loads the model and runs one inference so the
+    first detection request doesn't pay for it.
+    """
+    COMPONENTS = ('decoder_pool', 'read_ahead', 'encoder_sessions', 'renderer', 'frame_gates', 'models')
+    
+    def __init__(self):
+        self._lock = Lock()
+        self.started = False
+        self.warm = False
+        self.startup_time = None
+        self.warmup_time = None
+    
+    def __getattr__(self, name):
+        # Only called for attributes not set yet, i.e. components before start()
+        if name not in DetectionSubsystem.COMPONENTS:
+            raise AttributeError(name)
+        self.start()
+        return self.__dict__[name]
+    
+    def start(self):
+        """Import the vision stack and create the shared components"""
+        with self._lock:
+            if self.started:
+                return
+            start_time = time.time()
+            # Long-lived decoder handles shared by frame-by-frame endpoints
+            self.decoder_pool = video_decoder.DecoderPool(idle_timeout=60.0)
+            # Decodes upcoming frames while LiveView polls with a fixed stride
+            self.read_ahead = video_decoder.ReadAheadBuffer(self.decoder_pool, depth=8, max_bytes=256 * 1024 * 1024)
+            # Output encoders per client session, so auto mode adapts across polls
+            self.encoder_sessions = frame_encoding.EncoderSessions()
+            # Draws boxes and the CCTV overlay into reused per-thread buffers
+            self.renderer = annotation.AnnotationRenderer()
+            # Skips inference on static process-frame polls, one gate per client session
+            self.frame_gates = motion_gate_module.GateSessions()
+            # Resident models selectable per request, evicted LRU over the memory budget
+            self.models = model_registry.ModelRegistry(
+                ALLOWED_MODELS,
+                memory_budget_mb=MODEL_MEMORY_BUDGET_MB,
+                default_backend=detection_config['backend'],
+                max_queue=INFERENCE_MAX_QUEUE,
+                timeout=INFERENCE_TIMEOUT
+            )
+            self.startup_time = time.time() - start_time
+            self.started = True
+            print(f"✓ Detection subsystem started ({self.startup_time:.2f}s)")
+    
+    def gate(self, session_id, model=None):
+        """Process-frame motion gate for a client session, model and the current video"""
+        return self.frame_gates.get(
+            (session_id, model, video_path),
+            functools.partial(detect_people, model=model)
+        )
+    
+    def reset_gates(self):
+        """Forget detections reused by the motion gates (thresholds or video changed)"""
+        self.frame_gates.reset()
+    
+    def warmup(self):
+        """Start the subsystem and load the default model (the registry warms it up)"""
+        self.start()
+        start_time = time.time()
+        if yolo_model is None and not initialize_yolo():
+            return False
+        self.warmup_time = time.time() - start_time
+        self.warm = True
+        print(f"✓ Detection warmed up ({self.warmup_time:.2f}s)")
+        return True
+    
+    def stats(self):
+        return {
+            'started': self.started,
+            'warm': self.warm,
+            'model_loaded': yolo_model is not None,
+            'default_model': default_model,
+            'startup_time': self.startup_time,
+            'warmup_time': self.warmup_time,
+            'loaded_modules': loaded_modules()
+        }
+
+vision = DetectionSubsystem()
+# Precomputed detections for the active video and thresholds (None if not indexed)
+detection_cache = None
+# Background analyze-video jobs (bounded so analyses can't exhaust CPU)
+job_manager = JobManager(max_workers=2)
+# Running index-video job per video path, so repeated requests join it
+index_jobs = {}
+index_jobs_lock = Lock()
+# Picks the model input size that meets the latency target
+resolution_controller = ResolutionController(detection_config['imgsz_levels'])
+
+def request_encoder(options):
+    """
+    Frame encoder for a request's encoding options (JSON body or query args)
+    
+    Requests that pass a session_id share one encoder, so its auto mode
+    keeps adapting quality and size across polling requests.
+    """
+    accept = request.headers.get('Accept', '')
+    session_id = options.get('session_id')
+    if session_id:
+        return vision.encoder_sessions.get(session_id, options, accept)
+    return frame_encoding.FrameEncoder.from_options(options, accept)
 
 def initialize_yolo():
     """Initialize YOLOv8 model with GPU support"""
-    global yolo_model
+    with model_init_lock:
+        return _initialize_yolo()
+
+def _initialize_yolo():
+    global yolo_model, inference_scheduler, default_model, worker_pool
     try:
-        print("Loading YOLOv8 model...")
-        yolo_model = YOLO('yolov8n.pt')  # Using nano model for faster processing
+        model_id = vision.models.resolve(
+            f"{YOLO_MODEL_NAME}:{detection_config['backend']}:{detection_config['quantize'] or ''}")
+        print(f"Loading YOLOv8 model ({model_id})...")
+        # Ids without a backend in requests follow the server's backend
+        vision.models.default_backend = detection_config['backend']
+        entry = vision.models.get(model_id)
+        # The default model stays resident; a replaced default becomes evictable
+        vision.models.pin(model_id)
+        if default_model and default_model != model_id:
+            vision.models.unpin(default_model)
+        model_changed = default_model != model_id
+        default_model = model_id
+        yolo_model, inference_scheduler = entry.model, entry.scheduler
+        if model_changed:
+            # Cached detections are keyed by the model id
+            refresh_detection_cache()
+        
+        # Worker processes load the export the registry just cached
+        if INFERENCE_WORKERS > 0 and (worker_pool is None or model_changed):
+            weights, backend, quantize = model_registry.parse_model_id(model_id)
+            pool = inference_workers.InferenceWorkerPool(
+                weights,
+                workers=INFERENCE_WORKERS,
+                backend=backend,
+                quantize=quantize,
+                device='cpu',  # Workers spread CPU inference over cores; a GPU is better used in-process
+                slots_per_worker=max(2, INFERENCE_MAX_QUEUE // INFERENCE_WORKERS),
+                timeout=INFERENCE_TIMEOUT
+            )
+            with worker_pool_lock:
+                old_pool, worker_pool = worker_pool, pool
+            if old_pool is not None:
+                # Requests still using the old pool finish their frames before it closes
+                old_pool.retire()
         
         # Set device (GPU if available)
         if detection_config['use_gpu'] and cv2.cuda.getCudaEnabledDeviceCount() > 0:
@@ -62,75 +285,169 @@ def initialize_yolo():
         print(f"Error loading YOLOv8 model: {str(e)}")
         return False
 
-def draw_detections_on_frame(frame, detections):
-    """Draw bounding boxes and labels on frame"""
-    annotated = frame.copy()
+@contextlib.contextmanager
+def leased_worker_pool():
+    """The current worker pool (or None), kept open until the block exits"""
+    with worker_pool_lock:
+        pool = worker_pool
+        if pool is not None:
+            pool.acquire()
+    try:
+        yield pool
+    finally:
+        if pool is not None:
+            pool.release()
+
+def close_worker_pool():
+    """Stop the worker processes and unlink their shared memory (at exit)"""
+    global worker_pool
+    with worker_pool_lock:
+        pool, worker_pool = worker_pool, None
+    if pool is not None:
+        pool.close()
+
+atexit.register(close_worker_pool)
+
+def refresh_detection_cache():
+    """Open the precomputed detection cache matching the current video and config"""
+    global detection_cache
+    # Caches hold untiled detections of the default model
+    if not video_path or not os.path.exists(video_path) or detection_config['tiled'] or default_model is None:
+        detection_cache = None
+        return None
+    detection_cache = detection_cache_store.DetectionCache.open(
+        video_path,
+        default_model,
+        detection_config['conf_threshold'],
+        detection_config['iou_threshold']
+    )
+    return detection_cache
+
+def cached_boxes(frame_number):
+    """(boxes, confs) for frame_number from the detection cache, or None on a miss"""
+    cache = detection_cache
+    if cache is None:
+        return None
+    return cache.lookup(frame_number)
+
+def request_model(options):
+    """
+    Model selected by a request's "model" option (JSON body or query args)
     
-    for det in detections:
-        x1 = int(det['x'] * frame.shape[1] / 100)
-        y1 = int(det['y'] * frame.shape[0] / 100)
-        x2 = int((det['x'] + det['width']) * frame.shape[1] / 100)
-        y2 = int((det['y'] + det['height']) * frame.shape[0] / 100)
-        confidence = det['confidence']
-        
-        # Draw bounding box
-        color = (0, 255, 0)  # Green
-        cv2.rectangle(annotated, (x1, y1), (x2, y2), color, 2)
-        
-        # Draw label with confidence
-        label = f"Person {confidence:.2f}"
-        label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-        label_y = max(y1, label_size[1] + 10)
-        
-        # Label background
-        cv2.rectangle(annotated, (x1, label_y - label_size[1] - 10),
-                     (x1 + label_size[0], label_y + 5), color, -1)
-        
-        # Label text
-        cv2.putText(annotated, label, (x1, label_y - 5),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+    Returns:
+        Registry id, or None for the default model
+    
+    Raises:
+        ValueError: Unknown or disallowed model
+    """
+    model_id = options.get('model')
+    if not model_id:
+        return None
+    model_id = vision.models.resolve(model_id)
+    return None if model_id == default_model else model_id
+
+def infer_frames(frames, model=None, block=False):
+    """
+    One scheduler round trip for several frames, returning per-frame (boxes, confs)
+    
+    block=True waits for queue space (background analysis) instead of
+    raising SchedulerOverloaded like interactive requests do.
+    """
+    with leased_worker_pool() as pool:
+        if model is None and pool is not None and all(pool.fits(frame) for frame in frames):
+            # Worker processes return (boxes, confs) directly
+            return pool.infer_many(
+                frames,
+                detection_config['conf_threshold'],
+                detection_config['iou_threshold'],
+                imgsz=resolution_controller.imgsz,
+                block=block
+            )
+    # The lease keeps the scheduler open if the model is evicted meanwhile
+    with vision.models.lease(model or default_model) as entry:
+        results = entry.scheduler.infer_many(
+            frames,
+            detection_config['conf_threshold'],
+            detection_config['iou_threshold'],
+            imgsz=resolution_controller.imgsz,
+            block=block
+        )
+    return [detection_utils.extract_boxes([result]) for result in results]
+
+# Tiled detection for crowded high-resolution footage (None unless enabled in config)
+tiled_detector = None
+
+def configure_tiling():
+    """Rebuild the tiled detector from detection_config"""
+    global tiled_detector
+    if not detection_config['tiled']:
+        tiled_detector = None
+        return
+    tiled_detector = tiling.TiledDetector(
+        infer_frames,
+        tile_size=int(detection_config['tile_size']),
+        overlap=float(detection_config['tile_overlap']),
+        crowd_threshold=int(detection_config['tile_crowd_threshold'])
+    )
+
+def detect_people(frame, model=None, block=False):
+    """
+    Detect people in one frame through the model's batching scheduler (None = default model)
     
-    return annotated
+    block=True waits for queue space instead of raising SchedulerOverloaded.
+    """
+    start_time = time.time()
+    tiler = tiled_detector
+    if tiler is not None:
+        # Full frame and tiles go to the scheduler together
+        detections = tiler.detect(frame, functools.partial(infer_frames, model=model, block=block))
+    else:
+        detections = infer_frames([frame], model, block)[0]
+    # Latency includes queueing, which is what grows under load. Only the
+    # default model drives the controller; other models have other costs
+    if model is None:
+        resolution_controller.record(time.time() - start_time)
+    return detections
+
+def parse_motion_gate(options):
+    """Per-stream MotionGate from request options, or None if motion_gate is off"""
+    if str(options.get('motion_gate', '')).lower() not in ('1', 'true'):
+        return None
+    return motion_gate_module.MotionGate(
+        threshold=float(options.get('motion_threshold', 0.01)),
+        refresh_interval=int(options.get('motion_refresh', 30))
+    )
+
+def overloaded_response(error):
+    """503 for requests shed because the inference queue is full or too slow"""
+    return jsonify({'error': str(error), 'overloaded': True}), 503, {'Retry-After': '1'}
+
+def detect_people_batch(frames, batch_size=8, model=None, block=False):
+    """Run YOLOv8 on frames in batches of batch_size and return per-frame (boxes, confs)"""
+    if tiled_detector is not None:
+        # Each frame's tiles already fill a batch
+        return [detect_people(frame, model, block) for frame in frames]
+    
+    all_detections = []
+    
+    for i in range(0, len(frames), batch_size):
+        all_detections.extend(infer_frames(frames[i:i + batch_size], model, block))
+    
+    return all_detections
+
+def draw_detections_on_frame(frame, boxes, confs, track_ids=None):
+    """Draw bounding boxes and labels into the renderer's output buffer"""
+    return vision.renderer.draw_detections(
+        frame,
+        boxes.astype(int).tolist(),
+        confs.tolist(),
+        track_ids.tolist() if track_ids is not None else None
+    )
 
 def draw_cctv_overlay(frame, people_count, fps):
     """Draw CCTV-style overlay with timestamp, count, and FPS"""
-    overlay = frame.copy()
-    h, w = frame.shape[:2]
-    
-    # Semi-transparent black bar at top
-    cv2.rectangle(overlay, (0, 0), (w, 80), (0, 0, 0), -1)
-    frame = cv2.addWeighted(frame, 0.7, overlay, 0.3, 0)
-    
-    # Current timestamp
-    from datetime import datetime
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    font = cv2.FONT_HERSHEY_SIMPLEX
-    
-    # Timestamp (left)
-    cv2.putText(frame, f"CCTV - {timestamp}", (10, 30), 
-               font, 0.6, (255, 255, 255), 2)
-    
-    # People count (center)
-    count_text = f"PEOPLE: {people_count}"
-    count_size = cv2.getTextSize(count_text, font, 0.8, 2)[0]
-    count_x = (w - count_size[0]) // 2
-    cv2.putText(frame, count_text, (count_x, 30), 
-               font, 0.8, (0, 255, 0), 2)
-    
-    # FPS (right)
-    fps_text = f"FPS: {fps:.1f}"
-    fps_size = cv2.getTextSize(fps_text, font, 0.6, 2)[0]
-    fps_x = w - fps_size[0] - 10
-    cv2.putText(frame, fps_text, (fps_x, 30), 
-               font, 0.6, (0, 255, 255), 2)
-    
-    # Config info
     config_info = f"Conf: {detection_config['conf_threshold']} | IoU: {detection_config['iou_threshold']}"
-    cv2.putText(frame, config_info, (10, 60), 
-               font, 0.4, (200, 200, 200), 1)
-    
-    return frame
+    return vision.renderer.draw_overlay(frame, people_count, fps, config_info)
 
 # In-memory storage (in production, use a database)
 user_profiles = {}
@@ -145,7 +462,8 @@ def health_check():
         'status': 'healthy',
         'message': 'Travel AI API is running',
         'huggingface_api_key': api_key_status,
-        'api_key_preview': api_key_preview
+        'api_key_preview': api_key_preview,
+        'detection': vision.stats()
     })
 
 @app.route('/api/chat', methods=['POST'])
@@ -302,6 +620,43 @@ def get_locations():
 
 # ========== YOLOv8 Crowd Detection Endpoints ==========
 
+@app.route('/api/yolo/warmup', methods=['POST'])
+def warmup_detection():
+    """Import the vision stack and load the model ahead of the first detection request"""
+    try:
+        if not vision.warmup():
+            return jsonify({'error': 'Failed to load YOLOv8 model'}), 500
+        return jsonify({'message': 'Detection ready', 'detection': vision.stats()})
+    except Exception as e:
+        print(f"Error in warmup_detection: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/yolo/models', methods=['GET', 'POST', 'DELETE'])
+def detection_models():
+    """List resident models, preload one (POST {"model": id}) or unload one (DELETE ?model=id)"""
+    try:
+        if request.method == 'POST':
+            model_id = (request.json or {}).get('model')
+            if not model_id:
+                return jsonify({'error': 'model is required'}), 400
+            entry = vision.models.get(model_id)
+            return jsonify({'message': f'Model {entry.model_id} ready', 'model': entry.info()})
+        
+        if request.method == 'DELETE':
+            model_id = request.args.get('model')
+            if not model_id:
+                return jsonify({'error': 'model is required'}), 400
+            if not vision.models.evict(model_id):
+                return jsonify({'error': f'Model {model_id} is not resident or is the default model'}), 409
+            return jsonify({'message': f'Model {model_id} unloaded'})
+        
+        return jsonify(dict(vision.models.stats(), default_model=default_model))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error in detection_models: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/yolo/initialize', methods=['POST'])
 def initialize_detection():
     """Initialize YOLOv8 model and set video path with custom config"""
@@ -317,6 +672,18 @@ def initialize_detection():
             detection_config['iou_threshold'] = float(data['iou_threshold'])
         if 'use_gpu' in data:
             detection_config['use_gpu'] = bool(data['use_gpu'])
+        if data.get('backend') and data['backend'] != detection_config['backend']:
+            if data['backend'] not in BACKENDS:
+                return jsonify({'error': f"Unknown backend: {data['backend']}"}), 400
+            # Reload below on the requested backend
+            detection_config['backend'] = data['backend']
+            yolo_model = None
+        if 'quantize' in data and (data['quantize'] or None) != detection_config['quantize']:
+            if (data['quantize'] or None) not in QUANTIZATION_MODES:
+                return jsonify({'error': f"Unknown quantization: {data['quantize']}"}), 400
+            # Reload below; the INT8 model is calibrated once and cached
+            detection_config['quantize'] = data['quantize'] or None
+            yolo_model = None
         
         # Set video path (assuming video is in public/assets folder)
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -329,12 +696,26 @@ def initialize_detection():
                 'message': 'Please place demo_video.mp4 in the public/assets folder'
             }), 404
         
+        # Drop decoders and read-ahead frames from the previous (or a replaced) video
+        vision.read_ahead.invalidate(video_path)
+        vision.decoder_pool.invalidate()
+        
+        # Keyframe index for exact seeks (loaded from sidecar or built once)
+        seek_index, index_source = keyframe_index.get_seek_index(video_path)
+        vision.decoder_pool.set_index(video_path, seek_index)
+        
+        # Reused detections belong to the previous video
+        vision.reset_gates()
+        
         # Initialize YOLO model if not already loaded
         if yolo_model is None:
             success = initialize_yolo()
             if not success:
                 return jsonify({'error': 'Failed to initialize YOLOv8 model'}), 500
         
+        # Serve precomputed detections if this video was indexed with this model
+        refresh_detection_cache()
+        
         # Get video info
         cap = cv2.VideoCapture(video_path)
         video_info = {
@@ -348,9 +729,11 @@ def initialize_detection():
         return jsonify({
             'message': 'YOLOv8 initialized successfully',
             'video_path': video_path,
-            'model': 'yolov8n.pt',
+            'model': default_model,
             'config': detection_config,
-            'video_info': video_info
+            'video_info': video_info,
+            'seek_index': dict(seek_index.summary(), source=index_source) if seek_index else {'source': index_source},
+            'detection_cache': detection_cache.info() if detection_cache else None
         })
         
     except Exception as e:
@@ -360,7 +743,7 @@ def initialize_detection():
 @app.route('/api/yolo/process-frame', methods=['POST'])
 def process_frame():
     """Process a single frame with YOLOv8 detection and return annotated frame"""
-    global yolo_model, detection_results, fps_tracker
+    global yolo_model, detection_results
     
     try:
         if yolo_model is None:
@@ -370,84 +753,103 @@ def process_frame():
         frame_number = data.get('frame_number', 0)
         annotate = data.get('annotate', True)  # Return annotated frame by default
         show_overlay = data.get('show_overlay', True)  # Show CCTV overlay
+        detection_format = data.get('format', 'list')  # 'list' or 'columnar'
+        # Skip drawing and encoding entirely, the client renders the boxes
+        detections_only = data.get('detections_only', False)
+        # Reuse the previous detections while the scene is static
+        motion_gate = data.get('motion_gate', False)
+        session_id = data.get('session_id')
+        if motion_gate and not session_id:
+            return jsonify({'error': 'motion_gate requires a session_id'}), 400
+        try:
+            encoder = request_encoder(data)
+            model = request_model(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         start_time = time.time()
         
-        # Open video and seek to frame
-        cap = cv2.VideoCapture(video_path)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        # Loop video if frame_number exceeds total frames
-        if frame_number >= total_frames:
-            frame_number = frame_number % total_frames
-        
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-        ret, frame = cap.read()
-        cap.release()
-        
-        if not ret:
-            # If still can't read, try frame 0
-            cap = cv2.VideoCapture(video_path)
-            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            ret, frame = cap.read()
-            cap.release()
+        # Detections-only requests for indexed videos don't need the frame at all
+        hit = None
+        # Precomputed detections come from the default model
+        cache = detection_cache if model is None else None
+        if detections_only and cache is not None and cache.total_frames > 0:
+            frame_number = frame_number % cache.total_frames
+            hit = cache.lookup(frame_number)
+            frame_shape = (cache.height, cache.width)
+        
+        if hit is None:
+            # Read frame from the read-ahead buffer or a pooled decoder
+            # (loops video, falls back to frame 0)
+            frame, frame_number, total_frames = vision.read_ahead.get_frame(video_path, frame_number)
             
-            if not ret:
+            if frame is None:
                 return jsonify({'error': 'Failed to read frame'}), 500
-        
-        # Run YOLOv8 detection with configured thresholds
-        results = yolo_model(
-            frame,
-            classes=[0],  # class 0 = person
-            conf=detection_config['conf_threshold'],
-            iou=detection_config['iou_threshold'],
-            verbose=False
-        )
-        
-        # Extract detections
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                # Get box coordinates
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                conf = float(box.conf[0])
-                
-                # Convert to percentages for frontend
-                h, w = frame.shape[:2]
-                detections.append({
-                    'x': float(x1 / w * 100),
-                    'y': float(y1 / h * 100),
-                    'width': float((x2 - x1) / w * 100),
-                    'height': float((y2 - y1) / h * 100),
-                    'confidence': conf
-                })
+            frame_shape = frame.shape
+            hit = cached_boxes(frame_number) if model is None else None
+        decode_time = time.time() - start_time
+        
+        # Serve precomputed detections when available, otherwise run YOLOv8
+        cache_hit = hit is not None
+        if cache_hit:
+            boxes, confs = hit
+            inferred = False
+        elif motion_gate:
+            gate = vision.gate(session_id, model)
+            boxes, confs = gate(frame)
+            inferred = gate.last_inferred
+        else:
+            boxes, confs = detect_people(frame, model)
+            inferred = True
+        detections = detection_utils.format_detections(boxes, confs, frame_shape, detection_format)
+        inference_time = time.time() - start_time - decode_time
         
         # Calculate FPS
         elapsed = time.time() - start_time
-        fps_tracker.append(elapsed)
-        if len(fps_tracker) > 30:
-            fps_tracker.pop(0)
-        avg_time = sum(fps_tracker) / len(fps_tracker)
-        fps = 1.0 / avg_time if avg_time > 0 else 0
+        fps = fps_tracker.record(elapsed)
+        
+        if detections_only:
+            with results_lock:
+                detection_results = {
+                    'frame': None,
+                    'detections': detections,
+                    'count': len(confs),
+                    'timestamp': time.time(),
+                    'processing': False,
+                    'fps': fps
+                }
+            
+            return jsonify({
+                'detections': detections,
+                'count': len(confs),
+                'frame_number': frame_number,
+                'frame_size': [int(frame_shape[1]), int(frame_shape[0])],
+                'fps': fps,
+                'processing_time': elapsed,
+                'decode_time': decode_time,
+                'inference_time': inference_time,
+                'cache_hit': cache_hit,
+                'inferred': inferred,
+                'model': model or default_model,
+                'imgsz': resolution_controller.imgsz
+            })
         
         # Annotate frame if requested
         output_frame = frame
         if annotate:
-            output_frame = draw_detections_on_frame(frame, detections)
+            output_frame = draw_detections_on_frame(frame, boxes, confs)
         
         if show_overlay:
-            output_frame = draw_cctv_overlay(output_frame, len(detections), fps)
+            output_frame = draw_cctv_overlay(output_frame, len(confs), fps)
         
-        # Encode frame as base64
-        _, buffer = cv2.imencode('.jpg', output_frame)
-        frame_base64 = base64.b64encode(buffer).decode('utf-8')
+        # Encode frame (downscaled, JPEG or WebP) as base64
+        frame_base64 = base64.b64encode(encoder.encode(output_frame)).decode('utf-8')
         
         with results_lock:
             detection_results = {
                 'frame': frame_base64,
                 'detections': detections,
-                'count': len(detections),
+                'count': len(confs),
                 'timestamp': time.time(),
                 'processing': False,
                 'fps': fps
@@ -455,17 +857,243 @@ def process_frame():
         
         return jsonify({
             'frame': frame_base64,
+            'frame_mime': encoder.mime_type,
             'detections': detections,
-            'count': len(detections),
+            'count': len(confs),
             'frame_number': frame_number,
             'fps': fps,
-            'processing_time': elapsed
+            'processing_time': elapsed,
+            'cache_hit': cache_hit,
+            'inferred': inferred,
+            'model': model or default_model,
+            'imgsz': resolution_controller.imgsz,
+            'encoding': encoder.stats()
         })
         
+    except (SchedulerOverloaded, InferenceTimeout) as e:
+        return overloaded_response(e)
     except Exception as e:
         print(f"Error in process_frame: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/yolo/process-batch', methods=['POST'])
+def process_batch():
+    """Run batched YOLOv8 detection on several video frames or uploaded images"""
+    global yolo_model
+    
+    try:
+        if yolo_model is None:
+            return jsonify({'error': 'YOLOv8 model not initialized'}), 400
+        
+        data = request.json or {}
+        frame_numbers = data.get('frame_numbers')
+        frame_data = data.get('frames')
+        # A batch larger than the inference queue could never be admitted
+        batch_size = min(max(1, int(data.get('batch_size', 8))), INFERENCE_MAX_QUEUE)
+        annotate = data.get('annotate', False)
+        detection_format = data.get('format', 'list')  # 'list' or 'columnar'
+        try:
+            encoder = request_encoder(data)
+            model = request_model(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Every decoded frame is held in memory until the response is sent
+        requested = len(frame_numbers or frame_data or [])
+        if requested > INFERENCE_MAX_QUEUE:
+            return jsonify({'error': f'At most {INFERENCE_MAX_QUEUE} frames per batch request'}), 400
+        
+        start_time = time.time()
+        frames = []
+        labels = []
+        
+        if frame_numbers:
+            if not video_path or not os.path.exists(video_path):
+                return jsonify({'error': 'Video file not found'}), 404
+            # Decode in ascending order so pooled decoders grab forward
+            decoded = {}
+            for number in sorted(set(int(n) for n in frame_numbers)):
+                frame, actual, _ = vision.decoder_pool.read_frame(video_path, number)
+                if frame is None:
+                    return jsonify({'error': f'Failed to read frame {number}'}), 500
+                decoded[number] = (frame, actual)
+            for number in frame_numbers:
+                frame, actual = decoded[int(number)]
+                frames.append(frame)
+                labels.append(actual)
+        elif frame_data:
+            for i, item in enumerate(frame_data):
+                frame_bytes = base64.b64decode(item.split(',')[1] if ',' in item else item)
+                frame = cv2.imdecode(np.frombuffer(frame_bytes, np.uint8), cv2.IMREAD_COLOR)
+                if frame is None:
+                    return jsonify({'error': f'Failed to decode frame {i}'}), 400
+                frames.append(frame)
+                labels.append(i)
+        else:
+            return jsonify({'error': 'Provide frame_numbers or frames'}), 400
+        
+        all_detections = detect_people_batch(frames, batch_size, model)
+        
+        results = []
+        for label, frame, (boxes, confs) in zip(labels, frames, all_detections):
+            item = {
+                'frame_number': label,
+                'detections': detection_utils.format_detections(boxes, confs, frame.shape, detection_format),
+                'count': len(confs)
+            }
+            if annotate:
+                jpeg = encoder.encode(draw_detections_on_frame(frame, boxes, confs))
+                item['frame'] = base64.b64encode(jpeg).decode('utf-8')
+                item['frame_mime'] = encoder.mime_type
+            results.append(item)
+        
+        elapsed = time.time() - start_time
+        return jsonify({
+            'results': results,
+            'batch_size': batch_size,
+            'processing_time': elapsed,
+            'fps': len(frames) / elapsed if elapsed > 0 else 0,
+            'model': model or default_model,
+            'imgsz': resolution_controller.imgsz
+        })
+        
+    except (SchedulerOverloaded, InferenceTimeout) as e:
+        return overloaded_response(e)
+    except Exception as e:
+        print(f"Error in process_batch: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def parse_analysis_options(data, total_frames):
+    """Sampling options for video analysis (default: every 30 frames)"""
+    sample_interval = int(data.get('sample_interval', 30))
+    target_samples = data.get('target_samples')
+    if target_samples and total_frames > 0:
+        sample_interval = max(1, total_frames // int(target_samples))
+    time_budget = data.get('time_budget')
+    workers = max(1, int(data.get('workers', 1)))
+    if workers > ANALYSIS_MAX_WORKERS:
+        raise ValueError(f'workers must be at most {ANALYSIS_MAX_WORKERS}')
+    if time_budget and workers > 1:
+        raise ValueError('time_budget is not supported with workers > 1')
+    return {
+        'sample_interval': max(1, sample_interval),
+        'target_samples': int(target_samples) if target_samples else None,
+        'time_budget': float(time_budget) if time_budget else None,
+        # 'seek' jumps to keyframes when that skips decoding, 'grab' never seeks
+        'sample_mode': data.get('sample_mode', 'seek'),
+        'batch_size': min(max(1, int(data.get('batch_size', 8))), INFERENCE_MAX_QUEUE),
+        # > 1 splits the video into keyframe-aligned segments across processes
+        'workers': workers
+    }
+
+def run_video_analysis(path, options, cache=None, job=None):
+    """
+    Count people in sampled frames of a video
+    
+    Args:
+        path: Video file to analyze
+        options: Output of parse_analysis_options()
+        cache: DetectionCache for this video, answers without decoding when given
+        job: Optional AnalysisJob that receives partial results and can cancel
+        
+    Returns:
+        Dict with detection_counts, sampling stats and cache_hit
+    """
+    sample_interval = options['sample_interval']
+    batch_size = options['batch_size']
+    
+    if cache is not None:
+        counts = [int(c) for c in cache.counts()[::sample_interval]]
+        if job:
+            job.add_samples(range(0, cache.total_frames, sample_interval), counts, cache.total_frames)
+        return {'detection_counts': counts, 'sampling': None, 'cache_hit': True}
+    
+    if options['workers'] > 1:
+        samples = []
+        frames_covered = 0
+        # Workers load the same weights, backend and quantization as the default model
+        weights, backend, quantize = model_registry.parse_model_id(default_model)
+        segments = parallel_analysis.iter_segments(
+            path,
+            weights,
+            conf_threshold=detection_config['conf_threshold'],
+            iou_threshold=detection_config['iou_threshold'],
+            workers=options['workers'],
+            sample_interval=sample_interval,
+            backend=backend,
+            quantize=quantize
+        )
+        # Closing the generator on cancel drops segments that haven't started
+        with contextlib.closing(segments):
+            for start, end, results in segments:
+                if job:
+                    job.check_cancelled()
+                frame_numbers = [frame_number for frame_number, _, _ in results]
+                counts = [len(boxes) for _, boxes, _ in results]
+                samples.extend(zip(frame_numbers, counts))
+                # Segments finish out of order; progress is the frames covered so far
+                frames_covered += end - start
+                if job:
+                    job.add_samples(frame_numbers, counts, frames_covered)
+        samples.sort()
+        return {
+            'detection_counts': [count for _, count in samples],
+            'sampling': {'workers': options['workers']},
+            'cache_hit': False
+        }
+    
+    sampler = video_decoder.FrameSampler(
+        path,
+        sample_interval=sample_interval,
+        index=vision.decoder_pool.get_index(path) if options['sample_mode'] == 'seek' else None,
+        time_budget=options['time_budget'],
+        max_samples=options['target_samples']
+    )
+    
+    detection_counts = []
+    batch = []
+    batch_numbers = []
+    
+    def flush():
+        # Run detection with the same thresholds the cache is keyed by
+        counts = [len(confs) for _, confs in detect_people_batch(batch, batch_size, block=True)]
+        detection_counts.extend(counts)
+        if job:
+            job.add_samples(batch_numbers, counts, sampler.frames_covered)
+        del batch[:]
+        del batch_numbers[:]
+    
+    for frame_number, frame in sampler:
+        if job:
+            job.check_cancelled()
+        batch.append(frame)
+        batch_numbers.append(frame_number)
+        if len(batch) == batch_size:
+            flush()
+    if batch:
+        flush()
+    
+    return {'detection_counts': detection_counts, 'sampling': sampler.stats(), 'cache_hit': False}
+
+def summarize_analysis(analysis, total_frames, fps):
+    """Aggregate statistics for an analyze-video response"""
+    detection_counts = analysis['detection_counts']
+    avg_count = np.mean(detection_counts) if detection_counts else 0
+    max_count = max(detection_counts) if detection_counts else 0
+    min_count = min(detection_counts) if detection_counts else 0
+    
+    return {
+        'total_frames': total_frames,
+        'fps': fps,
+        'sampled_frames': len(detection_counts),
+        'average_count': float(avg_count),
+        'max_count': int(max_count),
+        'min_count': int(min_count),
+        'detection_counts': detection_counts,
+        'sampling': analysis['sampling'],
+        'cache_hit': analysis['cache_hit']
+    }
+
 @app.route('/api/yolo/analyze-video', methods=['POST'])
 def analyze_video():
     """Analyze entire video and return aggregate statistics"""
@@ -481,44 +1109,176 @@ def analyze_video():
         cap = cv2.VideoCapture(video_path)
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
         
-        # Sample frames (every 30 frames for faster processing)
-        sample_interval = 30
-        detection_counts = []
-        frame_count = 0
+        try:
+            options = parse_analysis_options(request.get_json(silent=True) or {}, total_frames)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        analysis = run_video_analysis(video_path, options, cache=detection_cache)
         
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if frame_count % sample_interval == 0:
-                # Run detection
-                results = yolo_model(frame, classes=[0], verbose=False)
-                count = len(results[0].boxes)
-                detection_counts.append(count)
-            
-            frame_count += 1
+        response = summarize_analysis(analysis, total_frames, fps)
+        response['sample_interval'] = options['sample_interval']
+        return jsonify(response)
+        
+    except (SchedulerOverloaded, InferenceTimeout) as e:
+        return overloaded_response(e)
+    except Exception as e:
+        print(f"Error in analyze_video: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/yolo/analyze-video/jobs', methods=['GET', 'POST'])
+def analysis_jobs():
+    """Submit a background analyze-video job, or list existing jobs"""
+    global yolo_model, video_path
+    
+    if request.method == 'GET':
+        return jsonify({'jobs': job_manager.list()})
+    
+    try:
+        if yolo_model is None:
+            return jsonify({'error': 'YOLOv8 model not initialized'}), 400
         
+        if not video_path or not os.path.exists(video_path):
+            return jsonify({'error': 'Video file not found'}), 404
+        
+        cap = cv2.VideoCapture(video_path)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
         cap.release()
         
-        # Calculate statistics
-        avg_count = np.mean(detection_counts) if detection_counts else 0
-        max_count = max(detection_counts) if detection_counts else 0
-        min_count = min(detection_counts) if detection_counts else 0
+        try:
+            options = parse_analysis_options(request.get_json(silent=True) or {}, total_frames)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        # Bind to the current video and cache so a later initialize doesn't affect the job
+        path, cache = video_path, detection_cache
+        
+        def run(job):
+            analysis = run_video_analysis(path, options, cache=cache, job=job)
+            result = summarize_analysis(analysis, total_frames, fps)
+            result['sample_interval'] = options['sample_interval']
+            return result
+        
+        job = job_manager.submit(run, total_frames, options)
+        return jsonify({
+            'job_id': job.id,
+            'status': job.status,
+            'progress_url': f'/api/yolo/analyze-video/jobs/{job.id}',
+            'results_url': f'/api/yolo/analyze-video/jobs/{job.id}/results'
+        }), 202
+        
+    except Exception as e:
+        print(f"Error in analysis_jobs: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/yolo/analyze-video/jobs/<job_id>', methods=['GET', 'DELETE'])
+def analysis_job(job_id):
+    """Get job progress and running statistics, or cancel the job"""
+    if request.method == 'DELETE':
+        job = job_manager.cancel(job_id)
+    else:
+        job = job_manager.get(job_id)
+    
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    response = job.progress()
+    if job.status == 'completed':
+        response['result'] = job.result
+    return jsonify(response)
+
+@app.route('/api/yolo/analyze-video/jobs/<job_id>/results')
+def analysis_job_results(job_id):
+    """Partial results: poll with ?since=<cursor> or stream with ?stream=1 (SSE)"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    cursor = int(request.args.get('since', 0))
+    
+    if request.args.get('stream'):
+        def generate(cursor):
+            while True:
+                samples, cursor = job.results_since(cursor)
+                done = job.finished is not None
+                if samples or done:
+                    yield f"data: {json.dumps({'samples': samples, 'cursor': cursor, 'progress': job.progress()})}\n\n"
+                if done:
+                    break
+                time.sleep(0.5)
+        
+        return Response(generate(cursor), mimetype='text/event-stream')
+    
+    samples, cursor = job.results_since(cursor)
+    return jsonify({
+        'samples': samples,
+        'cursor': cursor,
+        'progress': job.progress()
+    })
+
+@app.route('/api/yolo/index-video', methods=['POST'])
+def index_video():
+    """Precompute detections for every frame of the current video in a background job"""
+    global yolo_model, video_path
+    
+    try:
+        if yolo_model is None:
+            return jsonify({'error': 'YOLOv8 model not initialized'}), 400
+        
+        if not video_path or not os.path.exists(video_path):
+            return jsonify({'error': 'Video file not found'}), 404
+        
+        if detection_config['tiled']:
+            # Caches hold untiled detections and aren't served while tiling is on
+            return jsonify({'error': 'Indexing is unavailable while tiled detection is enabled'}), 409
+        
+        data = request.json or {}
+        if not data.get('force', False) and refresh_detection_cache() is not None:
+            return jsonify({
+                'message': 'Video already indexed',
+                'detection_cache': detection_cache.info()
+            })
+        
+        # Indexing the same video twice at once would race on the cache directory
+        path = video_path
+        with index_jobs_lock:
+            job = index_jobs.get(path)
+            if job is None or job.finished is not None:
+                cap = cv2.VideoCapture(path)
+                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+                cap.release()
+                model_id = default_model
+                conf, iou = detection_config['conf_threshold'], detection_config['iou_threshold']
+                
+                def run(job):
+                    start_time = time.time()
+                    # Leased, so a model change during indexing can't close the scheduler under it
+                    with vision.models.lease(model_id) as entry:
+                        def scheduled_model(frame, conf, iou, **kwargs):
+                            # Index through the scheduler so its thread stays the model's only caller
+                            return [entry.scheduler.infer(frame, conf, iou, block=True)]
+                        
+                        cache = detection_cache_store.build_detection_cache(
+                            path, scheduled_model, entry.model_id, conf, iou, job=job)
+                    refresh_detection_cache()
+                    return {
+                        'message': 'Video indexed successfully',
+                        'detection_cache': cache.info(),
+                        'processing_time': time.time() - start_time
+                    }
+                
+                job = job_manager.submit(run, total_frames, {'index': True, 'force': data.get('force', False)})
+                index_jobs[path] = job
         
         return jsonify({
-            'total_frames': total_frames,
-            'fps': fps,
-            'sampled_frames': len(detection_counts),
-            'average_count': float(avg_count),
-            'max_count': int(max_count),
-            'min_count': int(min_count),
-            'detection_counts': detection_counts
-        })
+            'job_id': job.id,
+            'status': job.status,
+            'progress_url': f'/api/yolo/analyze-video/jobs/{job.id}'
+        }), 202
         
     except Exception as e:
-        print(f"Error in analyze_video: {str(e)}")
+        print(f"Error in index_video: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/yolo/video-info', methods=['GET'])
@@ -551,28 +1311,67 @@ def video_info():
         print(f"Error in video_info: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/yolo/stream')
-def stream_detection():
-    """Stream video with real-time YOLOv8 detection"""
-    def generate():
-        global yolo_model, video_path, fps_tracker
-        
-        source = request.args.get('source', 'video')  # 'video' or 'webcam'
-        
-        # Open source
-        if source == 'webcam':
-            cap = cv2.VideoCapture(0)
-            if not cap.isOpened():
-                yield f"data: {json.dumps({'error': 'Cannot open webcam'})}\n\n"
-                return
-        else:
-            if not video_path or not os.path.exists(video_path):
-                yield f"data: {json.dumps({'error': 'Video not found'})}\n\n"
-                return
-            cap = cv2.VideoCapture(video_path)
-        
-        frame_count = 0
-        
+@app.route('/api/yolo/metrics', methods=['GET'])
+def detection_metrics():
+    """Report decoder, cache, inference scheduler and encoder statistics"""
+    if not vision.started:
+        return jsonify({'detection': vision.stats()})
+    return jsonify({
+        'detection': vision.stats(),
+        'decoder_pool': vision.decoder_pool.stats(),
+        'read_ahead': vision.read_ahead.stats(),
+        'detection_cache': detection_cache.info() if detection_cache else None,
+        'inference_scheduler': inference_scheduler.stats() if inference_scheduler else None,
+        'encoder_sessions': vision.encoder_sessions.stats(),
+        'motion_gate': vision.frame_gates.stats(),
+        'tiling': tiled_detector.stats() if tiled_detector else None,
+        'resolution': resolution_controller.stats(),
+        'models': vision.models.stats(),
+        'worker_pool': worker_pool.stats() if worker_pool else None
+    })
+
+def open_stream_source(source):
+    """Open the webcam or current video for streaming, returns (cap, error)"""
+    if source == 'webcam':
+        cap = cv2.VideoCapture(0)
+        if not cap.isOpened():
+            return None, 'Cannot open webcam'
+        return cap, None
+    
+    if not video_path or not os.path.exists(video_path):
+        return None, 'Video not found'
+    return cv2.VideoCapture(video_path), None
+
+def stream_frames(cap, source, render=True, detect_every=1, motion_gate=None, model=None):
+    """
+    Read, detect and annotate frames for the streaming endpoints
+    
+    Args:
+        cap: Open VideoCapture
+        source: 'video' (loops) or 'webcam'
+        render: Draw boxes and overlay; when False the raw frame is yielded
+        detect_every: Run YOLO every N frames (or 'auto') and track boxes in between
+        motion_gate: Optional MotionGate; static frames reuse the last detections
+        model: Registry model id (None = default model)
+        
+    Yields:
+        (frame_number, output_frame, boxes, confs, track_ids, fps);
+        track_ids is None when detect_every is 1
+    """
+    detect = functools.partial(detect_people, model=model)
+    if motion_gate is not None:
+        detect = motion_gate_module.GatedDetector(detect, motion_gate)
+    
+    interval_detector = None
+    if detect_every != 1:
+        interval_detector = tracking.IntervalDetector(detect, interval=detect_every, target_fps=30.0)
+    
+    frame_count = 0
+    position = 0  # Frame index within the video (resets when looping)
+    # Shown again when the inference queue sheds a frame
+    last = detection_utils.empty_boxes() + (None,)
+    
+    try:
         while cap.isOpened():
             start_time = time.time()
             
@@ -581,75 +1380,197 @@ def stream_detection():
                 if source == 'video':
                     # Loop video
                     cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    position = 0
                     continue
                 else:
                     break
             
-            # Process frame with YOLO
-            results = yolo_model(
-                frame, 
-                classes=[0],
-                conf=detection_config['conf_threshold'],
-                iou=detection_config['iou_threshold'],
-                verbose=False
-            )
-            
-            # Extract detections
-            detections = []
-            for result in results:
-                boxes = result.boxes
-                for box in boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    conf = float(box.conf[0])
-                    
-                    h, w = frame.shape[:2]
-                    detections.append({
-                        'x': float(x1 / w * 100),
-                        'y': float(y1 / h * 100),
-                        'width': float((x2 - x1) / w * 100),
-                        'height': float((y2 - y1) / h * 100),
-                        'confidence': conf
-                    })
+            # Serve precomputed detections for indexed videos
+            hit = cached_boxes(position) if source == 'video' and model is None else None
+            position += 1
+            track_ids = None
+            try:
+                if interval_detector is not None:
+                    # Detect every N frames, track in between
+                    boxes, confs, track_ids, _ = interval_detector.process(frame, hit)
+                else:
+                    # Otherwise process frame with YOLO
+                    boxes, confs = hit if hit is not None else detect(frame)
+                last = (boxes, confs, track_ids)
+            except (SchedulerOverloaded, InferenceTimeout):
+                # Overloaded: keep the stream moving with the previous boxes
+                boxes, confs, track_ids = last
             
             # Calculate FPS
             elapsed = time.time() - start_time
-            fps_tracker.append(elapsed)
-            if len(fps_tracker) > 30:
-                fps_tracker.pop(0)
-            avg_time = sum(fps_tracker) / len(fps_tracker)
-            fps = 1.0 / avg_time if avg_time > 0 else 0
+            fps = fps_tracker.record(elapsed)
             
             # Annotate frame
-            annotated = draw_detections_on_frame(frame, detections)
-            annotated = draw_cctv_overlay(annotated, len(detections), fps)
+            output_frame = frame
+            if render:
+                output_frame = draw_detections_on_frame(frame, boxes, confs, track_ids)
+                output_frame = draw_cctv_overlay(output_frame, len(confs), fps)
+            
+            yield frame_count, output_frame, boxes, confs, track_ids, fps
             
+            frame_count += 1
+            time.sleep(1/30)  # Target 30 FPS
+    finally:
+        cap.release()
+
+@app.route('/api/yolo/stream')
+def stream_detection():
+    """Stream video with real-time YOLOv8 detection"""
+    source = request.args.get('source', 'video')  # 'video' or 'webcam'
+    detection_format = request.args.get('format', 'list')  # 'list' or 'columnar'
+    # Skip drawing and encoding, send only detections for client-side rendering
+    detections_only = request.args.get('detections_only', '').lower() in ('1', 'true')
+    try:
+        encoder = request_encoder(request.args)
+        # Run YOLO every N frames ('auto' adapts N) and track boxes in between
+        detect_every = tracking.parse_interval(request.args.get('detect_every'))
+        motion_gate = parse_motion_gate(request.args)
+        model = request_model(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def generate():
+        cap, error = open_stream_source(source)
+        if error:
+            yield f"data: {json.dumps({'error': error})}\n\n"
+            return
+        
+        for frame_number, annotated, boxes, confs, track_ids, fps in stream_frames(
+                cap, source, render=not detections_only, detect_every=detect_every,
+                motion_gate=motion_gate, model=model):
             # Encode frame
-            _, buffer = cv2.imencode('.jpg', annotated)
-            frame_base64 = base64.b64encode(buffer).decode('utf-8')
+            frame_base64 = None
+            if not detections_only:
+                frame_base64 = base64.b64encode(encoder.encode(annotated)).decode('utf-8')
             
             # Send detection data
             data = {
                 'frame': frame_base64,
-                'frame_number': frame_count,
-                'count': len(detections),
-                'detections': detections,
+                'frame_mime': encoder.mime_type,
+                'frame_number': frame_number,
+                'count': len(confs),
+                'detections': detection_utils.format_detections(boxes, confs, annotated.shape, detection_format),
                 'timestamp': time.time(),
-                'fps': fps
+                'fps': fps,
+                'model': model or default_model,
+                'imgsz': resolution_controller.imgsz
             }
+            if track_ids is not None:
+                data['track_ids'] = track_ids.tolist()
+            if motion_gate is not None:
+                data['motion_gate'] = motion_gate.stats()
             
             yield f"data: {json.dumps(data)}\n\n"
-            
-            frame_count += 1
-            time.sleep(1/30)  # Target 30 FPS
-        
-        cap.release()
+    
+    return Response(generate(), mimetype='text/event-stream')
+
+@app.route('/api/yolo/stream/mjpeg')
+def stream_mjpeg():
+    """
+    Stream annotated frames as raw JPEG parts (multipart/x-mixed-replace),
+    usable directly as an <img> src. Detections for each frame go in the
+    part headers and on the /api/yolo/stream/detections side channel.
+    """
+    source = request.args.get('source', 'video')  # 'video' or 'webcam'
+    # Unique unless the client picks one, so viewers don't overwrite each other's detections
+    stream_id = request.args.get('stream_id') or uuid.uuid4().hex
+    detection_format = request.args.get('format', 'list')  # 'list' or 'columnar'
+    try:
+        encoder = request_encoder(request.args)
+        detect_every = tracking.parse_interval(request.args.get('detect_every'))
+        motion_gate = parse_motion_gate(request.args)
+        model = request_model(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    cap, error = open_stream_source(source)
+    if error:
+        return jsonify({'error': error}), 404
+    
+    def generate():
+        try:
+            for frame_number, annotated, boxes, confs, track_ids, fps in stream_frames(
+                    cap, source, detect_every=detect_every, motion_gate=motion_gate, model=model):
+                jpeg = encoder.encode(annotated)
+                
+                data = {
+                    'frame_number': frame_number,
+                    'count': len(confs),
+                    'detections': detection_utils.format_detections(boxes, confs, annotated.shape, detection_format),
+                    'timestamp': time.time(),
+                    'fps': fps,
+                    'model': model or default_model,
+                    'imgsz': resolution_controller.imgsz
+                }
+                if track_ids is not None:
+                    data['track_ids'] = track_ids.tolist()
+                if motion_gate is not None:
+                    data['motion_gate'] = motion_gate.stats()
+                with results_lock:
+                    stream_states[stream_id] = data
+                
+                yield (
+                    b'--frame\r\n'
+                    + f'Content-Type: {encoder.mime_type}\r\n'
+                      f'Content-Length: {len(jpeg)}\r\n'
+                      f'X-Frame-Number: {frame_number}\r\n'
+                      f'X-People-Count: {len(confs)}\r\n'
+                      f'X-FPS: {fps:.1f}\r\n\r\n'.encode('ascii')
+                    + jpeg + b'\r\n'
+                )
+        finally:
+            # Client disconnected or the source ended; side channels see the stream is gone
+            with results_lock:
+                stream_states.pop(stream_id, None)
+    
+    response = Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame',
+                        headers={'X-Stream-Id': stream_id})
+    # Released even if the response is never iterated (generate() releases it otherwise)
+    response.call_on_close(cap.release)
+    return response
+
+@app.route('/api/yolo/stream/detections')
+def stream_detections():
+    """Lightweight SSE side channel with detections for an MJPEG stream (?stream_id=X-Stream-Id)"""
+    stream_id = request.args.get('stream_id')
+    if not stream_id:
+        return jsonify({'error': 'stream_id is required'}), 400
+    
+    def generate():
+        last_frame = None
+        seen = False
+        last_update = last_sent = time.time()
+        while True:
+            with results_lock:
+                data = stream_states.get(stream_id)
+            now = time.time()
+            if data is None and seen:
+                # The MJPEG stream ended
+                return
+            if data is not None and data['frame_number'] != last_frame:
+                seen = True
+                last_frame = data['frame_number']
+                last_update = last_sent = now
+                yield f"data: {json.dumps(data)}\n\n"
+            elif now - last_update > STREAM_IDLE_TIMEOUT:
+                return
+            elif now - last_sent > STREAM_KEEPALIVE:
+                # Writing is how a disconnected client gets noticed
+                last_sent = now
+                yield ": ping\n\n"
+            time.sleep(1/60)
     
     return Response(generate(), mimetype='text/event-stream')
 
 @app.route('/api/yolo/webcam/detect', methods=['POST'])
 def detect_webcam():
     """Process webcam frame with YOLOv8 detection"""
-    global yolo_model, fps_tracker
+    global yolo_model
     
     try:
         if yolo_model is None:
@@ -665,6 +1586,12 @@ def detect_webcam():
         if not frame_data:
             return jsonify({'error': 'No frame data provided'}), 400
         
+        try:
+            encoder = request_encoder(data)
+            model = request_model(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Decode base64 frame
         frame_bytes = base64.b64decode(frame_data.split(',')[1] if ',' in frame_data else frame_data)
         nparr = np.frombuffer(frame_bytes, np.uint8)
@@ -676,59 +1603,188 @@ def detect_webcam():
         start_time = time.time()
         
         # Run detection
-        results = yolo_model(
-            frame,
-            classes=[0],
-            conf=detection_config['conf_threshold'],
-            iou=detection_config['iou_threshold'],
-            verbose=False
-        )
-        
-        # Extract detections
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                conf = float(box.conf[0])
-                
-                h, w = frame.shape[:2]
-                detections.append({
-                    'x': float(x1 / w * 100),
-                    'y': float(y1 / h * 100),
-                    'width': float((x2 - x1) / w * 100),
-                    'height': float((y2 - y1) / h * 100),
-                    'confidence': conf
-                })
+        boxes, confs = detect_people(frame, model)
         
         # Calculate FPS
         elapsed = time.time() - start_time
-        fps_tracker.append(elapsed)
-        if len(fps_tracker) > 30:
-            fps_tracker.pop(0)
-        avg_time = sum(fps_tracker) / len(fps_tracker)
-        fps = 1.0 / avg_time if avg_time > 0 else 0
-        
-        # Annotate frame
-        annotated = draw_detections_on_frame(frame, detections)
-        annotated = draw_cctv_overlay(annotated, len(detections), fps)
-        
-        # Encode result
-        _, buffer = cv2.imencode('.jpg', annotated)
-        result_base64 = base64.b64encode(buffer).decode('utf-8')
+        fps = fps_tracker.record(elapsed)
+        
+        # Annotate and encode unless the client renders detections itself
+        result_base64 = None
+        frame_mime = None
+        if not data.get('detections_only', False):
+            annotated = draw_detections_on_frame(frame, boxes, confs)
+            annotated = draw_cctv_overlay(annotated, len(confs), fps)
+            
+            result_base64 = base64.b64encode(encoder.encode(annotated)).decode('utf-8')
+            frame_mime = encoder.mime_type
         
         return jsonify({
             'frame': result_base64,
-            'detections': detections,
-            'count': len(detections),
+            'frame_mime': frame_mime,
+            'detections': detection_utils.format_detections(boxes, confs, frame.shape, data.get('format', 'list')),
+            'count': len(confs),
             'fps': fps,
-            'processing_time': elapsed
+            'processing_time': elapsed,
+            'model': model or default_model,
+            'imgsz': resolution_controller.imgsz
         })
         
+    except (SchedulerOverloaded, InferenceTimeout) as e:
+        return overloaded_response(e)
     except Exception as e:
         print(f"Error in detect_webcam: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+class LatestFrameSlot:
+    """Holds only the newest frame from a client; older unprocessed frames are dropped"""
+    
+    def __init__(self):
+        self._cond = Condition()
+        self._frame = None
+        self._frame_id = 0
+        self._closed = False
+        self.received = 0
+        self.dropped = 0
+    
+    def put(self, data):
+        with self._cond:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = data
+            self.received += 1
+            self._frame_id = self.received
+            self._cond.notify()
+    
+    def take(self):
+        """Block for the next frame, returns (frame_id, data) or None once closed"""
+        with self._cond:
+            while self._frame is None and not self._closed:
+                self._cond.wait()
+            if self._frame is None:
+                return None
+            data, self._frame = self._frame, None
+            return self._frame_id, data
+    
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+@sock.route('/api/yolo/webcam/ws')
+def detect_webcam_ws(ws):
+    """
+    Persistent webcam detection channel
+    
+    The client sends raw JPEG bytes as binary messages, and optionally a text
+    message {"mode": "detections" | "annotated"} to switch replies (it may also
+    carry encoding options such as max_width, quality or target_kb, and a
+    "model" id to detect with):
+      - detections: text JSON {frame_id, count, boxes: [[x, y, w, h, conf], ...], fps, ...}
+      - annotated: binary message = 4-byte big-endian header length + JSON header + JPEG
+    When inference falls behind, only the newest frame is kept and stale ones are dropped.
+    """
+    if yolo_model is None and not initialize_yolo():
+        ws.send(json.dumps({'error': 'Failed to initialize YOLOv8 model'}))
+        return
+    
+    slot = LatestFrameSlot()
+    settings = {'mode': 'detections', 'encoder': frame_encoding.FrameEncoder(), 'model': None}
+    send_lock = Lock()
+    
+    def send(message):
+        # The reader (control errors) and this thread (replies) share the socket
+        with send_lock:
+            ws.send(message)
+    
+    def apply_control(message):
+        control = json.loads(message)
+        if not isinstance(control, dict):
+            raise ValueError('Control message must be a JSON object')
+        # Validate everything before changing any setting
+        encoder = settings['encoder']
+        if any(key in control for key in frame_encoding.ENCODING_OPTIONS):
+            encoder = frame_encoding.FrameEncoder.from_options(control)
+        model = request_model(control) if 'model' in control else settings['model']
+        if control.get('mode') in ('detections', 'annotated'):
+            settings['mode'] = control['mode']
+        settings['encoder'] = encoder
+        settings['model'] = model
+    
+    def reader():
+        try:
+            while True:
+                message = ws.receive()
+                if isinstance(message, str):
+                    try:
+                        apply_control(message)
+                    except (ValueError, TypeError) as e:
+                        # Bad control messages are reported, the session keeps going
+                        send(json.dumps({'error': f'Invalid control message: {str(e)}'}))
+                elif message:
+                    slot.put(message)
+        except ConnectionClosed:
+            pass
+        finally:
+            slot.close()
+    
+    Thread(target=reader, daemon=True).start()
+    frame_times = []
+    
+    try:
+        while True:
+            item = slot.take()
+            if item is None:
+                break
+            frame_id, jpeg = item
+            
+            frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                send(json.dumps({'frame_id': frame_id, 'error': 'Failed to decode frame'}))
+                continue
+            
+            start_time = time.time()
+            model = settings['model']
+            try:
+                boxes, confs = detect_people(frame, model)
+            except (SchedulerOverloaded, InferenceTimeout) as e:
+                send(json.dumps({'frame_id': frame_id, 'error': str(e), 'overloaded': True}))
+                continue
+            
+            elapsed = time.time() - start_time
+            frame_times.append(elapsed)
+            del frame_times[:-30]
+            avg_time = sum(frame_times) / len(frame_times)
+            fps = 1.0 / avg_time if avg_time > 0 else 0
+            
+            # Compact boxes: percentages of frame size plus confidence
+            h, w = frame.shape[:2]
+            header = {
+                'frame_id': frame_id,
+                'count': len(confs),
+                'boxes': detection_utils.compact_rows(boxes, confs, w, h),
+                'fps': fps,
+                'processing_time': elapsed,
+                'model': model or default_model,
+                'imgsz': resolution_controller.imgsz,
+                'dropped': slot.dropped
+            }
+            
+            if settings['mode'] == 'annotated':
+                annotated = draw_detections_on_frame(frame, boxes, confs)
+                annotated = draw_cctv_overlay(annotated, len(confs), fps)
+                encoder = settings['encoder']
+                image = encoder.encode(annotated)
+                header['frame_mime'] = encoder.mime_type
+                header_bytes = json.dumps(header).encode('utf-8')
+                send(struct.pack('>I', len(header_bytes)) + header_bytes + image)
+            else:
+                send(json.dumps(header))
+    except ConnectionClosed:
+        pass
+    finally:
+        slot.close()
+
 @app.route('/api/yolo/config', methods=['GET', 'POST'])
 def detection_config_endpoint():
     """Get or update detection configuration"""
@@ -746,12 +1802,45 @@ def detection_config_endpoint():
             detection_config['iou_threshold'] = float(data['iou_threshold'])
         if 'use_gpu' in data:
             detection_config['use_gpu'] = bool(data['use_gpu'])
+        if 'tiled' in data:
+            detection_config['tiled'] = bool(data['tiled'])
+        if 'tile_size' in data:
+            detection_config['tile_size'] = int(data['tile_size'])
+        if 'tile_overlap' in data:
+            detection_config['tile_overlap'] = float(data['tile_overlap'])
+        if 'tile_crowd_threshold' in data:
+            detection_config['tile_crowd_threshold'] = int(data['tile_crowd_threshold'])
+        configure_tiling()
+        if 'target_fps' in data:
+            target_fps = data['target_fps']
+            detection_config['target_latency_ms'] = 1000.0 / float(target_fps) if target_fps else None
+        if 'target_latency_ms' in data:
+            target = data['target_latency_ms']
+            detection_config['target_latency_ms'] = float(target) if target else None
+        if 'imgsz_levels' in data:
+            detection_config['imgsz_levels'] = list(parse_levels(data['imgsz_levels']))
+        if any(key in data for key in ('target_fps', 'target_latency_ms', 'imgsz_levels')):
+            target = detection_config['target_latency_ms']
+            resolution_controller.configure(
+                detection_config['imgsz_levels'],
+                target / 1000.0 if target else None
+            )
+        
+        # Thresholds are part of the cache key
+        refresh_detection_cache()
+        # Detections reused by the motion gates used the old thresholds
+        vision.reset_gates()
         
         return jsonify({
             'message': 'Configuration updated',
             'config': detection_config
         })
 
+# Detection pods opt in to loading the vision stack at boot; chat-only pods skip it.
+# Spawned inference workers re-import this module as __mp_main__ and must not warm up
+if os.getenv('YOLO_WARMUP', '').lower() in ('1', 'true') and multiprocessing.parent_process() is None:
+    Thread(target=vision.warmup, daemon=True).start()
+
 if __name__ == '__main__':
     # Check if API key is configured
     if not HUGGINGFACE_API_KEY:
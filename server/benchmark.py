@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the detection pipeline
+
+Examples:
+  # Random-seek latency with and without the keyframe index
+  python benchmark.py seek --video ../public/assets/demo_video.mp4
+
+  # Throughput of 8 concurrent cameras, direct model calls vs micro-batching
+  python benchmark.py scheduler --cameras 8
+
+  # Bytes and server CPU per frame: base64 JSON SSE vs binary MJPEG
+  python benchmark.py stream-encoding
+
+  # Annotation time per frame at 720p and 1080p: full-frame copies vs renderer
+  python benchmark.py annotation --people 15
+
+  # Counting accuracy and throughput when detecting every N frames with tracking
+  python benchmark.py detect-every --intervals 1 2 3 5 10 auto
+
+  # Latency and throughput of torch vs ONNX Runtime vs OpenVINO on CPU
+  python benchmark.py backends --backends torch onnx openvino
+
+  # Server boot time and RSS: chat-only vs detection started vs warmed up
+  python benchmark.py startup --runs 3
+
+  # Throughput of 1/2/4 inference worker processes vs one in-process model
+  python benchmark.py inference-workers --workers 1 2 4
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from threading import Thread
+
+
+def default_video_path():
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_dir, 'public', 'assets', 'demo_video.mp4')
+
+
+def print_header(title):
+    print("=" * 60)
+    print(title)
+    print("=" * 60)
+
+
+def summarize_latencies(name, latencies):
+    """Print mean/p50/p95 latency in milliseconds"""
+    ordered = sorted(latencies)
+    mean = sum(ordered) / len(ordered)
+    p50 = ordered[len(ordered) // 2]
+    p95 = ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+    print(f"{name:<24} mean {mean * 1000:7.2f} ms | p50 {p50 * 1000:7.2f} ms | p95 {p95 * 1000:7.2f} ms")
+    return {'mean': mean, 'p50': p50, 'p95': p95}
+
+
+def bench_seek(args):
+    """Random-seek latency: OpenCV seek vs keyframe index"""
+    from video_decoder import DecoderHandle
+    from seek_index import build_seek_index
+
+    print_header("Random Seek Benchmark")
+    start = time.time()
+    index = build_seek_index(args.video)
+    if index is None:
+        print("✗ This OpenCV build can't report keyframes, nothing to compare")
+        return 1
+    print(f"Index built in {time.time() - start:.2f}s: {index.summary()}")
+
+    rng = random.Random(args.seed)
+    targets = [rng.randrange(index.total_frames) for _ in range(args.samples)]
+
+    results = {}
+    for name, use_index in (("opencv seek", False), ("keyframe index", True)):
+        handle = DecoderHandle(args.video)
+        handle.index = index if use_index else None
+        latencies = []
+        for target in targets:
+            t0 = time.time()
+            ret, _ = handle.read(target)
+            latencies.append(time.time() - t0)
+            if not ret:
+                print(f"✗ {name}: failed to read frame {target}")
+        handle.release()
+        results[name] = summarize_latencies(name, latencies)
+
+    speedup = results["opencv seek"]['mean'] / results["keyframe index"]['mean']
+    print(f"\nMean speedup with index: {speedup:.2f}x")
+    return 0
+
+
+def load_sample_frames(video_path, count, stride=10):
+    """Decode count frames spaced stride apart for inference benchmarks"""
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    frame_count = 0
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            if frame_count == 0:
+                break
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            continue
+        if frame_count % stride == 0:
+            frames.append(frame)
+        frame_count += 1
+    cap.release()
+    return frames
+
+
+def run_concurrently(workers, fn):
+    """Run fn(worker_index) on N threads and return the wall time"""
+    threads = [Thread(target=fn, args=(i,)) for i in range(workers)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.time() - start
+
+
+def bench_scheduler(args):
+    """Concurrent cameras: direct model calls vs the micro-batching scheduler"""
+    from ultralytics import YOLO
+    from inference_scheduler import InferenceScheduler
+
+    print_header("Inference Scheduler Benchmark")
+    frames = load_sample_frames(args.video, args.cameras * 4)
+    if not frames:
+        print(f"✗ Cannot read frames from {args.video}")
+        return 1
+
+    model = YOLO(args.model)
+    model(frames[0], verbose=False)  # Warm up
+    total = args.cameras * args.frames
+
+    def direct(i):
+        for n in range(args.frames):
+            model(frames[(i + n) % len(frames)], classes=[0], conf=0.5, iou=0.45, verbose=False)
+
+    elapsed = run_concurrently(args.cameras, direct)
+    print(f"{'direct calls':<24} {total / elapsed:7.2f} frames/s")
+
+    scheduler = InferenceScheduler(model, max_batch_size=args.max_batch, max_wait=args.max_wait)
+
+    def batched(i):
+        for n in range(args.frames):
+            scheduler.infer(frames[(i + n) % len(frames)], 0.5, 0.45)
+
+    elapsed_batched = run_concurrently(args.cameras, batched)
+    stats = scheduler.stats()
+    print(f"{'micro-batched':<24} {total / elapsed_batched:7.2f} frames/s "
+          f"(avg batch {stats['average_batch_size']:.1f})")
+    print(f"\nSpeedup: {elapsed / elapsed_batched:.2f}x with {args.cameras} cameras")
+    return 0
+
+
+def bench_stream_encoding(args):
+    """Bytes and CPU per frame for the SSE (base64 JSON) and MJPEG stream formats"""
+    import base64
+    import json
+    import cv2
+
+    print_header("Stream Encoding Benchmark")
+    frames = load_sample_frames(args.video, args.frames, stride=1)
+    if not frames:
+        print(f"✗ Cannot read frames from {args.video}")
+        return 1
+
+    jpegs = [cv2.imencode('.jpg', frame)[1] for frame in frames]
+    # Representative payload: a handful of detections per frame
+    detections = [{'x': 10.0, 'y': 20.0, 'width': 5.0, 'height': 12.0, 'confidence': 0.8}] * 8
+
+    def sse(i, buffer):
+        data = {
+            'frame': base64.b64encode(buffer).decode('utf-8'),
+            'frame_number': i,
+            'count': len(detections),
+            'detections': detections,
+            'timestamp': time.time(),
+            'fps': 30.0
+        }
+        return f"data: {json.dumps(data)}\n\n".encode('utf-8')
+
+    def mjpeg(i, buffer):
+        jpeg = buffer.tobytes()
+        return (
+            b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n'
+            + f'Content-Length: {len(jpeg)}\r\nX-Frame-Number: {i}\r\n'
+              f'X-People-Count: {len(detections)}\r\n\r\n'.encode('ascii')
+            + jpeg + b'\r\n'
+        )
+
+    def side_channel(i):
+        data = {'frame_number': i, 'count': len(detections), 'detections': detections,
+                'timestamp': time.time(), 'fps': 30.0}
+        return f"data: {json.dumps(data)}\n\n".encode('utf-8')
+
+    jpeg_bytes = sum(len(b) for b in jpegs) / len(jpegs)
+    print(f"Raw JPEG: {jpeg_bytes / 1024:.1f} KB/frame over {len(jpegs)} frames\n")
+
+    results = {}
+    for name, fn in (("SSE base64 JSON", lambda i, b: sse(i, b)),
+                     ("MJPEG + side channel", lambda i, b: mjpeg(i, b) + side_channel(i))):
+        cpu_start = time.process_time()
+        total_bytes = 0
+        for _ in range(args.repeat):
+            for i, buffer in enumerate(jpegs):
+                total_bytes += len(fn(i, buffer))
+        count = args.repeat * len(jpegs)
+        cpu = (time.process_time() - cpu_start) / count
+        results[name] = (total_bytes / count, cpu)
+        print(f"{name:<24} {total_bytes / count / 1024:8.1f} KB/frame | {cpu * 1e6:8.1f} us CPU/frame")
+
+    sse_bytes, sse_cpu = results["SSE base64 JSON"]
+    mjpeg_bytes, mjpeg_cpu = results["MJPEG + side channel"]
+    print(f"\nMJPEG saves {(1 - mjpeg_bytes / sse_bytes) * 100:.1f}% bytes and "
+          f"{(1 - mjpeg_cpu / sse_cpu) * 100:.1f}% framing CPU per frame")
+    return 0
+
+
+def legacy_annotate(frame, boxes, confs, people_count, fps):
+    """The original copy-per-layer annotation, kept as the benchmark baseline"""
+    import cv2
+    from datetime import datetime
+
+    annotated = frame.copy()
+    for (x1, y1, x2, y2), confidence in zip(boxes, confs):
+        cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        label = f"Person {confidence:.2f}"
+        label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+        label_y = max(y1, label_size[1] + 10)
+        cv2.rectangle(annotated, (x1, label_y - label_size[1] - 10),
+                      (x1 + label_size[0], label_y + 5), (0, 255, 0), -1)
+        cv2.putText(annotated, label, (x1, label_y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+
+    overlay = annotated.copy()
+    h, w = annotated.shape[:2]
+    cv2.rectangle(overlay, (0, 0), (w, 80), (0, 0, 0), -1)
+    annotated = cv2.addWeighted(annotated, 0.7, overlay, 0.3, 0)
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cv2.putText(annotated, f"CCTV - {timestamp}", (10, 30), font, 0.6, (255, 255, 255), 2)
+    count_text = f"PEOPLE: {people_count}"
+    count_size = cv2.getTextSize(count_text, font, 0.8, 2)[0]
+    cv2.putText(annotated, count_text, ((w - count_size[0]) // 2, 30), font, 0.8, (0, 255, 0), 2)
+    fps_text = f"FPS: {fps:.1f}"
+    fps_size = cv2.getTextSize(fps_text, font, 0.6, 2)[0]
+    cv2.putText(annotated, fps_text, (w - fps_size[0] - 10, 30), font, 0.6, (0, 255, 255), 2)
+    cv2.putText(annotated, "Conf: 0.5 | IoU: 0.45", (10, 60), font, 0.4, (200, 200, 200), 1)
+    return annotated
+
+
+def bench_annotation(args):
+    """Annotation time per frame at 720p and 1080p: legacy drawing vs AnnotationRenderer"""
+    import numpy as np
+    from annotation import AnnotationRenderer
+
+    print_header("Annotation Benchmark")
+    rng = np.random.default_rng(args.seed)
+
+    for width, height in ((1280, 720), (1920, 1080)):
+        frame = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+        boxes = []
+        for _ in range(args.people):
+            x1, y1 = int(rng.integers(0, width - 100)), int(rng.integers(0, height - 200))
+            boxes.append((x1, y1, x1 + 80, y1 + 180))
+        confs = rng.uniform(0.5, 1.0, size=args.people).tolist()
+        renderer = AnnotationRenderer()
+
+        def renderer_annotate(i):
+            image = renderer.draw_detections(frame, boxes, confs)
+            return renderer.draw_overlay(image, len(boxes), 30.0, "Conf: 0.5 | IoU: 0.45")
+
+        print(f"\n{width}x{height}, {args.people} people:")
+        results = {}
+        for name, fn in (("legacy", lambda i: legacy_annotate(frame, boxes, confs, len(boxes), 30.0)),
+                         ("renderer", renderer_annotate)):
+            fn(0)  # Warm up caches and buffers
+            latencies = []
+            for i in range(args.frames):
+                t0 = time.perf_counter()
+                fn(i)
+                latencies.append(time.perf_counter() - t0)
+            results[name] = summarize_latencies(name, latencies)
+        print(f"Speedup: {results['legacy']['mean'] / results['renderer']['mean']:.2f}x")
+    return 0
+
+
+def bench_detect_every(args):
+    """Count accuracy and throughput of detect-every-N with tracking vs every frame"""
+    import numpy as np
+    from ultralytics import YOLO
+    from detection_utils import extract_boxes
+    from tracking import IntervalDetector, iou_matrix, parse_interval
+
+    print_header("Detect-Every-N Benchmark")
+    frames = load_sample_frames(args.video, args.frames, stride=1)
+    if not frames:
+        print(f"✗ Cannot read frames from {args.video}")
+        return 1
+
+    model = YOLO(args.model)
+
+    def detect(frame):
+        return extract_boxes(model(frame, classes=[0], conf=0.5, iou=0.45, verbose=False))
+
+    detect(frames[0])  # Warm up
+
+    # Every-frame detections are the reference
+    start = time.time()
+    reference = [detect(frame) for frame in frames]
+    reference_fps = len(frames) / (time.time() - start)
+
+    print(f"{'interval':<10} {'fps':>8} {'speedup':>8} {'count MAE':>10} {'exact':>7} {'box F1':>7}")
+    for interval in args.intervals:
+        detector = IntervalDetector(detect, interval=parse_interval(interval), target_fps=args.target_fps)
+        outputs = []
+        start = time.time()
+        for frame in frames:
+            boxes, confs, _, _ = detector.process(frame)
+            outputs.append(boxes)
+        fps = len(frames) / (time.time() - start)
+
+        errors = []
+        matched = predicted = expected = 0
+        for boxes, (ref_boxes, _) in zip(outputs, reference):
+            errors.append(abs(len(boxes) - len(ref_boxes)))
+            predicted += len(boxes)
+            expected += len(ref_boxes)
+            ious = iou_matrix(boxes, ref_boxes)
+            # Count each reference box matched by some output box at IoU >= 0.5
+            if ious.size:
+                matched += int((ious.max(axis=0) >= 0.5).sum())
+        precision = matched / predicted if predicted else 1.0
+        recall = matched / expected if expected else 1.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        exact = sum(1 for e in errors if e == 0) / len(errors)
+
+        print(f"{interval:<10} {fps:8.2f} {fps / reference_fps:7.2f}x {np.mean(errors):10.3f} "
+              f"{exact * 100:6.1f}% {f1:7.3f}")
+    print(f"\nEvery-frame reference: {reference_fps:.2f} frames/s over {len(frames)} frames")
+    return 0
+
+
+def bench_backends(args):
+    """Single-frame latency and batched throughput per inference backend"""
+    from detection_utils import extract_boxes
+    from model_backends import load_model
+
+    print_header("Inference Backend Benchmark")
+    frames = load_sample_frames(args.video, args.frames)
+    if not frames:
+        print(f"✗ Cannot read frames from {args.video}")
+        return 1
+
+    reference = None
+    reference_counts = None
+    for backend in args.backends:
+        try:
+            model = load_model(args.model, backend)
+        except Exception as e:
+            print(f"✗ {backend}: {str(e)}")
+            continue
+
+        def run(batch):
+            return model(batch, classes=[0], conf=0.5, iou=0.45, device=args.device, verbose=False)
+
+        run(frames[:1])  # Warm up (also compiles exported graphs)
+
+        latencies = []
+        counts = []
+        for frame in frames:
+            t0 = time.time()
+            results = run(frame)
+            latencies.append(time.time() - t0)
+            counts.append(len(extract_boxes(results)[1]))
+        summarize_latencies(f"{backend} latency", latencies)
+
+        start = time.time()
+        for i in range(0, len(frames), args.batch):
+            run(frames[i:i + args.batch])
+        throughput = len(frames) / (time.time() - start)
+
+        if reference_counts is None:
+            reference, reference_counts = backend, counts
+        mismatched = sum(1 for a, b in zip(counts, reference_counts) if a != b)
+        print(f"{backend + ' throughput':<24} {throughput:7.2f} frames/s (batch {args.batch}) | "
+              f"count differs from {reference} on {mismatched}/{len(frames)} frames")
+    return 0
+
+
+def bench_inference_workers(args):
+    """Frames/s of one in-process model vs a shared-memory worker pool"""
+    import pickle
+    import numpy as np
+    from multiprocessing import shared_memory
+    from model_backends import load_model
+    from inference_workers import InferenceWorkerPool
+
+    print_header("Inference Worker Pool Benchmark")
+    frames = load_sample_frames(args.video, args.frames)
+    if not frames:
+        print(f"✗ Cannot read frames from {args.video}")
+        return 1
+
+    # Per-frame hand-off cost: pickling (what a plain multiprocessing queue does) vs a slot copy
+    frame = frames[0]
+    start = time.time()
+    for _ in range(50):
+        pickle.loads(pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL))
+    pickled = (time.time() - start) / 50
+    shm = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+    try:
+        view = np.ndarray(frame.shape, dtype=np.uint8, buffer=shm.buf)
+        start = time.time()
+        for _ in range(50):
+            np.copyto(view, frame)
+        copied = (time.time() - start) / 50
+        del view
+    finally:
+        shm.close()
+        shm.unlink()
+    print(f"{'pickle round trip':<24} {pickled * 1000:7.2f} ms/frame ({frame.nbytes / 1e6:.1f} MB)")
+    print(f"{'shared-memory copy':<24} {copied * 1000:7.2f} ms/frame\n")
+
+    model = load_model(args.model, args.backend)
+    model(frames[0], verbose=False)  # Warm up
+    start = time.time()
+    for frame in frames:
+        model(frame, classes=[0], conf=0.5, iou=0.45, verbose=False)
+    baseline = len(frames) / (time.time() - start)
+    print(f"{'in-process':<24} {baseline:7.2f} frames/s")
+
+    max_bytes = max(frame.nbytes for frame in frames)
+    for workers in args.workers:
+        with InferenceWorkerPool(args.model, workers=workers, backend=args.backend,
+                                 max_frame_bytes=max_bytes) as pool:
+            pool.infer_many(frames[:workers], 0.5, 0.45, timeout=60)  # Warm up every worker
+            start = time.time()
+            futures = [pool.submit(frame, 0.5, 0.45, block=True) for frame in frames]
+            for future in futures:
+                future.result()
+            throughput = len(frames) / (time.time() - start)
+        print(f"{f'{workers} workers':<24} {throughput:7.2f} frames/s ({throughput / baseline:.2f}x)")
+    return 0
+
+
+# Run in a fresh interpreter per mode; prints seconds to import app (plus the
+# mode's extra work) and peak RSS
+STARTUP_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+if sys.argv[1] == 'eager':
+    import cv2, numpy, ultralytics
+import app
+if sys.argv[1] == 'detection':
+    app.vision.start()
+elif sys.argv[1] == 'warm':
+    app.vision.warmup()
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    'seconds': elapsed,
+    'rss_mb': rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024,
+    'modules': app.loaded_modules()
+}))
+"""
+
+
+def bench_startup(args):
+    """Boot time and peak RSS of app.py per mode, each in a fresh process"""
+    print_header("Server Startup Benchmark")
+    server_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, YOLO_WARMUP='0')
+    print(f"{'mode':<12} {'import s':>9} {'process s':>10} {'RSS MB':>8}  heavy modules loaded")
+    for mode in args.modes:
+        runs = []
+        for _ in range(args.runs):
+            t0 = time.time()
+            proc = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, mode], cwd=server_dir,
+                                  env=env, capture_output=True, text=True)
+            total = time.time() - t0
+            if proc.returncode != 0:
+                print(f"✗ {mode}: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'failed'}")
+                break
+            # Server logs go to stdout too; the report is the last line
+            runs.append((total, json.loads(proc.stdout.strip().splitlines()[-1])))
+        if not runs:
+            continue
+        total, report = sorted(runs, key=lambda run: run[0])[len(runs) // 2]
+        loaded = ', '.join(name for name, is_loaded in report['modules'].items() if is_loaded) or '-'
+        print(f"{mode:<12} {report['seconds']:9.2f} {total:10.2f} {report['rss_mb']:8.0f}  {loaded}")
+    print("\neager imports the vision stack up front, as app.py did before lazy loading")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Detection pipeline benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    seek = subparsers.add_parser('seek', help='Random-seek latency with/without keyframe index')
+    seek.add_argument('--video', type=str, default=default_video_path())
+    seek.add_argument('--samples', type=int, default=200)
+    seek.add_argument('--seed', type=int, default=0)
+    seek.set_defaults(func=bench_seek)
+
+    scheduler = subparsers.add_parser('scheduler', help='Concurrent-camera throughput with micro-batching')
+    scheduler.add_argument('--video', type=str, default=default_video_path())
+    scheduler.add_argument('--model', type=str, default='yolov8n.pt')
+    scheduler.add_argument('--cameras', type=int, default=8)
+    scheduler.add_argument('--frames', type=int, default=20, help='Frames per camera')
+    scheduler.add_argument('--max-batch', type=int, default=8)
+    scheduler.add_argument('--max-wait', type=float, default=0.005)
+    scheduler.set_defaults(func=bench_scheduler)
+
+    stream = subparsers.add_parser('stream-encoding', help='SSE base64 JSON vs MJPEG bytes and CPU per frame')
+    stream.add_argument('--video', type=str, default=default_video_path())
+    stream.add_argument('--frames', type=int, default=60)
+    stream.add_argument('--repeat', type=int, default=5)
+    stream.set_defaults(func=bench_stream_encoding)
+
+    annotation = subparsers.add_parser('annotation', help='Annotation time per frame at 720p and 1080p')
+    annotation.add_argument('--people', type=int, default=15, help='Boxes drawn per frame')
+    annotation.add_argument('--frames', type=int, default=200)
+    annotation.add_argument('--seed', type=int, default=0)
+    annotation.set_defaults(func=bench_annotation)
+
+    detect_every = subparsers.add_parser('detect-every', help='Count accuracy and FPS of detect-every-N tracking')
+    detect_every.add_argument('--video', type=str, default=default_video_path())
+    detect_every.add_argument('--model', type=str, default='yolov8n.pt')
+    detect_every.add_argument('--frames', type=int, default=300)
+    detect_every.add_argument('--intervals', nargs='+', default=['1', '2', '3', '5', '10', 'auto'])
+    detect_every.add_argument('--target-fps', type=float, default=30.0)
+    detect_every.set_defaults(func=bench_detect_every)
+
+    backends = subparsers.add_parser('backends', help='Latency and throughput of torch/onnx/openvino')
+    backends.add_argument('--video', type=str, default=default_video_path())
+    backends.add_argument('--model', type=str, default='yolov8n.pt')
+    backends.add_argument('--backends', nargs='+', default=['torch', 'onnx', 'openvino'])
+    backends.add_argument('--frames', type=int, default=50)
+    backends.add_argument('--batch', type=int, default=8)
+    backends.add_argument('--device', type=str, default='cpu')
+    backends.set_defaults(func=bench_backends)
+
+    workers = subparsers.add_parser('inference-workers', help='In-process model vs shared-memory worker pool')
+    workers.add_argument('--video', type=str, default=default_video_path())
+    workers.add_argument('--model', type=str, default='yolov8n.pt')
+    workers.add_argument('--backend', type=str, default='torch')
+    workers.add_argument('--frames', type=int, default=100)
+    workers.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    workers.set_defaults(func=bench_inference_workers)
+
+    startup = subparsers.add_parser('startup', help='Server boot time and RSS per mode')
+    startup.add_argument('--modes', nargs='+', default=['chat', 'detection', 'warm', 'eager'],
+                         choices=['chat', 'detection', 'warm', 'eager'])
+    startup.add_argument('--runs', type=int, default=3, help='Runs per mode (median reported)')
+    startup.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
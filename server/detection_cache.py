@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Precomputed per-frame detection cache for recorded videos
+Runs YOLOv8 over every frame once and stores the boxes in columnar,
+memory-mapped .npy files so looping playback can skip inference:
+
+  offsets.npy  int64[total_frames + 1]  box range of frame i is offsets[i]:offsets[i+1]
+  boxes.npy    float32[N, 4]            x1, y1, x2, y2 in source pixels
+  conf.npy     float32[N]               confidence per box
+  meta.json    video size, model and thresholds
+
+Caches are keyed by video content hash, model (weights, backend and
+quantization) and thresholds.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import cv2
+import numpy as np
+
+from detection_utils import extract_boxes
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.detection_cache')
+CACHE_VERSION = 1
+
+_hash_memo = {}
+
+
+def video_hash(video_path):
+    """SHA-1 of the video file, memoized by (path, size, mtime)"""
+    stat = os.stat(video_path)
+    memo_key = (os.path.abspath(video_path), stat.st_size, int(stat.st_mtime))
+    if memo_key not in _hash_memo:
+        sha = hashlib.sha1()
+        with open(video_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(chunk)
+        _hash_memo[memo_key] = sha.hexdigest()
+    return _hash_memo[memo_key]
+
+
+def cache_key(video_path, model_name, conf_threshold, iou_threshold):
+    # Model ids like 'yolov8n.pt:onnx:int8' keep backend and quantization in the
+    # key; plain weights and ':torch' share one key
+    weights, _, variant = model_name.partition(':')
+    model_stem = os.path.splitext(os.path.basename(weights))[0]
+    if variant and variant != 'torch':
+        model_stem += '-' + variant.replace(':', '-')
+    return f"{video_hash(video_path)[:16]}_{model_stem}_c{conf_threshold:.3f}_i{iou_threshold:.3f}"
+
+
+def _load_column(path, num_rows):
+    # Empty arrays can't be memory-mapped
+    if num_rows == 0:
+        return np.load(path)
+    return np.load(path, mmap_mode='r')
+
+
+class DetectionCache:
+    """Read-only view over a precomputed detection cache directory"""
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, 'meta.json'), 'r') as f:
+            self.meta = json.load(f)
+        num_boxes = self.meta['num_boxes']
+        self.directory = directory
+        self.offsets = np.load(os.path.join(directory, 'offsets.npy'), mmap_mode='r')
+        self.boxes = _load_column(os.path.join(directory, 'boxes.npy'), num_boxes)
+        self.confs = _load_column(os.path.join(directory, 'conf.npy'), num_boxes)
+        self.total_frames = self.meta['total_frames']
+        self.width = self.meta['width']
+        self.height = self.meta['height']
+
+    @classmethod
+    def open(cls, video_path, model_name, conf_threshold, iou_threshold, cache_dir=CACHE_DIR):
+        """Return the cache for these settings, or None if the video isn't indexed"""
+        directory = os.path.join(cache_dir, cache_key(video_path, model_name, conf_threshold, iou_threshold))
+        if not os.path.exists(os.path.join(directory, 'meta.json')):
+            return None
+        try:
+            cache = cls(directory)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable detection cache {directory}: {str(e)}")
+            return None
+        if cache.meta.get('version') != CACHE_VERSION:
+            return None
+        return cache
+
+    def has_frame(self, frame_number):
+        return 0 <= frame_number < self.total_frames
+
+    def lookup(self, frame_number):
+        """
+        Cached detections for a frame
+
+        Returns:
+            (boxes, confs) as float32 arrays (boxes are xyxy pixels), or None on a miss
+        """
+        if not self.has_frame(frame_number):
+            return None
+        start, end = self.offsets[frame_number], self.offsets[frame_number + 1]
+        return self.boxes[start:end], self.confs[start:end]
+
+    def counts(self):
+        """People count for every frame"""
+        return np.diff(self.offsets)
+
+    def info(self):
+        return {
+            'key': os.path.basename(self.directory),
+            'total_frames': self.total_frames,
+            'num_boxes': self.meta['num_boxes'],
+            'model': self.meta['model'],
+            'conf_threshold': self.meta['conf_threshold'],
+            'iou_threshold': self.meta['iou_threshold']
+        }
+
+
+def build_detection_cache(video_path, model, model_name, conf_threshold, iou_threshold,
+                          cache_dir=CACHE_DIR, progress_every=300, job=None):
+    """
+    Run detection over every frame of a video and write the cache
+
+    Args:
+        video_path: Video file to index
+        model: Loaded YOLO model
+        model_name: Model id used in the cache key (e.g. 'yolov8n.pt' or 'yolov8n.pt:onnx:int8')
+        conf_threshold: Confidence threshold used for detection
+        iou_threshold: IoU threshold used for NMS
+        cache_dir: Root directory for caches
+        progress_every: Print progress every N frames (0 to disable)
+        job: Optional AnalysisJob that receives progress and can cancel
+
+    Returns:
+        DetectionCache for the new index
+    """
+    key = cache_key(video_path, model_name, conf_threshold, iou_threshold)
+    directory = os.path.join(cache_dir, key)
+    tmp_directory = directory + '.tmp'
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video: {video_path}")
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    expected_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    offsets = [0]
+    box_chunks = []
+    conf_chunks = []
+    start_time = time.time()
+
+    try:
+        while True:
+            if job:
+                job.check_cancelled()
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            results = model(
+                frame,
+                classes=[0],
+                conf=conf_threshold,
+                iou=iou_threshold,
+                verbose=False
+            )
+            boxes, confs = extract_boxes(results)
+            box_chunks.append(boxes)
+            conf_chunks.append(confs)
+            offsets.append(offsets[-1] + len(confs))
+
+            frame_count = len(offsets) - 1
+            if job:
+                job.add_samples((), (), frame_count)
+            if progress_every and frame_count % progress_every == 0:
+                print(f"Indexing: {frame_count}/{expected_frames} frames")
+    finally:
+        cap.release()
+
+    total_frames = len(offsets) - 1
+    if total_frames == 0:
+        raise IOError(f"No frames could be decoded from: {video_path}")
+
+    if os.path.exists(tmp_directory):
+        shutil.rmtree(tmp_directory)
+    os.makedirs(tmp_directory)
+
+    np.save(os.path.join(tmp_directory, 'offsets.npy'), np.asarray(offsets, dtype=np.int64))
+    np.save(os.path.join(tmp_directory, 'boxes.npy'),
+            np.concatenate(box_chunks) if box_chunks else np.zeros((0, 4), dtype=np.float32))
+    np.save(os.path.join(tmp_directory, 'conf.npy'),
+            np.concatenate(conf_chunks) if conf_chunks else np.zeros(0, dtype=np.float32))
+    with open(os.path.join(tmp_directory, 'meta.json'), 'w') as f:
+        json.dump({
+            'version': CACHE_VERSION,
+            'video': os.path.basename(video_path),
+            'video_hash': video_hash(video_path),
+            'model': model_name,
+            'conf_threshold': conf_threshold,
+            'iou_threshold': iou_threshold,
+            'width': width,
+            'height': height,
+            'total_frames': total_frames,
+            'num_boxes': offsets[-1],
+            'build_seconds': time.time() - start_time
+        }, f)
+
+    # Swap in the finished index so readers never see a partial cache
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    os.replace(tmp_directory, directory)
+
+    print(f"✓ Indexed {total_frames} frames ({offsets[-1]} boxes) in {time.time() - start_time:.1f}s")
+    return DetectionCache(directory)
+
+
+def main():
+    """Index a video from the command line"""
+    parser = argparse.ArgumentParser(description='Precompute YOLOv8 detections for a video')
+    parser.add_argument('--video', type=str, required=True, help='Video file to index')
+    parser.add_argument('--model', type=str, default='yolov8n.pt',
+                       help='YOLOv8 model path (default: yolov8n.pt)')
+    parser.add_argument('--conf', type=float, default=0.5,
+                       help='Confidence threshold (default: 0.5)')
+    parser.add_argument('--iou', type=float, default=0.45,
+                       help='IoU threshold for NMS (default: 0.45)')
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+    model = YOLO(args.model)
+    build_detection_cache(args.video, model, args.model, args.conf, args.iou)
+
+
+if __name__ == '__main__':
+    main()
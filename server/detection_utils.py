@@ -0,0 +1,99 @@
+"""
+Shared detection post-processing
+Moves YOLOv8 boxes to NumPy once per result and formats them with array
+operations instead of a Python loop over result.boxes.
+
+Boxes are passed around as (boxes, confs): float32 arrays shaped [N, 4]
+(x1, y1, x2, y2 in frame pixels) and [N].
+"""
+
+import numpy as np
+
+# Supported response formats for detections
+DETECTION_FORMATS = ('list', 'columnar')
+
+
+def empty_boxes():
+    return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32)
+
+
+def extract_boxes(results):
+    """
+    Collect all boxes from ultralytics results
+
+    Args:
+        results: Iterable of ultralytics Results (usually one per frame)
+
+    Returns:
+        (boxes, confs) float32 arrays
+    """
+    box_arrays = []
+    conf_arrays = []
+    for result in results:
+        boxes = result.boxes
+        if len(boxes) == 0:
+            continue
+        box_arrays.append(boxes.xyxy.cpu().numpy().astype(np.float32, copy=False))
+        conf_arrays.append(boxes.conf.cpu().numpy().astype(np.float32, copy=False))
+
+    if not box_arrays:
+        return empty_boxes()
+    if len(box_arrays) == 1:
+        return box_arrays[0], conf_arrays[0]
+    return np.concatenate(box_arrays), np.concatenate(conf_arrays)
+
+
+def percent_boxes(boxes, width, height):
+    """
+    Convert xyxy pixel boxes to x, y, width, height as percentages of the frame
+
+    Returns:
+        float32 array shaped [N, 4]
+    """
+    scale = np.array([100.0 / width, 100.0 / height], dtype=np.float32)
+    xy = boxes[:, :2] * scale
+    wh = (boxes[:, 2:] - boxes[:, :2]) * scale
+    return np.hstack((xy, wh))
+
+
+def detection_dicts(boxes, confs, width, height):
+    """Legacy response format: one {'x', 'y', 'width', 'height', 'confidence'} dict per box"""
+    rows = percent_boxes(boxes, width, height).tolist()
+    return [
+        {'x': x, 'y': y, 'width': w, 'height': h, 'confidence': conf}
+        for (x, y, w, h), conf in zip(rows, confs.tolist())
+    ]
+
+
+def columnar_detections(boxes, confs, width, height, decimals=2):
+    """Compact response format: parallel x[], y[], w[], h[], conf[] arrays"""
+    pct = np.round(percent_boxes(boxes, width, height), decimals)
+    return {
+        'x': pct[:, 0].tolist(),
+        'y': pct[:, 1].tolist(),
+        'w': pct[:, 2].tolist(),
+        'h': pct[:, 3].tolist(),
+        'conf': np.round(confs, 3).tolist()
+    }
+
+
+def compact_rows(boxes, confs, width, height, decimals=2):
+    """Row-wise compact format: [[x, y, w, h, conf], ...] in percentages"""
+    rows = np.round(percent_boxes(boxes, width, height), decimals)
+    return np.hstack((rows, np.round(confs, 3).reshape(-1, 1))).tolist()
+
+
+def format_detections(boxes, confs, frame_shape, fmt='list'):
+    """Format boxes for a JSON response ('list' of dicts or 'columnar' arrays)"""
+    height, width = frame_shape[:2]
+    if fmt == 'columnar':
+        return columnar_detections(boxes, confs, width, height)
+    return detection_dicts(boxes, confs, width, height)
+
+
+def bbox_dicts(boxes, confs):
+    """RealtimeDetector format: [{'bbox': (x1, y1, x2, y2), 'confidence'}] with int pixels"""
+    return [
+        {'bbox': tuple(bbox), 'confidence': conf}
+        for bbox, conf in zip(boxes.astype(np.int32).tolist(), confs.tolist())
+    ]
@@ -0,0 +1,205 @@
+"""
+Adaptive output encoding for annotated frames
+Downscales frames to a maximum width before encoding and picks the image
+format, quality and chroma subsampling per request or per session. In
+auto mode the encoder adjusts quality (and width, once quality bottoms
+out) after every frame to stay near a target bytes-per-frame budget.
+"""
+
+import time
+from collections import OrderedDict
+from threading import Lock
+
+import cv2
+
+ENCODING_FORMATS = ('jpeg', 'webp')
+MIME_TYPES = {'jpeg': 'image/jpeg', 'webp': 'image/webp'}
+# Request keys read by FrameEncoder.from_options
+ENCODING_OPTIONS = ('max_width', 'quality', 'encoding', 'chroma', 'target_kb')
+
+# Chroma subsampling modes, only available on OpenCV >= 4.5.5
+CHROMA_SUBSAMPLING = {
+    '444': getattr(cv2, 'IMWRITE_JPEG_SAMPLING_FACTOR_444', None),
+    '422': getattr(cv2, 'IMWRITE_JPEG_SAMPLING_FACTOR_422', None),
+    '420': getattr(cv2, 'IMWRITE_JPEG_SAMPLING_FACTOR_420', None),
+}
+
+MIN_QUALITY = 30
+MAX_QUALITY = 95
+# OpenCV's own JPEG default, what clients got before encoding options existed
+DEFAULT_QUALITY = 95
+MIN_WIDTH = 160
+
+
+def _as_int(value):
+    if value in (None, ''):
+        return None
+    return int(value)
+
+
+def negotiate_format(requested, accept_header=''):
+    """
+    Resolve the requested format ('jpeg', 'webp' or 'auto')
+
+    'auto' picks WebP when the client's Accept header advertises it.
+    """
+    requested = (requested or 'jpeg').lower()
+    if requested == 'jpg':
+        requested = 'jpeg'
+    if requested == 'auto':
+        return 'webp' if 'image/webp' in (accept_header or '') else 'jpeg'
+    if requested not in ENCODING_FORMATS:
+        raise ValueError(f"Unsupported encoding format: {requested}")
+    return requested
+
+
+class FrameEncoder:
+    """Encodes frames with fixed or budget-driven settings"""
+
+    def __init__(self, max_width=None, quality=DEFAULT_QUALITY, fmt='jpeg', chroma=None, target_bytes=None):
+        """
+        Args:
+            max_width: Downscale wider frames to this width (None = source size)
+            quality: Starting JPEG/WebP quality (1-100)
+            fmt: 'jpeg' or 'webp'
+            chroma: JPEG chroma subsampling '444', '422' or '420' (None = encoder default)
+            target_bytes: Bytes-per-frame budget for auto mode (None = fixed settings)
+        """
+        if fmt not in ENCODING_FORMATS:
+            raise ValueError(f"Unsupported encoding format: {fmt}")
+        if chroma is not None and chroma not in CHROMA_SUBSAMPLING:
+            raise ValueError(f"Unsupported chroma subsampling: {chroma}")
+        self.max_width = max_width
+        self.quality = max(1, min(int(quality), 100))
+        self.format = fmt
+        self.chroma = chroma
+        self.target_bytes = target_bytes
+        self.width = max_width  # Current width, lowered by auto mode
+        self._lock = Lock()
+        self.frames = 0
+        self.total_bytes = 0
+        self.total_encode_time = 0.0
+
+    @classmethod
+    def from_options(cls, options, accept_header=''):
+        """
+        Build an encoder from request options (JSON body or query args)
+
+        Recognized keys: max_width, quality, encoding ('jpeg' | 'webp' | 'auto'),
+        chroma ('444' | '422' | '420') and target_kb (enables auto mode).
+        """
+        target_kb = options.get('target_kb')
+        return cls(
+            max_width=_as_int(options.get('max_width')),
+            quality=_as_int(options.get('quality')) or DEFAULT_QUALITY,
+            fmt=negotiate_format(options.get('encoding'), accept_header),
+            chroma=options.get('chroma') or None,
+            target_bytes=int(float(target_kb) * 1024) if target_kb not in (None, '') else None
+        )
+
+    @property
+    def mime_type(self):
+        return MIME_TYPES[self.format]
+
+    def _params(self, quality):
+        if self.format == 'webp':
+            return [cv2.IMWRITE_WEBP_QUALITY, quality]
+        params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        sampling = CHROMA_SUBSAMPLING.get(self.chroma)
+        if sampling is not None:
+            params += [cv2.IMWRITE_JPEG_SAMPLING_FACTOR, sampling]
+        return params
+
+    def resize(self, frame):
+        """Downscale frame to the current width, keeping the aspect ratio"""
+        width = self.width
+        h, w = frame.shape[:2]
+        if width is None or w <= width:
+            return frame
+        height = max(1, round(h * width / w))
+        # INTER_AREA is noticeably slower and the difference is lost in JPEG
+        return cv2.resize(frame, (width, height), interpolation=cv2.INTER_LINEAR)
+
+    def encode(self, frame):
+        """
+        Encode a frame with the current settings
+
+        Returns:
+            Encoded image as bytes
+        """
+        start = time.time()
+        with self._lock:
+            quality = self.quality
+        ok, buffer = cv2.imencode('.webp' if self.format == 'webp' else '.jpg',
+                                  self.resize(frame), self._params(quality))
+        if not ok:
+            raise ValueError('Failed to encode frame')
+        data = buffer.tobytes()
+
+        with self._lock:
+            self.frames += 1
+            self.total_bytes += len(data)
+            self.total_encode_time += time.time() - start
+            if self.target_bytes:
+                self._adapt(len(data), frame.shape[1])
+        return data
+
+    def _adapt(self, size, source_width):
+        """Step quality, then width, toward the byte budget (lock held)"""
+        ratio = size / self.target_bytes
+        width = self.width or source_width
+        if ratio > 1.1:
+            if self.quality > MIN_QUALITY:
+                self.quality = max(MIN_QUALITY, self.quality - (10 if ratio > 1.5 else 5))
+            elif width > MIN_WIDTH:
+                self.width = max(MIN_WIDTH, int(width * 0.85))
+        elif ratio < 0.8:
+            limit = min(self.max_width or source_width, source_width)
+            if width < limit:
+                self.width = min(limit, int(width / 0.85) + 1)
+            elif self.quality < MAX_QUALITY:
+                self.quality = min(MAX_QUALITY, self.quality + 5)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'format': self.format,
+                'quality': self.quality,
+                'width': self.width,
+                'chroma': self.chroma,
+                'target_bytes': self.target_bytes,
+                'frames': self.frames,
+                'average_bytes': self.total_bytes / self.frames if self.frames else 0.0,
+                'average_encode_time': self.total_encode_time / self.frames if self.frames else 0.0
+            }
+
+
+class EncoderSessions:
+    """Per-session encoders so auto mode keeps adapting across polling requests"""
+
+    def __init__(self, max_sessions=64):
+        self.max_sessions = max_sessions
+        self._encoders = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, session_id, options, accept_header=''):
+        """
+        Encoder for a session, created from options on first use
+
+        Passing different encoding options for an existing session replaces its encoder.
+        """
+        key = tuple(options.get(name) for name in ENCODING_OPTIONS)
+        with self._lock:
+            entry = self._encoders.get(session_id)
+            if entry is None or entry[0] != key:
+                entry = (key, FrameEncoder.from_options(options, accept_header))
+                self._encoders[session_id] = entry
+            encoder = entry[1]
+            self._encoders.move_to_end(session_id)
+            while len(self._encoders) > self.max_sessions:
+                self._encoders.popitem(last=False)
+            return encoder
+
+    def stats(self):
+        with self._lock:
+            return {session_id: encoder.stats() for session_id, (_, encoder) in self._encoders.items()}
@@ -0,0 +1,260 @@
+"""
+Dynamic micro-batching for the shared YOLOv8 model
+Frames submitted by concurrent requests are queued and run through the
+model together, up to max_batch_size frames or max_wait seconds,
+whichever comes first. Each caller gets its own result back via a Future.
+
+The scheduler thread is the only caller of the model. Its request queue
+is bounded: when it is full, submit() raises SchedulerOverloaded at once
+instead of letting latency pile up, and callers that wait longer than
+their timeout get InferenceTimeout. Requests are enqueued under the same
+lock close() takes, so none can land behind the shutdown sentinel.
+"""
+
+import queue
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from threading import Thread, Lock, Semaphore
+
+
+class SchedulerOverloaded(RuntimeError):
+    """The request queue is full; the caller should shed load (e.g. HTTP 503)"""
+
+
+class InferenceTimeout(TimeoutError):
+    """A frame wasn't inferred within its timeout"""
+
+
+class InferenceRequest:
+    """One frame waiting for inference"""
+
+    def __init__(self, frame, conf_threshold, iou_threshold, imgsz=None, timeout=None):
+        self.frame = frame
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.imgsz = imgsz
+        self.future = Future()
+        self.submitted = time.time()
+        self.deadline = self.submitted + timeout if timeout else None
+
+    @property
+    def key(self):
+        # Only requests with the same thresholds and input size can share a forward pass
+        return (self.conf_threshold, self.iou_threshold, self.imgsz)
+
+
+class InferenceScheduler:
+    """Owns the model and batches frames from all endpoints into shared forward passes"""
+
+    def __init__(self, model, max_batch_size=8, max_wait=0.005, max_queue=32, timeout=10.0):
+        """
+        Args:
+            model: Loaded YOLO model (only the scheduler thread calls it)
+            max_batch_size: Most frames run in one forward pass
+            max_wait: Seconds to wait for more frames after the first arrives
+            max_queue: Frames allowed to wait; submit() rejects beyond this
+            timeout: Default seconds a caller waits for its result
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.timeout = timeout
+        # The queue itself is unbounded so close() never blocks on its sentinel;
+        # _capacity enforces max_queue for requests
+        self._queue = queue.Queue()
+        self._capacity = Semaphore(max_queue)
+        self._submit_lock = Lock()
+        self._stats_lock = Lock()
+        self._batches = 0
+        self._frames = 0
+        self._largest_batch = 0
+        self._inference_time = 0.0
+        self._queue_wait = 0.0
+        self._max_queue_wait = 0.0
+        self._peak_queue_depth = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._closed = False
+        self._worker = Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, frame, conf_threshold, iou_threshold, imgsz=None, timeout=None, block=False):
+        """
+        Queue a frame for person detection
+
+        Args:
+            imgsz: Model input size (None = model default)
+            timeout: Seconds until the frame is dropped unanswered (None = scheduler default)
+            block: Wait for queue space instead of raising (background work)
+
+        Returns:
+            Future resolving to the ultralytics Results for this frame
+
+        Raises:
+            SchedulerOverloaded: The queue is full and block is False
+            RuntimeError: The scheduler is closed
+        """
+        if self._closed:
+            raise RuntimeError('Inference scheduler is closed (model unloaded)')
+        request = InferenceRequest(frame, conf_threshold, iou_threshold, imgsz,
+                                   self.timeout if timeout is None else timeout)
+        if not self._capacity.acquire(blocking=block):
+            with self._stats_lock:
+                self._rejected += 1
+            raise SchedulerOverloaded(f'Inference queue full ({self.max_queue} frames waiting)')
+        with self._submit_lock:
+            if self._closed:
+                self._capacity.release()
+                raise RuntimeError('Inference scheduler is closed (model unloaded)')
+            self._queue.put(request)
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._peak_queue_depth = max(self._peak_queue_depth, depth)
+        return request.future
+
+    def _wait(self, future, timeout):
+        """Result of one future, cancelling it if the caller gives up"""
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._stats_lock:
+                self._timeouts += 1
+            raise InferenceTimeout('Timed out waiting for inference') from None
+
+    def infer(self, frame, conf_threshold, iou_threshold, timeout=None, imgsz=None, block=False):
+        """Blocking wrapper around submit()"""
+        future = self.submit(frame, conf_threshold, iou_threshold, imgsz, timeout, block)
+        return self._wait(future, timeout)
+
+    def _submit_all(self, frames, conf_threshold, iou_threshold, imgsz, timeout, block):
+        """Submit every frame or none of them"""
+        futures = []
+        try:
+            for frame in frames:
+                futures.append(self.submit(frame, conf_threshold, iou_threshold, imgsz, timeout, block))
+        except SchedulerOverloaded:
+            # All or nothing, don't spend inference on a request that failed
+            for future in futures:
+                future.cancel()
+            raise
+        return futures
+
+    def infer_many(self, frames, conf_threshold, iou_threshold, timeout=None, imgsz=None, block=False):
+        """
+        Submit several frames at once and wait for all of them
+
+        Calls with more than max_queue frames (e.g. a tiled 4K frame) run in
+        chunks of max_queue. Only the first chunk can be rejected; once it is
+        admitted, later chunks wait for queue space instead of throwing away
+        the frames already inferred.
+        """
+        # One deadline for the whole set
+        deadline = time.time() + (self.timeout if timeout is None else timeout)
+        results = []
+        for start in range(0, len(frames), self.max_queue):
+            futures = self._submit_all(frames[start:start + self.max_queue], conf_threshold, iou_threshold,
+                                       imgsz, timeout, block or start > 0)
+            results.extend(self._wait(future, max(0.0, deadline - time.time())) for future in futures)
+        return results
+
+    def close(self):
+        """Stop accepting frames; already queued frames still finish, then the worker exits"""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+
+    def _collect_batch(self):
+        """Block for the first request, then gather more until full or max_wait passes"""
+        batch = [self._queue.get()]
+        deadline = time.time() + self.max_wait
+        while len(batch) < self.max_batch_size and batch[-1] is not None:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        # Taken off the queue, so room for new requests
+        for request in batch:
+            if request is not None:
+                self._capacity.release()
+        return batch
+
+    def _run(self):
+        running = True
+        while running:
+            batch = self._collect_batch()
+            if batch[-1] is None:
+                # close() sentinel, queued after every accepted request
+                batch.pop()
+                running = False
+
+            groups = {}
+            for request in batch:
+                groups.setdefault(request.key, []).append(request)
+
+            for (conf_threshold, iou_threshold, imgsz), requests in groups.items():
+                start_time = time.time()
+                live = []
+                for request in requests:
+                    if not request.future.set_running_or_notify_cancel():
+                        continue  # Caller gave up
+                    if request.deadline and start_time > request.deadline:
+                        request.future.set_exception(InferenceTimeout('Expired in the inference queue'))
+                        continue
+                    live.append(request)
+                requests = live
+                if not requests:
+                    continue
+                waits = [start_time - r.submitted for r in requests]
+                with self._stats_lock:
+                    self._queue_wait += sum(waits)
+                    self._max_queue_wait = max(self._max_queue_wait, max(waits))
+                options = {'imgsz': imgsz} if imgsz else {}
+                try:
+                    results = self.model(
+                        [r.frame for r in requests],
+                        classes=[0],  # class 0 = person
+                        conf=conf_threshold,
+                        iou=iou_threshold,
+                        verbose=False,
+                        **options
+                    )
+                except Exception as e:
+                    for request in requests:
+                        request.future.set_exception(e)
+                    continue
+
+                elapsed = time.time() - start_time
+                with self._stats_lock:
+                    self._batches += 1
+                    self._frames += len(requests)
+                    self._largest_batch = max(self._largest_batch, len(requests))
+                    self._inference_time += elapsed
+
+                for request, result in zip(requests, results):
+                    request.future.set_result(result)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'batches': self._batches,
+                'frames': self._frames,
+                'average_batch_size': self._frames / self._batches if self._batches else 0.0,
+                'largest_batch': self._largest_batch,
+                'inference_time': self._inference_time,
+                'queue_depth': self._queue.qsize(),
+                'peak_queue_depth': self._peak_queue_depth,
+                'max_queue': self.max_queue,
+                'average_queue_wait': self._queue_wait / self._frames if self._frames else 0.0,
+                'max_queue_wait': self._max_queue_wait,
+                'rejected': self._rejected,
+                'timeouts': self._timeouts,
+                'max_batch_size': self.max_batch_size,
+                'max_wait': self.max_wait
+            }
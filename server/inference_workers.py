@@ -0,0 +1,420 @@
+"""
+Multi-process inference with shared-memory frame transfer
+A pool of worker processes, each with its own YOLOv8 model, so detection
+uses more cores than one process's pre/post-processing and intra-op
+threads allow. Frames are copied once into preallocated
+multiprocessing.shared_memory slots and workers read them in place; only
+a small task tuple goes through the worker's task queue, and each worker
+returns float32 (boxes, confs) through a shared result queue. A slot is
+reused as soon as its result arrives. When a worker dies, its frames
+fail, its slots are reclaimed and it is restarted (up to max_restarts).
+
+Overload follows InferenceScheduler: when every slot is in flight,
+submit() raises SchedulerOverloaded unless block=True, and infer_many()
+reserves slots for all its frames or rejects the whole call.
+"""
+
+import contextlib
+import itertools
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from multiprocessing import shared_memory
+from threading import Lock, Thread
+
+import numpy as np
+
+from inference_scheduler import InferenceTimeout, SchedulerOverloaded
+from model_backends import export_model, resolve_weights
+
+
+def _worker_main(model_path, backend, quantize, device, num_threads, slot_names, tasks, results, status):
+    """Worker process: load the model, then run tasks until the None sentinel"""
+    # Before torch/onnxruntime are imported, or every worker spawns one thread per core
+    os.environ['OMP_NUM_THREADS'] = str(num_threads)
+    try:
+        from detection_utils import extract_boxes
+        from model_backends import load_model
+
+        model = load_model(model_path, backend, quantize)
+        if backend == 'torch' and not quantize:
+            import torch
+            torch.set_num_threads(num_threads)
+            model.to(device)
+        slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    except Exception as e:
+        status.put((os.getpid(), repr(e)))
+        return
+    status.put((os.getpid(), None))
+
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            task_id, slot, shape, conf_threshold, iou_threshold, imgsz = task
+            # View straight into the shared slot, no copy
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=slots[slot].buf)
+            options = {'imgsz': imgsz} if imgsz else {}
+            try:
+                boxes, confs = extract_boxes(model(
+                    frame,
+                    classes=[0],
+                    conf=conf_threshold,
+                    iou=iou_threshold,
+                    verbose=False,
+                    **options
+                ))
+                results.put((task_id, slot, boxes, confs, None))
+            except Exception as e:
+                results.put((task_id, slot, None, None, repr(e)))
+            del frame
+    finally:
+        for shm in slots:
+            shm.close()
+
+
+class InferenceWorkerPool:
+    """Worker processes fed through shared-memory frame slots"""
+
+    def __init__(self, model_path='yolov8n.pt', workers=None, backend='torch', quantize=None, device='cpu',
+                 slots_per_worker=2, max_frame_bytes=1920 * 1080 * 3, timeout=10.0, start_timeout=600.0,
+                 max_restarts=3):
+        """
+        Args:
+            model_path: YOLOv8 weights each worker loads
+            workers: Number of worker processes (default: CPU count // 2)
+            backend: 'torch', 'onnx' or 'openvino' (export once in the parent first)
+            quantize: 'int8' for the INT8 ONNX model
+            device: Torch device for the workers
+            slots_per_worker: Frames in flight per worker; also the queue bound
+            max_frame_bytes: Size of each shared slot; larger frames don't fit()
+            timeout: Default seconds a caller waits for a result
+            start_timeout: Seconds to wait for all workers to load their model
+            max_restarts: Times a crashed worker is replaced before the pool runs without it
+        """
+        # Download, export or quantize once here so the workers only load the cached artifact
+        model_path = resolve_weights(model_path)
+        if quantize:
+            from quantization import quantize_int8
+            quantize_int8(model_path)
+        elif backend != 'torch':
+            export_model(model_path, backend)
+        self.model_path = model_path
+        self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        self.max_frame_bytes = max_frame_bytes
+        self.timeout = timeout
+        self.max_restarts = max_restarts
+        # spawn avoids forking a parent that already initialized torch/OpenCV threads
+        self._context = multiprocessing.get_context('spawn')
+        # Worker arguments other than its task queue, reused when a crashed worker is replaced
+        self._worker_args = (model_path, backend, quantize, device,
+                             max(1, (os.cpu_count() or 1) // self.workers))
+
+        self._slots = []
+        self._processes = []
+        self._task_queues = []  # One per worker, so a dead worker's tasks are known
+        self._closed = False
+        self._results = self._context.Queue()
+        self._status = self._context.Queue()
+        # If a slot or worker fails to start, close() unlinks the slots already created
+        try:
+            for _ in range(self.workers * slots_per_worker):
+                self._slots.append(shared_memory.SharedMemory(create=True, size=max_frame_bytes))
+            self._free = queue.Queue()
+            for slot in range(len(self._slots)):
+                self._free.put(slot)
+            for _ in range(self.workers):
+                self._processes.append(None)
+                self._task_queues.append(None)
+                self._start_worker(len(self._processes) - 1)
+
+            for _ in self._processes:
+                _, error = self._status.get(timeout=start_timeout)
+                if error:
+                    raise RuntimeError(f"Inference worker failed to start: {error}")
+        except Exception:
+            self.close()
+            raise
+
+        self._lock = Lock()
+        self._reserve_lock = Lock()
+        self._pending = {}  # task_id -> (Future, submit time, slot, worker)
+        self._in_flight = [0] * self.workers
+        self._task_ids = itertools.count()
+        self._restarts = 0
+        self._leases = 0
+        self._retired = False
+        self._frames = 0
+        self._errors = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._latency = 0.0
+        self._collector = Thread(target=self._collect, daemon=True)
+        self._collector.start()
+        print(f"✓ {self.workers} inference workers ready ({len(self._slots)} shared frame slots)")
+
+    def _start_worker(self, index):
+        """Start (or replace) worker index with a fresh task queue"""
+        tasks = self._context.Queue()
+        model_path, backend, quantize, device, num_threads = self._worker_args
+        process = self._context.Process(
+            target=_worker_main,
+            args=(model_path, backend, quantize, device, num_threads,
+                  [shm.name for shm in self._slots], tasks, self._results, self._status),
+            daemon=True
+        )
+        process.start()
+        self._task_queues[index] = tasks
+        self._processes[index] = process
+
+    def fits(self, frame):
+        """True if the frame fits a shared slot"""
+        return frame.dtype == np.uint8 and frame.nbytes <= self.max_frame_bytes
+
+    def _check(self, frame):
+        if self._closed:
+            raise RuntimeError('Inference worker pool is closed')
+        if not self.fits(frame):
+            raise ValueError(f"Frame of {frame.nbytes} bytes doesn't fit a {self.max_frame_bytes}-byte slot")
+
+    def _reserve(self, count, block):
+        """Take count free slots, or none of them"""
+        slots = []
+        # One blocking caller reserves at a time, so two partial reservations never wait on each other
+        with self._reserve_lock if block else contextlib.nullcontext():
+            try:
+                while len(slots) < count:
+                    if block:
+                        # Wake up now and then: the pool may close or lose every worker meanwhile
+                        try:
+                            slots.append(self._free.get(timeout=0.5))
+                        except queue.Empty:
+                            if self._closed or not self._live_workers():
+                                raise RuntimeError('Inference worker pool is closed or has no live workers')
+                    else:
+                        slots.append(self._free.get(block=False))
+            except RuntimeError:
+                for slot in slots:
+                    self._free.put(slot)
+                raise
+            except queue.Empty:
+                for slot in slots:
+                    self._free.put(slot)
+                with self._lock:
+                    self._rejected += 1
+                raise SchedulerOverloaded(f'All {len(self._slots)} worker frame slots are busy') from None
+        return slots
+
+    def _dispatch(self, frame, slot, conf_threshold, iou_threshold, imgsz):
+        """Copy a frame into its reserved slot and queue it for a worker"""
+        view = np.ndarray(frame.shape, dtype=np.uint8, buffer=self._slots[slot].buf)
+        np.copyto(view, frame)
+        del view
+
+        future = Future()
+        # Results arrive from the collector thread; callers can't cancel a frame a worker may hold
+        future.set_running_or_notify_cancel()
+        with self._lock:
+            live = self._live_workers()
+            if not live:
+                self._free.put(slot)
+                raise RuntimeError('No live inference workers')
+            # Least busy live worker
+            worker = min(live, key=lambda index: self._in_flight[index])
+            task_id = next(self._task_ids)
+            self._pending[task_id] = (future, time.time(), slot, worker)
+            self._in_flight[worker] += 1
+            # Under the lock, so a worker found dead can't miss a task queued for it
+            self._task_queues[worker].put((task_id, slot, frame.shape, conf_threshold, iou_threshold, imgsz))
+        return future
+
+    def _live_workers(self):
+        return [index for index, process in enumerate(self._processes)
+                if process is not None and process.is_alive()]
+
+    def submit(self, frame, conf_threshold, iou_threshold, imgsz=None, block=False):
+        """
+        Copy a frame into a free slot and queue it for a worker
+
+        Returns:
+            Future resolving to (boxes, confs)
+
+        Raises:
+            SchedulerOverloaded: Every slot is in flight and block is False
+        """
+        self._check(frame)
+        slot, = self._reserve(1, block)
+        return self._dispatch(frame, slot, conf_threshold, iou_threshold, imgsz)
+
+    def wait(self, future, timeout=None):
+        """
+        Result of a future from submit()
+
+        Raises:
+            InferenceTimeout: No result within timeout (default: the pool's timeout)
+        """
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            with self._lock:
+                self._timeouts += 1
+            raise InferenceTimeout('Timed out waiting for an inference worker') from None
+
+    def infer(self, frame, conf_threshold, iou_threshold, timeout=None, imgsz=None, block=False):
+        """Blocking wrapper around submit(), returns (boxes, confs)"""
+        return self.wait(self.submit(frame, conf_threshold, iou_threshold, imgsz, block), timeout)
+
+    def infer_many(self, frames, conf_threshold, iou_threshold, timeout=None, imgsz=None, block=False):
+        """
+        Spread frames over the workers and wait for all of them
+
+        Slots for the whole call are reserved before any frame is sent, so a
+        rejected call leaves nothing running. Calls with more frames than
+        slots run in chunks; only the first chunk can be rejected.
+        """
+        for frame in frames:
+            self._check(frame)
+        deadline = time.time() + (self.timeout if timeout is None else timeout)
+        results = []
+        for start in range(0, len(frames), len(self._slots)):
+            chunk = frames[start:start + len(self._slots)]
+            slots = self._reserve(len(chunk), block or start > 0)
+            futures = []
+            try:
+                for frame, slot in zip(chunk, slots):
+                    futures.append(self._dispatch(frame, slot, conf_threshold, iou_threshold, imgsz))
+            except RuntimeError:
+                # No live worker left; the failed dispatch already returned its own slot
+                for slot in slots[len(futures) + 1:]:
+                    self._free.put(slot)
+                raise
+            results.extend(self.wait(future, max(0.0, deadline - time.time())) for future in futures)
+        return results
+
+    def _collect(self):
+        """Resolve futures from worker results, hand their slots back and watch for dead workers"""
+        while True:
+            try:
+                item = self._results.get(timeout=1.0)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                self._resolve(*item)
+            if not self._closed:
+                self._check_workers()
+
+    def _resolve(self, task_id, slot, boxes, confs, error):
+        with self._lock:
+            pending = self._pending.pop(task_id, None)
+            if pending is None:
+                # Already failed when its worker was found dead
+                return
+            future, submitted, _, worker = pending
+            self._in_flight[worker] -= 1
+            self._frames += 1
+            self._latency += time.time() - submitted
+            if error:
+                self._errors += 1
+        self._free.put(slot)
+        if error:
+            future.set_exception(RuntimeError(f"Inference worker error: {error}"))
+        else:
+            future.set_result((boxes, confs))
+
+    def _check_workers(self):
+        """Fail the tasks of crashed workers, reclaim their slots and replace them"""
+        for index, process in enumerate(self._processes):
+            if process is None or process.is_alive():
+                continue
+            with self._lock:
+                lost = [(task_id, entry) for task_id, entry in self._pending.items() if entry[3] == index]
+                for task_id, _ in lost:
+                    del self._pending[task_id]
+                self._in_flight[index] = 0
+                self._errors += len(lost)
+                restart = self._restarts < self.max_restarts
+                if restart:
+                    self._restarts += 1
+                else:
+                    self._processes[index] = None
+            print(f"✗ Inference worker {process.pid} exited ({process.exitcode}), "
+                  f"{len(lost)} frames failed{'; restarting it' if restart else ''}")
+            # The dead process can't touch its slots any more
+            for _, (future, _, slot, _) in lost:
+                self._free.put(slot)
+                future.set_exception(RuntimeError('Inference worker died'))
+            if restart:
+                self._start_worker(index)
+
+    def acquire(self):
+        """Keep the pool open until a matching release(), even if it is retired meanwhile"""
+        with self._lock:
+            self._leases += 1
+
+    def release(self):
+        with self._lock:
+            self._leases -= 1
+            idle = self._retired and self._leases == 0
+        if idle:
+            # Off the caller's thread, stopping workers can take seconds
+            Thread(target=self.close, daemon=True).start()
+
+    def retire(self):
+        """Close the pool once every acquire() has been released (now if none is held)"""
+        with self._lock:
+            self._retired = True
+            idle = self._leases == 0
+        if idle:
+            Thread(target=self.close, daemon=True).start()
+
+    def close(self):
+        """Stop the workers, fail frames still in flight and release the shared memory"""
+        if self._closed:
+            return
+        self._closed = True
+        for tasks in self._task_queues:
+            if tasks is not None:
+                tasks.put(None)
+        for process in self._processes:
+            if process is None:
+                continue
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        if getattr(self, '_collector', None) is not None:
+            self._results.put(None)
+            self._collector.join(timeout=5)
+            with self._lock:
+                lost, self._pending = list(self._pending.values()), {}
+            for future, _, _, _ in lost:
+                future.set_exception(RuntimeError('Inference worker pool closed'))
+        for shm in self._slots:
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'alive_workers': len(self._live_workers()),
+                'restarts': self._restarts,
+                'slots': len(self._slots),
+                'in_flight': len(self._pending),
+                'slot_mb': self.max_frame_bytes / (1024 * 1024),
+                'frames': self._frames,
+                'average_latency': self._latency / self._frames if self._frames else 0.0,
+                'errors': self._errors,
+                'rejected': self._rejected,
+                'timeouts': self._timeouts
+            }
@@ -0,0 +1,42 @@
+"""
+Deferred imports for the vision stack
+cv2, numpy and ultralytics (which pulls in torch) take seconds and
+hundreds of MB to import. lazy_import() returns a module object right
+away and runs the real import on the first attribute access, so a worker
+that only serves chat routes never loads them.
+"""
+
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """
+    Import a module on first attribute access
+
+    Returns:
+        The module (already imported, or a lazy placeholder registered in sys.modules)
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def is_loaded(name):
+    """True once the module has really been imported (not just registered lazily)"""
+    module = sys.modules.get(name)
+    # LazyLoader swaps the placeholder class back to ModuleType after loading
+    return module is not None and type(module).__name__ != '_LazyModule'
+
+
+def loaded_modules(names=('cv2', 'numpy', 'torch', 'ultralytics')):
+    """Which of the heavy modules this process has actually imported"""
+    return {name: is_loaded(name) for name in names}
@@ -0,0 +1,107 @@
+"""
+Pluggable inference backends for YOLOv8
+Exports the PyTorch weights once to ONNX or OpenVINO with ultralytics'
+model.export(), caches the artifact on disk keyed by the weights' content,
+and loads it back through YOLO() so callers keep the same predict API and
+detection output as the torch backend.
+"""
+
+import hashlib
+import os
+import shutil
+
+BACKENDS = ('torch', 'onnx', 'openvino')
+QUANTIZATION_MODES = (None, 'int8')
+EXPORT_FORMATS = {'onnx': 'onnx', 'openvino': 'openvino'}
+MODEL_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.model_cache')
+
+
+def resolve_weights(model_path):
+    """
+    Local path of the weights, downloading official YOLOv8 weights on first use
+
+    Exports are keyed by the weights' content, so they must be on disk
+    before any artifact path is computed.
+    """
+    if os.path.exists(model_path):
+        return model_path
+    from ultralytics.utils.downloads import attempt_download_asset
+    return str(attempt_download_asset(model_path))
+
+
+def _weights_digest(model_path):
+    """Short SHA-1 of the weights file (downloaded first if needed)"""
+    sha = hashlib.sha1()
+    with open(resolve_weights(model_path), 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()[:12]
+
+
+def artifact_path(model_path, backend, cache_dir=MODEL_CACHE_DIR):
+    """Where the exported model for these weights and backend is cached"""
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    name = f"{stem}_{_weights_digest(model_path)}"
+    if backend == 'onnx':
+        return os.path.join(cache_dir, name + '.onnx')
+    return os.path.join(cache_dir, name + '_openvino_model')
+
+
+def export_model(model_path, backend, cache_dir=MODEL_CACHE_DIR):
+    """
+    Export weights to the backend's format, reusing a cached export
+
+    Returns:
+        Path to the exported model (file for ONNX, directory for OpenVINO)
+    """
+    if backend not in EXPORT_FORMATS:
+        raise ValueError(f"Backend {backend!r} has no export format")
+    target = artifact_path(model_path, backend, cache_dir)
+    if os.path.exists(target):
+        return target
+
+    from ultralytics import YOLO
+
+    print(f"Exporting {model_path} to {backend} (one time)...")
+    # Dynamic shapes keep batching and adaptive imgsz working after export
+    exported = YOLO(model_path).export(format=EXPORT_FORMATS[backend], dynamic=True, verbose=False)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_target = target + '.tmp'
+    if os.path.isdir(tmp_target):
+        shutil.rmtree(tmp_target)
+    elif os.path.exists(tmp_target):
+        os.remove(tmp_target)
+    shutil.move(str(exported), tmp_target)
+    os.replace(tmp_target, target)
+    print(f"✓ Cached {backend} model at {target}")
+    return target
+
+
+def load_model(model_path='yolov8n.pt', backend='torch', quantize=None):
+    """
+    Load YOLOv8 for inference on the given backend
+
+    Args:
+        model_path: YOLOv8 weights
+        backend: 'torch', 'onnx' or 'openvino'
+        quantize: 'int8' to serve a calibrated INT8 model (runs on ONNX Runtime)
+
+    Returns:
+        ultralytics YOLO model; exported backends are called exactly like torch
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    if quantize not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization {quantize!r}, expected 'int8'")
+
+    from ultralytics import YOLO
+
+    if quantize == 'int8':
+        if backend != 'onnx':
+            print(f"INT8 models run on ONNX Runtime, ignoring backend {backend!r}")
+        from quantization import quantize_int8
+        return YOLO(quantize_int8(model_path), task='detect')
+    if backend == 'torch':
+        return YOLO(model_path)
+    return YOLO(export_model(model_path, backend), task='detect')
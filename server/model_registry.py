@@ -0,0 +1,270 @@
+"""
+Resident YOLOv8 models for the server
+Keeps several models (yolov8n/s/m, torch/onnx/openvino, int8) loaded at
+the same time, each behind its own InferenceScheduler, so requests and
+streams can pick a model without reloading. When the estimated memory of
+the resident models exceeds the budget, the least recently used model
+that isn't pinned is unloaded. Every model runs one dummy inference on
+load, so graph setup and runtime compilation don't land on the first
+real request. Callers hold a model with lease(); an evicted model's
+scheduler is only closed once its last lease is released.
+
+Models are named by an id: 'yolov8s.pt', 'yolov8s.pt:onnx' or
+'yolov8n.pt:onnx:int8' (weights, backend, quantization).
+"""
+
+import contextlib
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+
+from inference_scheduler import InferenceScheduler
+from model_backends import BACKENDS, QUANTIZATION_MODES, artifact_path, load_model
+
+DEFAULT_ALLOWED_WEIGHTS = ('yolov8n.pt', 'yolov8s.pt', 'yolov8m.pt')
+
+
+def parse_model_id(model_id, default_backend='torch'):
+    """
+    Split a model id into its parts
+
+    Returns:
+        (weights, backend, quantize)
+    """
+    parts = str(model_id).strip().split(':')
+    if len(parts) > 3 or not parts[0]:
+        raise ValueError(f"Invalid model id {model_id!r}, expected weights[:backend[:int8]]")
+    weights = parts[0]
+    backend = parts[1] if len(parts) > 1 and parts[1] else default_backend
+    quantize = parts[2] if len(parts) > 2 and parts[2] else None
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    if quantize not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization {quantize!r}, expected 'int8'")
+    if quantize:
+        # Quantized models always run on ONNX Runtime
+        backend = 'onnx'
+    return weights, backend, quantize
+
+
+def format_model_id(weights, backend='torch', quantize=None):
+    """Canonical id for a (weights, backend, quantize) triple"""
+    return f"{weights}:{backend}:{quantize}" if quantize else f"{weights}:{backend}"
+
+
+def _path_size(path):
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(path)
+            for name in names
+        )
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def estimate_model_bytes(model, weights, backend, quantize):
+    """Resident size estimate: parameter bytes for torch, artifact size for exported models"""
+    if backend == 'torch' and not quantize:
+        try:
+            return sum(p.numel() * p.element_size() for p in model.model.parameters())
+        except (AttributeError, TypeError):
+            return _path_size(weights)
+    if quantize:
+        from quantization import int8_path
+        return _path_size(int8_path(weights))
+    return _path_size(artifact_path(weights, backend))
+
+
+class ModelEntry:
+    """One resident model and the scheduler that owns it"""
+
+    def __init__(self, model_id, model, scheduler, size_bytes, load_time):
+        self.model_id = model_id
+        self.model = model
+        self.scheduler = scheduler
+        self.size_bytes = size_bytes
+        self.load_time = load_time
+        self.last_used = time.time()
+        self.uses = 0
+        self.leases = 0  # Callers currently using the scheduler
+        self.removed = False
+
+    def info(self):
+        return {
+            'model': self.model_id,
+            'leases': self.leases,
+            'size_mb': self.size_bytes / (1024 * 1024),
+            'load_time': self.load_time,
+            'last_used': self.last_used,
+            'uses': self.uses,
+            'scheduler': self.scheduler.stats()
+        }
+
+
+class ModelRegistry:
+    """Loads models on demand and keeps them within a memory budget (LRU eviction)"""
+
+    def __init__(self, allowed_weights=DEFAULT_ALLOWED_WEIGHTS, memory_budget_mb=1024, default_backend='torch',
+                 warmup_size=640, max_batch_size=8, max_wait=0.005, max_queue=32, timeout=10.0):
+        """
+        Args:
+            allowed_weights: Weights files requests may select (others are rejected)
+            memory_budget_mb: Evict least recently used models above this estimate
+            default_backend: Backend for ids that don't name one
+            warmup_size: Side of the blank frame used to warm up new models
+            max_batch_size: Passed to each model's InferenceScheduler
+            max_wait: Passed to each model's InferenceScheduler
+            max_queue: Frames allowed to wait per model before submit() rejects
+            timeout: Default seconds a caller waits for a result
+        """
+        self.allowed_weights = tuple(allowed_weights)
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.default_backend = default_backend
+        self.warmup_size = warmup_size
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._entries = OrderedDict()  # model_id -> ModelEntry, least recently used first
+        self._pinned = set()
+        self._lock = Lock()
+        # Loads are serialized so two requests for a new model load it once
+        self._load_lock = Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def resolve(self, model_id):
+        """Validate a model id and return its canonical form"""
+        weights, backend, quantize = parse_model_id(model_id, self.default_backend)
+        if weights not in self.allowed_weights:
+            raise ValueError(f"Model {weights!r} is not allowed, expected one of {', '.join(self.allowed_weights)}")
+        return format_model_id(weights, backend, quantize)
+
+    def get(self, model_id):
+        """
+        Resident entry for model_id, loading and warming it up on first use
+
+        The entry may be evicted as soon as this returns; use lease() to run
+        inference on it.
+
+        Returns:
+            ModelEntry
+        """
+        return self._acquire(model_id, lease=False)
+
+    @contextlib.contextmanager
+    def lease(self, model_id):
+        """Resident entry for model_id whose scheduler stays open until the block exits"""
+        entry = self._acquire(model_id, lease=True)
+        try:
+            yield entry
+        finally:
+            self._release(entry)
+
+    def _acquire(self, model_id, lease):
+        model_id = self.resolve(model_id)
+        with self._lock:
+            entry = self._entries.get(model_id)
+            if entry is not None:
+                return self._use(entry, lease)
+
+        with self._load_lock:
+            with self._lock:
+                entry = self._entries.get(model_id)
+                if entry is not None:
+                    return self._use(entry, lease)
+            entry = self._load(model_id)
+            with self._lock:
+                self._entries[model_id] = entry
+                self.loads += 1
+                self._evict_over_budget(keep=model_id)
+                return self._use(entry, lease)
+
+    def _use(self, entry, lease):
+        """Mark an entry used and optionally leased (caller holds _lock)"""
+        self._touch(entry)
+        if lease:
+            entry.leases += 1
+        return entry
+
+    def _release(self, entry):
+        with self._lock:
+            entry.leases -= 1
+            close = entry.removed and entry.leases == 0
+        if close:
+            entry.scheduler.close()
+
+    def _touch(self, entry):
+        entry.last_used = time.time()
+        entry.uses += 1
+        self._entries.move_to_end(entry.model_id)
+
+    def _load(self, model_id):
+        weights, backend, quantize = parse_model_id(model_id)
+        print(f"Loading model {model_id}...")
+        start_time = time.time()
+        model = load_model(weights, backend, quantize)
+        # Blank frame through the full predict path: builds the predictor,
+        # allocates buffers and compiles exported graphs
+        blank = np.zeros((self.warmup_size, self.warmup_size, 3), dtype=np.uint8)
+        model(blank, classes=[0], verbose=False)
+        load_time = time.time() - start_time
+        scheduler = InferenceScheduler(model, max_batch_size=self.max_batch_size, max_wait=self.max_wait,
+                                       max_queue=self.max_queue, timeout=self.timeout)
+        size_bytes = estimate_model_bytes(model, weights, backend, quantize)
+        print(f"✓ Model {model_id} ready ({load_time:.1f}s, ~{size_bytes / (1024 * 1024):.0f} MB)")
+        return ModelEntry(model_id, model, scheduler, size_bytes, load_time)
+
+    def _evict_over_budget(self, keep):
+        """Unload least recently used unpinned models until within budget (caller holds _lock)"""
+        total = sum(entry.size_bytes for entry in self._entries.values())
+        for model_id in list(self._entries):
+            if total <= self.memory_budget:
+                break
+            if model_id == keep or model_id in self._pinned:
+                continue
+            total -= self._remove(model_id).size_bytes
+
+    def _remove(self, model_id):
+        entry = self._entries.pop(model_id)
+        entry.removed = True
+        # Requests holding a lease keep the scheduler until they release it;
+        # frames already queued still finish on the old model
+        if entry.leases == 0:
+            entry.scheduler.close()
+        self.evictions += 1
+        print(f"Unloaded model {model_id}")
+        return entry
+
+    def pin(self, model_id):
+        """Never evict this model (the server's default)"""
+        with self._lock:
+            self._pinned.add(self.resolve(model_id))
+
+    def unpin(self, model_id):
+        with self._lock:
+            self._pinned.discard(self.resolve(model_id))
+
+    def evict(self, model_id):
+        """Unload a model now; returns False if it wasn't resident or is pinned"""
+        model_id = self.resolve(model_id)
+        with self._lock:
+            if model_id not in self._entries or model_id in self._pinned:
+                return False
+            self._remove(model_id)
+            return True
+
+    def stats(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            return {
+                'models': [dict(entry.info(), pinned=entry.model_id in self._pinned) for entry in entries],
+                'allowed_weights': list(self.allowed_weights),
+                'memory_mb': sum(entry.size_bytes for entry in entries) / (1024 * 1024),
+                'memory_budget_mb': self.memory_budget / (1024 * 1024),
+                'loads': self.loads,
+                'evictions': self.evictions
+            }
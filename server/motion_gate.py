@@ -0,0 +1,162 @@
+"""
+Motion-gated inference for static camera views
+Compares a small grayscale copy of each frame with a running background
+and skips inference, reusing the previous detections, while the scene
+stays still. Inference is still forced every refresh_interval frames so
+slow changes and people standing still are not missed forever.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Decides per frame whether anything changed enough to run the detector"""
+
+    def __init__(self, threshold=0.01, pixel_delta=25, width=160, learning_rate=0.05, refresh_interval=30):
+        """
+        Args:
+            threshold: Fraction of changed pixels that counts as motion
+            pixel_delta: Grayscale difference for a pixel to count as changed
+            width: Width of the downscaled comparison frame
+            learning_rate: How fast the background absorbs the current frame
+            refresh_interval: Force inference after this many skipped frames
+        """
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.width = width
+        self.learning_rate = learning_rate
+        self.refresh_interval = refresh_interval
+        self.background = None
+        self.since_inference = 0
+        self.last_score = 0.0
+        self.inferred = 0
+        self.skipped = 0
+
+    def _small_gray(self, frame):
+        h, w = frame.shape[:2]
+        height = max(1, round(h * self.width / w))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+    def should_infer(self, frame):
+        """Update the background with frame and return True if inference should run"""
+        gray = self._small_gray(frame)
+        if self.background is None or self.background.shape != gray.shape:
+            self.background = gray.astype(np.float32)
+            self.last_score = 1.0
+        else:
+            diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+            self.last_score = np.count_nonzero(diff > self.pixel_delta) / diff.size
+            cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+
+        if self.last_score >= self.threshold or self.since_inference + 1 >= self.refresh_interval \
+                or self.inferred == 0:
+            self.since_inference = 0
+            self.inferred += 1
+            return True
+        self.since_inference += 1
+        self.skipped += 1
+        return False
+
+    def reset(self):
+        """Forget the background so the next frame is always inferred"""
+        self.background = None
+        self.since_inference = 0
+        self.inferred = 0
+        self.skipped = 0
+
+    def stats(self):
+        frames = self.inferred + self.skipped
+        return {
+            'inferred_frames': self.inferred,
+            'skipped_frames': self.skipped,
+            'skip_ratio': self.skipped / frames if frames else 0.0,
+            'last_motion': self.last_score,
+            'threshold': self.threshold,
+            'refresh_interval': self.refresh_interval
+        }
+
+
+class GatedDetector:
+    """
+    Wraps a detect function (frame -> (boxes, confs)) with a MotionGate
+
+    Thread-safe, so one instance can serve a polling endpoint.
+    """
+
+    def __init__(self, detect_fn, gate=None):
+        self.detect_fn = detect_fn
+        self.gate = gate or MotionGate()
+        self.last = None
+        self.last_inferred = False
+        self._lock = Lock()
+
+    def __call__(self, frame):
+        with self._lock:
+            infer = self.gate.should_infer(frame) or self.last is None
+        if infer:
+            result = self.detect_fn(frame)
+            with self._lock:
+                self.last = result
+                self.last_inferred = True
+            return result
+        with self._lock:
+            self.last_inferred = False
+            return self.last
+
+    def reset(self):
+        with self._lock:
+            self.gate.reset()
+            self.last = None
+
+    def stats(self):
+        with self._lock:
+            return self.gate.stats()
+
+
+class GateSessions:
+    """
+    Per-session gated detectors so polling clients don't share a background
+
+    Keys are (session_id, model, video_path): each client, model and video
+    gets its own background and reused detections. Least recently used
+    sessions are dropped beyond max_sessions.
+    """
+
+    def __init__(self, max_sessions=64):
+        self.max_sessions = max_sessions
+        self._gates = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, detect_fn):
+        """Gated detector for a key, created around detect_fn on first use"""
+        with self._lock:
+            gate = self._gates.get(key)
+            if gate is None:
+                gate = GatedDetector(detect_fn)
+                self._gates[key] = gate
+            self._gates.move_to_end(key)
+            while len(self._gates) > self.max_sessions:
+                self._gates.popitem(last=False)
+            return gate
+
+    def reset(self):
+        """Forget every session (thresholds changed)"""
+        with self._lock:
+            self._gates.clear()
+
+    def stats(self):
+        with self._lock:
+            gates = list(self._gates.items())
+        return {
+            'sessions': len(gates),
+            'max_sessions': self.max_sessions,
+            'per_session': {
+                f"{session_id}:{model or 'default'}": gate.stats()
+                for (session_id, model, _), gate in gates
+            }
+        }
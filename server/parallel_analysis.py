@@ -0,0 +1,181 @@
+"""
+Segment-parallel video analysis
+Splits a video into keyframe-aligned segments and analyzes each one in a
+separate worker process with its own YOLOv8 model (on any model_backends
+backend), then merges the per-frame results back in frame order.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from detection_utils import extract_boxes
+from model_backends import export_model, load_model, resolve_weights
+from seek_index import get_seek_index
+
+# Per-process model, loaded once by the pool initializer
+_worker_model = None
+
+
+def _init_worker(model_path, backend, quantize, device, num_threads):
+    """Load the model in a worker process and pin its intra-op thread count"""
+    global _worker_model
+    # Without this every worker spawns one thread per core and they thrash
+    # (set before onnxruntime/OpenVINO create their thread pools)
+    os.environ['OMP_NUM_THREADS'] = str(num_threads)
+    _worker_model = load_model(model_path, backend, quantize)
+    if backend == 'torch' and not quantize:
+        import torch
+        torch.set_num_threads(num_threads)
+        _worker_model.to(device)
+
+
+def _analyze_segment(video_path, start, end, sample_interval, conf_threshold, iou_threshold):
+    """
+    Detect people in frames [start, end) whose index is a multiple of sample_interval
+
+    Returns:
+        (start, [(frame_number, boxes, confidences), ...]) with xyxy pixel boxes
+    """
+    cap = cv2.VideoCapture(video_path)
+    if start > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+    results = []
+    frame_number = start
+    try:
+        while frame_number < end:
+            if frame_number % sample_interval:
+                # Not sampled, skip without BGR conversion
+                if not cap.grab():
+                    break
+                frame_number += 1
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            boxes, confs = extract_boxes(_worker_model(
+                frame,
+                classes=[0],
+                conf=conf_threshold,
+                iou=iou_threshold,
+                verbose=False
+            ))
+            results.append((frame_number, boxes.tolist(), confs.tolist()))
+            frame_number += 1
+    finally:
+        cap.release()
+
+    return start, results
+
+
+def plan_segments(video_path, num_segments):
+    """
+    Split a video into num_segments ranges whose starts fall on keyframes
+
+    Returns:
+        List of (start, end) frame ranges covering the whole video
+    """
+    index, _ = get_seek_index(video_path)
+    if index is not None:
+        total_frames = index.total_frames
+    else:
+        cap = cv2.VideoCapture(video_path)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+    if total_frames <= 0:
+        return []
+
+    step = total_frames / max(num_segments, 1)
+    starts = set()
+    for i in range(max(num_segments, 1)):
+        start = int(i * step)
+        # Starting on a keyframe means no worker decodes frames it won't use
+        starts.add(index.keyframe_before(start) if index is not None else start)
+    starts = sorted(starts)
+    ends = starts[1:] + [total_frames]
+    return list(zip(starts, ends))
+
+
+def iter_segments(video_path, model_path, conf_threshold=0.5, iou_threshold=0.45,
+                  workers=None, sample_interval=1, device='cpu', segments_per_worker=2,
+                  backend='torch', quantize=None):
+    """
+    Analyze a video across a pool of worker processes, yielding segments as they finish
+
+    Args:
+        video_path: Video file to analyze
+        model_path: YOLOv8 weights each worker loads
+        conf_threshold: Confidence threshold for detections
+        iou_threshold: IoU threshold for NMS
+        workers: Number of worker processes (default: CPU count)
+        sample_interval: Analyze every Nth frame (1 = every frame)
+        device: Torch device for the workers
+        segments_per_worker: Extra segments per worker to even out load
+        backend: 'torch', 'onnx' or 'openvino' (see model_backends)
+        quantize: 'int8' for the INT8 ONNX model
+
+    Yields:
+        (start, end, [(frame_number, boxes, confidences), ...]) in completion
+        order; closing the generator cancels segments that haven't started
+    """
+    workers = workers or os.cpu_count() or 1
+    # Download, export or quantize once here so the workers only load the cached artifact
+    model_path = resolve_weights(model_path)
+    if quantize:
+        from quantization import quantize_int8
+        quantize_int8(model_path)
+    elif backend != 'torch':
+        export_model(model_path, backend)
+    segments = plan_segments(video_path, workers * segments_per_worker)
+    if not segments:
+        return
+
+    num_threads = max(1, (os.cpu_count() or 1) // workers)
+    # spawn avoids forking a parent that already initialized torch/OpenCV threads
+    context = multiprocessing.get_context('spawn')
+
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(model_path, backend, quantize, device, num_threads)
+    )
+    try:
+        futures = {
+            executor.submit(_analyze_segment, video_path, start, end,
+                            max(1, sample_interval), conf_threshold, iou_threshold): (start, end)
+            for start, end in segments
+        }
+        for future in as_completed(futures):
+            start, end = futures[future]
+            yield start, end, future.result()[1]
+    finally:
+        # Segments already running finish; queued ones are dropped
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def analyze_video_parallel(video_path, model_path, conf_threshold=0.5, iou_threshold=0.45,
+                           workers=None, sample_interval=1, device='cpu', segments_per_worker=2,
+                           backend='torch', quantize=None):
+    """
+    Analyze a video across a pool of worker processes
+
+    Args:
+        See iter_segments()
+
+    Returns:
+        List of (frame_number, boxes, confidences) in frame order
+    """
+    segment_results = list(iter_segments(video_path, model_path, conf_threshold, iou_threshold,
+                                         workers, sample_interval, device, segments_per_worker,
+                                         backend, quantize))
+    merged = []
+    for _, _, results in sorted(segment_results, key=lambda item: item[0]):
+        merged.extend(results)
+    return merged
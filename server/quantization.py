@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+INT8 quantized YOLOv8 for CPU inference
+Exports the model to ONNX (see model_backends), calibrates activation
+ranges on frames sampled from the public/assets videos and writes a
+statically quantized INT8 model with ONNX Runtime. The result is cached
+next to the other exports and served through YOLO() like any backend.
+
+The Detect head is left in float: it concatenates box coordinates
+(0-640) with class scores (0-1), which one INT8 scale can't represent.
+"""
+
+import argparse
+import glob
+import os
+import re
+import time
+
+import cv2
+import numpy as np
+
+from model_backends import MODEL_CACHE_DIR, artifact_path, export_model
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'public', 'assets')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+
+def int8_path(model_path, cache_dir=MODEL_CACHE_DIR):
+    """Where the quantized model for these weights is cached"""
+    return artifact_path(model_path, 'onnx', cache_dir)[:-len('.onnx')] + '_int8.onnx'
+
+
+def calibration_frames(count=200, video_dir=ASSETS_DIR, offset=0.0):
+    """
+    Sample frames evenly across all videos in video_dir
+
+    Args:
+        count: Total frames to sample
+        video_dir: Directory with the source videos
+        offset: Shift samples by this fraction of the sampling step, so a
+            second call with offset=0.5 picks frames between the first set
+
+    Returns:
+        List of BGR frames
+    """
+    videos = sorted(path for path in glob.glob(os.path.join(video_dir, '*'))
+                    if path.lower().endswith(VIDEO_EXTENSIONS))
+    if not videos:
+        raise IOError(f"No calibration videos found in {video_dir}")
+
+    per_video = max(1, count // len(videos))
+    frames = []
+    for path in videos:
+        cap = cv2.VideoCapture(path)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        step = total / per_video
+        for frame_number in (np.arange(per_video) * step + offset * step).astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(frame_number))
+            ret, frame = cap.read()
+            if ret:
+                frames.append(frame)
+        cap.release()
+    return frames
+
+
+def preprocess(frame, imgsz=640):
+    """Letterbox, BGR->RGB, scale to 0-1 and NCHW, matching ultralytics' predictor"""
+    h, w = frame.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    new_w, new_h = round(w * scale), round(h * scale)
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = resized
+    rgb = canvas[:, :, ::-1].transpose(2, 0, 1)
+    return np.ascontiguousarray(rgb, dtype=np.float32)[None] / 255.0
+
+
+def _head_nodes(model_file):
+    """Names of the non-Conv nodes in the last module (the Detect head)"""
+    import onnx
+
+    graph = onnx.load(model_file).graph
+    pattern = re.compile(r'^/model\.(\d+)/')
+    indices = [int(m.group(1)) for m in (pattern.match(node.name) for node in graph.node) if m]
+    if not indices:
+        return []
+    head = f"/model.{max(indices)}/"
+    return [node.name for node in graph.node if node.name.startswith(head) and node.op_type != 'Conv']
+
+
+def quantize_int8(model_path, frames=None, cache_dir=MODEL_CACHE_DIR, imgsz=640):
+    """
+    Produce (or reuse) the INT8 model for these weights
+
+    Args:
+        model_path: YOLOv8 weights
+        frames: Calibration frames (default: sampled from public/assets videos)
+        cache_dir: Where exports are cached
+        imgsz: Calibration input size
+
+    Returns:
+        Path to the quantized ONNX model
+    """
+    target = int8_path(model_path, cache_dir)
+    if os.path.exists(target):
+        return target
+
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+
+    fp32_file = export_model(model_path, 'onnx', cache_dir)
+    if frames is None:
+        frames = calibration_frames()
+    print(f"Calibrating INT8 model on {len(frames)} frames...")
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self, input_name):
+            # Preprocess lazily, 200 float32 640x640 inputs would take ~1 GB
+            self._inputs = ({input_name: preprocess(frame, imgsz)} for frame in frames)
+
+        def get_next(self):
+            return next(self._inputs, None)
+
+    import onnxruntime
+    input_name = onnxruntime.InferenceSession(
+        fp32_file, providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+    tmp_target = target + '.tmp'
+    start = time.time()
+    quantize_static(
+        fp32_file,
+        tmp_target,
+        FrameReader(input_name),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        nodes_to_exclude=_head_nodes(fp32_file)
+    )
+    os.replace(tmp_target, target)
+    print(f"✓ Cached INT8 model at {target} ({time.time() - start:.1f}s)")
+    return target
+
+
+def compare_models(fp32_model, int8_model, frames, conf_threshold=0.5, iou_threshold=0.45):
+    """
+    People-count error and FPS of the INT8 model against fp32 on the same frames
+
+    Returns:
+        Dict with fp32_fps, int8_fps, speedup, count_mae, count_exact and mean counts
+    """
+    from detection_utils import extract_boxes
+
+    def run(model):
+        model(frames[0], verbose=False)  # Warm up
+        counts = []
+        start = time.time()
+        for frame in frames:
+            results = model(frame, classes=[0], conf=conf_threshold, iou=iou_threshold, verbose=False)
+            counts.append(len(extract_boxes(results)[1]))
+        return np.asarray(counts), len(frames) / (time.time() - start)
+
+    fp32_counts, fp32_fps = run(fp32_model)
+    int8_counts, int8_fps = run(int8_model)
+    errors = np.abs(int8_counts - fp32_counts)
+    return {
+        'frames': len(frames),
+        'fp32_fps': fp32_fps,
+        'int8_fps': int8_fps,
+        'speedup': int8_fps / fp32_fps if fp32_fps else 0.0,
+        'count_mae': float(errors.mean()),
+        'count_exact': float((errors == 0).mean()),
+        'fp32_mean_count': float(fp32_counts.mean()),
+        'int8_mean_count': float(int8_counts.mean())
+    }
+
+
+def print_report(report):
+    print("=" * 60)
+    print("INT8 vs FP32 Report")
+    print("=" * 60)
+    print(f"Frames:             {report['frames']}")
+    print(f"FP32 FPS:           {report['fp32_fps']:.2f}")
+    print(f"INT8 FPS:           {report['int8_fps']:.2f} ({report['speedup']:.2f}x)")
+    print(f"Mean count:         {report['fp32_mean_count']:.2f} fp32 | {report['int8_mean_count']:.2f} int8")
+    print(f"Count MAE:          {report['count_mae']:.3f}")
+    print(f"Exact count match:  {report['count_exact'] * 100:.1f}%")
+    print("=" * 60)
+
+
+def main():
+    """Quantize a model and report its accuracy and speed against fp32"""
+    parser = argparse.ArgumentParser(description='Build an INT8 YOLOv8 model and compare it with fp32')
+    parser.add_argument('--model', type=str, default='yolov8n.pt',
+                       help='YOLOv8 model path (default: yolov8n.pt)')
+    parser.add_argument('--calibration-frames', type=int, default=200,
+                       help='Frames sampled from public/assets videos for calibration (default: 200)')
+    parser.add_argument('--report-frames', type=int, default=100,
+                       help='Frames used for the comparison report (default: 100)')
+    parser.add_argument('--fp32-backend', type=str, default='onnx',
+                       help='Backend of the fp32 baseline (default: onnx)')
+    args = parser.parse_args()
+
+    from model_backends import load_model
+
+    quantize_int8(args.model, calibration_frames(args.calibration_frames))
+    int8_model = load_model(args.model, 'onnx', quantize='int8')
+    fp32_model = load_model(args.model, args.fp32_backend)
+    # Report on frames between the calibration samples
+    report_frames = calibration_frames(args.report_frames, offset=0.5)
+    print_report(compare_models(fp32_model, int8_model, report_frames))
+
+
+if __name__ == '__main__':
+    main()
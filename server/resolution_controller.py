@@ -0,0 +1,100 @@
+"""
+Latency-SLO driven model input size
+Tracks per-frame detection latency and steps the YOLO imgsz between
+configured levels: down when the recent average misses the target, up
+when the next level's predicted latency still fits with headroom. Under
+load the feed keeps moving at lower accuracy instead of stalling.
+"""
+
+from collections import deque
+from threading import Lock
+
+DEFAULT_LEVELS = (320, 416, 512, 640)
+
+
+def parse_levels(value):
+    """Parse imgsz levels from a list or comma-separated string (multiples of 32)"""
+    if isinstance(value, str):
+        value = [v for v in value.split(',') if v.strip()]
+    levels = sorted(set(int(v) for v in value))
+    if not levels or any(level <= 0 or level % 32 for level in levels):
+        raise ValueError('imgsz levels must be positive multiples of 32')
+    return tuple(levels)
+
+
+class ResolutionController:
+    """Chooses the model input size that meets a latency target"""
+
+    def __init__(self, levels=DEFAULT_LEVELS, target_latency=None, window=10, headroom=0.8, cooldown=10):
+        """
+        Args:
+            levels: Allowed imgsz values
+            target_latency: Seconds per frame to stay under (None = fixed at the largest level)
+            window: Frames averaged before deciding
+            headroom: Only step up if the predicted latency is below target * headroom
+            cooldown: Frames to wait after a change before deciding again
+        """
+        self.levels = parse_levels(levels)
+        self.target_latency = target_latency
+        self.window = window
+        self.headroom = headroom
+        self.cooldown = cooldown
+        self._index = len(self.levels) - 1
+        self._latencies = deque(maxlen=window)
+        self._since_change = 0
+        self._lock = Lock()
+        self.steps_down = 0
+        self.steps_up = 0
+
+    @property
+    def imgsz(self):
+        return self.levels[self._index]
+
+    def record(self, latency):
+        """Add one frame's detection latency (seconds) and adjust imgsz if needed"""
+        with self._lock:
+            self._latencies.append(latency)
+            self._since_change += 1
+            if not self.target_latency or self._since_change < self.cooldown \
+                    or len(self._latencies) < self.window:
+                return
+            average = sum(self._latencies) / len(self._latencies)
+
+            if average > self.target_latency and self._index > 0:
+                self._index -= 1
+                self.steps_down += 1
+            elif self._index < len(self.levels) - 1:
+                # Latency grows roughly with the number of input pixels
+                scale = (self.levels[self._index + 1] / self.levels[self._index]) ** 2
+                if average * scale < self.target_latency * self.headroom:
+                    self._index += 1
+                    self.steps_up += 1
+                else:
+                    return
+            else:
+                return
+            # Measurements at the old size no longer apply
+            self._latencies.clear()
+            self._since_change = 0
+
+    def configure(self, levels=None, target_latency=None):
+        """Change levels and/or target; restarts at the largest level"""
+        with self._lock:
+            if levels is not None:
+                self.levels = parse_levels(levels)
+            self.target_latency = target_latency
+            self._index = len(self.levels) - 1
+            self._latencies.clear()
+            self._since_change = 0
+
+    def stats(self):
+        with self._lock:
+            average = sum(self._latencies) / len(self._latencies) if self._latencies else None
+            return {
+                'imgsz': self.levels[self._index],
+                'levels': list(self.levels),
+                'target_latency': self.target_latency,
+                'recent_latency': average,
+                'steps_down': self.steps_down,
+                'steps_up': self.steps_up
+            }
@@ -0,0 +1,154 @@
+"""
+Keyframe seek index for random frame access
+Records which frames are keyframes so a seek can land exactly on the
+nearest keyframe and decode forward only the frames that are needed.
+Indexes are cached in a JSON sidecar next to the video.
+"""
+
+import bisect
+import json
+import os
+
+import cv2
+
+INDEX_VERSION = 1
+SIDECAR_SUFFIX = '.seekidx.json'
+
+
+class SeekIndex:
+    """Sorted keyframe positions for one video file"""
+
+    def __init__(self, keyframes, total_frames, fps=0.0):
+        self.keyframes = sorted(set(keyframes)) or [0]
+        if self.keyframes[0] != 0:
+            self.keyframes.insert(0, 0)
+        self.total_frames = total_frames
+        self.fps = fps
+
+    def keyframe_before(self, frame_number):
+        """Return the last keyframe at or before frame_number"""
+        i = bisect.bisect_right(self.keyframes, frame_number) - 1
+        return self.keyframes[max(i, 0)]
+
+    def frames_to_decode(self, frame_number, position=-1):
+        """
+        Plan the cheapest way to reach frame_number
+
+        Args:
+            frame_number: Target frame
+            position: Frame the decoder will return next (-1 if unknown)
+
+        Returns:
+            (seek_to, grabs): seek_to is None when grabbing forward from the
+            current position is cheaper, otherwise the keyframe to seek to
+        """
+        keyframe = self.keyframe_before(frame_number)
+        if 0 <= position <= frame_number and keyframe <= position:
+            # No keyframe between here and the target, keep decoding forward
+            return None, frame_number - position
+        return keyframe, frame_number - keyframe
+
+    def to_dict(self):
+        return {
+            'keyframes': self.keyframes,
+            'total_frames': self.total_frames,
+            'fps': self.fps
+        }
+
+    def summary(self):
+        gaps = [b - a for a, b in zip(self.keyframes, self.keyframes[1:])]
+        return {
+            'keyframes': len(self.keyframes),
+            'max_gop': max(gaps) if gaps else self.total_frames,
+            'total_frames': self.total_frames
+        }
+
+
+def _file_signature(video_path):
+    stat = os.stat(video_path)
+    return {'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+
+def sidecar_path(video_path):
+    return video_path + SIDECAR_SUFFIX
+
+
+def build_seek_index(video_path):
+    """
+    Scan the container for keyframes without decoding any pictures
+
+    Uses the FFmpeg backend in raw-packet mode (CAP_PROP_FORMAT = -1) and
+    CAP_PROP_LRF_HAS_KEY_FRAME, so only demuxing cost is paid.
+
+    Returns:
+        SeekIndex, or None if this OpenCV build can't report keyframes
+    """
+    has_key_prop = getattr(cv2, 'CAP_PROP_LRF_HAS_KEY_FRAME', None)
+    if has_key_prop is None:
+        return None
+
+    cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+    if not cap.isOpened():
+        return None
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    keyframes = []
+    frame_count = 0
+    try:
+        while cap.grab():
+            if cap.get(has_key_prop):
+                keyframes.append(frame_count)
+            frame_count += 1
+    finally:
+        cap.release()
+
+    if frame_count == 0:
+        return None
+    return SeekIndex(keyframes, frame_count, fps)
+
+
+def load_seek_index(video_path):
+    """Load the sidecar index if it still matches the video file"""
+    path = sidecar_path(video_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if data.get('version') != INDEX_VERSION or data.get('file') != _file_signature(video_path):
+            return None
+        return SeekIndex(data['keyframes'], data['total_frames'], data.get('fps', 0.0))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Ignoring unreadable seek index {path}: {str(e)}")
+        return None
+
+
+def save_seek_index(video_path, index):
+    """Write the index sidecar; failures only cost a rebuild next time"""
+    data = index.to_dict()
+    data['version'] = INDEX_VERSION
+    data['file'] = _file_signature(video_path)
+    try:
+        with open(sidecar_path(video_path), 'w') as f:
+            json.dump(data, f)
+    except OSError as e:
+        print(f"Could not write seek index sidecar: {str(e)}")
+
+
+def get_seek_index(video_path):
+    """
+    Load the seek index for a video, building and caching it if needed
+
+    Returns:
+        (index, source) where source is 'sidecar', 'built' or 'unavailable'
+    """
+    index = load_seek_index(video_path)
+    if index is not None:
+        return index, 'sidecar'
+
+    index = build_seek_index(video_path)
+    if index is None:
+        return None, 'unavailable'
+
+    save_seek_index(video_path, index)
+    return index, 'built'
@@ -0,0 +1,76 @@
+"""
+Tests for output encoding options and the byte-budget (auto) mode
+Run with: python -m pytest server/test_frame_encoding.py
+"""
+
+import pytest
+
+pytest.importorskip('cv2')
+
+import frame_encoding
+from frame_encoding import FrameEncoder, negotiate_format
+
+
+def test_negotiate_format():
+    assert negotiate_format(None) == 'jpeg'
+    assert negotiate_format('jpg') == 'jpeg'
+    assert negotiate_format('auto', 'image/webp,*/*') == 'webp'
+    assert negotiate_format('auto', 'image/png') == 'jpeg'
+    with pytest.raises(ValueError):
+        negotiate_format('gif')
+
+
+def test_from_options_defaults():
+    encoder = FrameEncoder.from_options({})
+
+    assert encoder.quality == frame_encoding.DEFAULT_QUALITY
+    assert encoder.target_bytes is None
+
+
+def test_from_options_target_kb_enables_budget_mode():
+    encoder = FrameEncoder.from_options({'target_kb': '20', 'quality': '80'})
+
+    assert encoder.target_bytes == 20 * 1024
+    assert encoder.quality == 80
+
+
+def test_budget_lowers_quality_first():
+    encoder = FrameEncoder(quality=80, target_bytes=10000)
+
+    encoder._adapt(20000, 1280)  # Far over budget: big step
+    assert encoder.quality == 70
+    encoder._adapt(12000, 1280)  # Slightly over: small step
+    assert encoder.quality == 65
+    assert encoder.width is None
+
+
+def test_budget_shrinks_width_once_quality_bottoms_out():
+    encoder = FrameEncoder(quality=frame_encoding.MIN_QUALITY, target_bytes=10000)
+
+    encoder._adapt(20000, 1280)
+
+    assert encoder.quality == frame_encoding.MIN_QUALITY
+    assert encoder.width == int(1280 * 0.85)
+
+
+def test_budget_restores_width_before_quality():
+    encoder = FrameEncoder(quality=50, target_bytes=10000)
+    encoder.width = 800
+
+    encoder._adapt(5000, 1280)
+    assert encoder.width == int(800 / 0.85) + 1
+    assert encoder.quality == 50
+
+    encoder.width = 1280
+    encoder._adapt(5000, 1280)
+    assert encoder.width == 1280
+    assert encoder.quality == 55
+
+
+def test_budget_within_band_changes_nothing():
+    encoder = FrameEncoder(quality=60, target_bytes=10000)
+
+    encoder._adapt(10000, 1280)
+
+    assert encoder.quality == 60
+    assert encoder.width is None
@@ -0,0 +1,32 @@
+"""
+Tests for /api/yolo/index-video
+Run with: python -m pytest server/test_index_video.py
+"""
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('flask_sock')
+
+import app as server
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    video = tmp_path / 'demo_video.mp4'
+    video.write_bytes(b'')
+    # Any loaded model; the tiled check runs before inference
+    monkeypatch.setattr(server, 'yolo_model', object())
+    monkeypatch.setattr(server, 'video_path', str(video))
+    return server.app.test_client()
+
+
+def test_index_video_rejected_while_tiled(client, monkeypatch):
+    monkeypatch.setitem(server.detection_config, 'tiled', True)
+    monkeypatch.setattr(server, 'refresh_detection_cache',
+                        lambda: pytest.fail('tiled indexing must not touch the cache'))
+
+    response = client.post('/api/yolo/index-video', json={'force': True})
+
+    assert response.status_code == 409
+    assert 'tiled' in response.get_json()['error']
@@ -0,0 +1,109 @@
+"""
+Tests for the inference scheduler's batching, load shedding and timeouts
+Run with: python -m pytest server/test_inference_scheduler.py
+"""
+
+from threading import Event
+
+import pytest
+
+from inference_scheduler import InferenceScheduler, InferenceTimeout, SchedulerOverloaded
+
+
+class FakeModel:
+    """Returns each frame back as its result; can be held to keep the queue full"""
+
+    def __init__(self):
+        self.calls = []
+        self.running = Event()
+        self.release = Event()
+        self.release.set()
+
+    def __call__(self, frames, **kwargs):
+        self.calls.append(list(frames))
+        self.running.set()
+        self.release.wait(5)
+        return list(frames)
+
+
+@pytest.fixture
+def model():
+    model = FakeModel()
+    yield model
+    model.release.set()
+
+
+def held_scheduler(model, max_queue):
+    """Scheduler whose model is busy on one frame, with an empty queue behind it"""
+    model.release.clear()
+    scheduler = InferenceScheduler(model, max_batch_size=1, max_wait=0, max_queue=max_queue, timeout=5)
+    scheduler.submit('busy', 0.5, 0.45)
+    assert model.running.wait(5)
+    return scheduler
+
+
+def test_infer_returns_model_result(model):
+    scheduler = InferenceScheduler(model, max_wait=0)
+
+    assert scheduler.infer('frame', 0.5, 0.45) == 'frame'
+    assert scheduler.stats()['frames'] == 1
+    scheduler.close()
+
+
+def test_submit_rejects_when_queue_full(model):
+    scheduler = held_scheduler(model, max_queue=2)
+    scheduler.submit('a', 0.5, 0.45)
+    scheduler.submit('b', 0.5, 0.45)
+
+    with pytest.raises(SchedulerOverloaded):
+        scheduler.submit('c', 0.5, 0.45)
+    assert scheduler.stats()['rejected'] == 1
+
+    model.release.set()
+    scheduler.close()
+
+
+def test_infer_times_out_and_cancels(model):
+    scheduler = held_scheduler(model, max_queue=2)
+
+    with pytest.raises(InferenceTimeout):
+        scheduler.infer('late', 0.5, 0.45, timeout=0.05)
+    assert scheduler.stats()['timeouts'] == 1
+
+    model.release.set()
+    scheduler.close()
+    scheduler._worker.join(5)
+    # The cancelled frame never reached the model
+    assert ['late'] not in model.calls
+
+
+def test_infer_many_runs_in_chunks_of_max_queue(model):
+    scheduler = InferenceScheduler(model, max_batch_size=8, max_wait=0.01, max_queue=3, timeout=5)
+    frames = [f'frame{i}' for i in range(10)]
+
+    assert scheduler.infer_many(frames, 0.5, 0.45) == frames
+    assert max(len(call) for call in model.calls) <= 3
+    scheduler.close()
+
+
+def test_submit_all_is_all_or_nothing(model):
+    scheduler = held_scheduler(model, max_queue=2)
+    scheduler.submit('queued', 0.5, 0.45)
+
+    with pytest.raises(SchedulerOverloaded):
+        scheduler._submit_all(['a', 'b'], 0.5, 0.45, None, None, False)
+
+    model.release.set()
+    scheduler.close()
+    scheduler._worker.join(5)
+    # 'a' was admitted, then cancelled when 'b' was rejected
+    assert ['a'] not in model.calls
+    assert ['queued'] in model.calls
+
+
+def test_submit_after_close_raises(model):
+    scheduler = InferenceScheduler(model)
+    scheduler.close()
+
+    with pytest.raises(RuntimeError):
+        scheduler.submit('frame', 0.5, 0.45)
@@ -0,0 +1,41 @@
+"""
+Tests for shedding load with 503 when the inference queue is full
+Run with: python -m pytest server/test_overload.py
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('flask_sock')
+
+import app as server
+from inference_scheduler import SchedulerOverloaded
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    video = tmp_path / 'demo_video.mp4'
+    video.write_bytes(b'')
+    monkeypatch.setattr(server, 'yolo_model', object())
+    monkeypatch.setattr(server, 'video_path', str(video))
+    # Frames come from a fake decoder pool, so cv2 is never needed
+    decoder_pool = SimpleNamespace(read_frame=lambda path, number: ('frame', number, 10))
+    monkeypatch.setattr(server, 'vision', SimpleNamespace(decoder_pool=decoder_pool))
+    monkeypatch.setattr(server, 'request_encoder', lambda options: None)
+    monkeypatch.setattr(server, 'request_model', lambda options: None)
+    return server.app.test_client()
+
+
+def test_process_batch_returns_503_when_overloaded(client, monkeypatch):
+    def overloaded(frames, batch_size, model=None, block=False):
+        raise SchedulerOverloaded('Inference queue full (32 frames waiting)')
+
+    monkeypatch.setattr(server, 'detect_people_batch', overloaded)
+
+    response = client.post('/api/yolo/process-batch', json={'frame_numbers': [0, 1]})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert response.get_json()['overloaded'] is True
@@ -0,0 +1,67 @@
+"""
+Tests for the latency-driven imgsz controller
+Run with: python -m pytest server/test_resolution_controller.py
+"""
+
+import pytest
+
+from resolution_controller import ResolutionController, parse_levels
+
+
+def feed(controller, latency, frames):
+    for _ in range(frames):
+        controller.record(latency)
+
+
+def test_parse_levels_sorts_and_validates():
+    assert parse_levels('640, 320,416') == (320, 416, 640)
+    with pytest.raises(ValueError):
+        parse_levels('320,500')
+
+
+def test_fixed_without_target():
+    controller = ResolutionController(target_latency=None, window=2, cooldown=2)
+    feed(controller, 1.0, 10)
+
+    assert controller.imgsz == 640
+
+
+def test_steps_down_when_over_target():
+    controller = ResolutionController(target_latency=0.05, window=5, cooldown=5)
+    feed(controller, 0.1, 5)
+
+    assert controller.imgsz == 512
+    assert controller.steps_down == 1
+
+
+def test_waits_for_a_full_window_after_a_change():
+    controller = ResolutionController(target_latency=0.05, window=5, cooldown=5)
+    feed(controller, 0.1, 9)
+
+    # The second step needs five fresh measurements at the new size
+    assert controller.imgsz == 512
+    controller.record(0.1)
+    assert controller.imgsz == 416
+
+
+def test_steps_up_only_with_headroom():
+    controller = ResolutionController(levels=(320, 640), target_latency=0.1, window=3, cooldown=3)
+    feed(controller, 0.2, 3)
+    assert controller.imgsz == 320
+
+    # 640 is 4x the pixels: 0.03s predicts 0.12s, over the target
+    feed(controller, 0.03, 3)
+    assert controller.imgsz == 320
+    # 0.015s predicts 0.06s, under target * headroom
+    feed(controller, 0.015, 3)
+    assert controller.imgsz == 640
+    assert controller.steps_up == 1
+
+
+def test_configure_restarts_at_largest_level():
+    controller = ResolutionController(target_latency=0.05, window=2, cooldown=2)
+    feed(controller, 0.1, 2)
+    controller.configure(levels='320,416', target_latency=0.2)
+
+    assert controller.imgsz == 416
+    assert controller.stats()['levels'] == [320, 416]
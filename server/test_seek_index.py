@@ -0,0 +1,42 @@
+"""
+Tests for keyframe-aware seek planning
+Run with: python -m pytest server/test_seek_index.py
+"""
+
+import pytest
+
+pytest.importorskip('cv2')
+
+from seek_index import SeekIndex
+
+
+@pytest.fixture
+def index():
+    return SeekIndex([30, 60, 90], total_frames=120, fps=30.0)
+
+
+def test_frame_zero_is_always_a_keyframe(index):
+    assert index.keyframes == [0, 30, 60, 90]
+    assert index.keyframe_before(45) == 30
+    assert index.keyframe_before(60) == 60
+
+
+def test_unknown_position_seeks_to_keyframe(index):
+    assert index.frames_to_decode(45) == (30, 15)
+
+
+def test_decodes_forward_within_the_same_gop(index):
+    assert index.frames_to_decode(45, position=35) == (None, 10)
+
+
+def test_seeks_when_a_keyframe_is_closer(index):
+    # Frame 65 is past keyframe 60, seeking there beats grabbing from 35
+    assert index.frames_to_decode(65, position=35) == (60, 5)
+
+
+def test_seeks_back_for_earlier_frames(index):
+    assert index.frames_to_decode(10, position=40) == (0, 10)
+
+
+def test_summary(index):
+    assert index.summary() == {'keyframes': 4, 'max_gop': 30, 'total_frames': 120}
@@ -0,0 +1,47 @@
+"""
+Tests for tile planning and the cross-tile NMS
+Run with: python -m pytest server/test_tiling.py
+"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from tiling import merge_nms, plan_tiles
+
+
+def test_plan_tiles_small_frame_is_one_tile():
+    assert plan_tiles(640, 480) == [(0, 0, 640, 480)]
+
+
+def test_plan_tiles_cover_the_frame():
+    tiles = plan_tiles(1920, 1080, tile_size=640, overlap=0.2)
+
+    assert max(t[2] for t in tiles) == 1920
+    assert max(t[3] for t in tiles) == 1080
+    assert all(t[2] - t[0] == 640 and t[3] - t[1] == 640 for t in tiles)
+
+
+def test_merge_nms_empty():
+    kept = merge_nms(np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32))
+
+    assert kept.dtype == np.int64
+    assert len(kept) == 0
+
+
+def test_merge_nms_keeps_highest_confidence_first():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [50, 50, 60, 60]], dtype=np.float32)
+    confs = np.array([0.6, 0.9, 0.7], dtype=np.float32)
+
+    assert list(merge_nms(boxes, confs, metric='iou')) == [1, 2]
+
+
+def test_merge_nms_ios_drops_boxes_cut_at_tile_border():
+    # Full box from one tile, its left half from the neighbouring tile
+    boxes = np.array([[0, 0, 20, 40], [10, 0, 20, 40]], dtype=np.float32)
+    confs = np.array([0.9, 0.8], dtype=np.float32)
+
+    # IoU is only 0.5 ...
+    assert list(merge_nms(boxes, confs, threshold=0.6, metric='iou')) == [0, 1]
+    # ... but the half box lies entirely inside the full one
+    assert list(merge_nms(boxes, confs, threshold=0.6, metric='ios')) == [0]
@@ -0,0 +1,83 @@
+"""
+Tests for the IoU tracker and detect-every-N
+Run with: python -m pytest server/test_tracking.py
+"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from tracking import IntervalDetector, IoUTracker, iou_matrix, parse_interval
+
+
+def box(x, y, w=10, h=20):
+    return [x, y, x + w, y + h]
+
+
+def test_iou_matrix():
+    a = np.array([box(0, 0)], dtype=np.float32)
+    b = np.array([box(0, 0), box(5, 0), box(100, 100)], dtype=np.float32)
+
+    ious = iou_matrix(a, b)
+
+    assert ious.shape == (1, 3)
+    assert ious[0, 0] == pytest.approx(1.0)
+    assert ious[0, 1] == pytest.approx(100 / 300)
+    assert ious[0, 2] == 0
+
+
+def test_tracker_keeps_ids_across_updates():
+    tracker = IoUTracker()
+    _, _, first = tracker.update([box(0, 0), box(100, 0)], [0.9, 0.8])
+    _, _, second = tracker.update([box(102, 0), box(2, 0)], [0.8, 0.9])
+
+    assert list(first) == [1, 2]
+    # Detection order changed, IDs follow the boxes
+    assert list(second) == [2, 1]
+
+
+def test_predict_moves_tracks_along_their_velocity():
+    tracker = IoUTracker(smoothing=1.0)
+    tracker.update([box(0, 0)], [0.9])
+    tracker.update([box(4, 0)], [0.9])
+
+    boxes, _, ids = tracker.predict()
+
+    assert list(ids) == [1]
+    assert list(boxes[0]) == pytest.approx(box(8, 0))
+
+
+def test_unmatched_tracks_coast_then_drop():
+    tracker = IoUTracker(max_missed=1)
+    tracker.update([box(0, 0)], [0.9])
+
+    _, _, ids = tracker.update([], [])
+    # Coasting, kept for association but not reported
+    assert len(ids) == 0
+    assert list(tracker.ids) == [1]
+
+    tracker.update([], [])
+    assert len(tracker.ids) == 0
+
+
+def test_interval_detector_tracks_between_detections():
+    calls = []
+
+    def detect(frame):
+        calls.append(frame)
+        return np.array([box(0, 0)], dtype=np.float32), np.array([0.9], dtype=np.float32)
+
+    detector = IntervalDetector(detect, interval=3)
+    inferred = [detector.process(i)[3] for i in range(6)]
+
+    assert inferred == [True, False, False, True, False, False]
+    assert calls == [0, 3]
+    assert detector.stats()['inference_ratio'] == pytest.approx(2 / 6)
+
+
+def test_parse_interval():
+    assert parse_interval(None) == 1
+    assert parse_interval('AUTO') == 'auto'
+    assert parse_interval('4') == 4
+    with pytest.raises(ValueError):
+        parse_interval(0)
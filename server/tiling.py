@@ -0,0 +1,164 @@
+"""
+Tiled (sliced) inference for high-resolution crowd footage
+Runs the detector on overlapping full-resolution tiles in addition to the
+downscaled full frame, so small distant people survive the resize to the
+model's input size, then merges boxes from all passes with a global NMS.
+
+Boxes use the detection_utils convention: float32 [N, 4] xyxy pixels
+plus float32 [N] confidences.
+"""
+
+from threading import Lock
+
+import numpy as np
+
+from detection_utils import empty_boxes
+
+
+def plan_tiles(width, height, tile_size=640, overlap=0.2):
+    """
+    Overlapping tiles covering a frame
+
+    Returns:
+        List of (x1, y1, x2, y2) tiles; a single full-frame tile when the
+        frame is no larger than tile_size
+    """
+    stride = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        # Last tile is flush with the frame edge
+        return list(range(0, length - tile_size, stride)) + [length - tile_size]
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+def merge_nms(boxes, confs, threshold=0.5, metric='ios'):
+    """
+    Greedy NMS across boxes from different tiles
+
+    metric='ios' (intersection over the smaller box) also suppresses partial
+    boxes cut off at a tile border by the full box from a neighbouring tile;
+    metric='iou' is standard NMS.
+
+    Returns:
+        Indices of kept boxes, highest confidence first
+    """
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = np.argsort(-confs)
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0]), 0, None)
+        h = np.clip(np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1]), 0, None)
+        inter = w * h
+        if metric == 'ios':
+            denominator = np.minimum(areas[i], areas[rest])
+        else:
+            denominator = areas[i] + areas[rest] - inter
+        overlap = inter / np.maximum(denominator, 1e-6)
+        order = rest[overlap < threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+class TiledDetector:
+    """Full-frame plus tiled detection merged with a global NMS"""
+
+    def __init__(self, infer_fn, tile_size=640, overlap=0.2, crowd_threshold=0, merge_threshold=0.5):
+        """
+        Args:
+            infer_fn: list of frames -> list of (boxes, confs), one forward pass
+            tile_size: Tile width and height in source pixels
+            overlap: Fraction of a tile shared with its neighbour
+            crowd_threshold: Only tile where the full-frame pass already found at
+                least this many people (0 = tile the whole frame in one batch)
+            merge_threshold: Overlap above which merge_nms drops a box
+        """
+        self.infer_fn = infer_fn
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.crowd_threshold = crowd_threshold
+        self.merge_threshold = merge_threshold
+        self._lock = Lock()
+        self.frames = 0
+        self.tiles_run = 0
+
+    def _select_tiles(self, tiles, boxes):
+        """Tiles containing at least crowd_threshold full-frame detection centres"""
+        if len(boxes) == 0:
+            return []
+        cx = (boxes[:, 0] + boxes[:, 2]) / 2
+        cy = (boxes[:, 1] + boxes[:, 3]) / 2
+        return [
+            (x1, y1, x2, y2) for x1, y1, x2, y2 in tiles
+            if np.count_nonzero((cx >= x1) & (cx < x2) & (cy >= y1) & (cy < y2)) >= self.crowd_threshold
+        ]
+
+    @staticmethod
+    def _crop(frame, tile):
+        x1, y1, x2, y2 = tile
+        return np.ascontiguousarray(frame[y1:y2, x1:x2])
+
+    def detect(self, frame, infer_fn=None):
+        """
+        Detect people on the full frame and its tiles
+
+        Args:
+            frame: BGR frame
+            infer_fn: Overrides the detector's infer_fn for this frame (e.g. another model)
+
+        Returns:
+            (boxes, confs) in frame pixels after merging
+        """
+        infer_fn = infer_fn or self.infer_fn
+        h, w = frame.shape[:2]
+        tiles = plan_tiles(w, h, self.tile_size, self.overlap)
+        if len(tiles) == 1:
+            # Frame already fits one tile, tiling adds nothing
+            tiles = []
+
+        if self.crowd_threshold > 0 and tiles:
+            full = infer_fn([frame])[0]
+            tiles = self._select_tiles(tiles, full[0])
+            tile_results = infer_fn([self._crop(frame, tile) for tile in tiles]) if tiles else []
+        else:
+            results = infer_fn([frame] + [self._crop(frame, tile) for tile in tiles])
+            full, tile_results = results[0], results[1:]
+
+        with self._lock:
+            self.frames += 1
+            self.tiles_run += len(tiles)
+
+        if not tiles:
+            return full
+
+        box_parts, conf_parts = [full[0]], [full[1]]
+        for (x1, y1, _, _), (boxes, confs) in zip(tiles, tile_results):
+            if len(boxes):
+                box_parts.append(boxes + np.array([x1, y1, x1, y1], dtype=np.float32))
+                conf_parts.append(confs)
+        boxes, confs = np.concatenate(box_parts), np.concatenate(conf_parts)
+        if len(boxes) == 0:
+            return empty_boxes()
+        keep = merge_nms(boxes, confs, self.merge_threshold)
+        return boxes[keep], confs[keep]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'tile_size': self.tile_size,
+                'overlap': self.overlap,
+                'crowd_threshold': self.crowd_threshold,
+                'frames': self.frames,
+                'tiles_run': self.tiles_run,
+                'average_tiles': self.tiles_run / self.frames if self.frames else 0.0
+            }
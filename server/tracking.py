@@ -0,0 +1,209 @@
+"""
+Detect-every-N with IoU tracking
+Runs the detector only on some frames and propagates boxes in between
+with a constant-velocity IoU tracker, which also gives each person a
+stable track ID across frames.
+
+Boxes use the detection_utils convention: float32 [N, 4] xyxy pixels
+plus float32 [N] confidences.
+"""
+
+import math
+import time
+
+import numpy as np
+
+from detection_utils import empty_boxes
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU between xyxy boxes a [N, 4] and b [M, 4]"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0).astype(np.float32)
+
+
+class IoUTracker:
+    """Greedy IoU association with constant-velocity prediction between detections"""
+
+    def __init__(self, iou_threshold=0.3, max_missed=2, smoothing=0.5):
+        """
+        Args:
+            iou_threshold: Minimum IoU to match a detection to a track
+            max_missed: Detection rounds a track survives without a match
+            smoothing: Weight of the newest velocity estimate (0-1)
+        """
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.smoothing = smoothing
+        self.boxes, self.confs = empty_boxes()
+        self.velocity = np.zeros((0, 4), dtype=np.float32)  # Pixels per frame
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.missed = np.zeros(0, dtype=np.int64)
+        self.frames_since_update = 0
+        self.next_id = 1
+
+    def predict(self):
+        """
+        Advance tracks one frame along their velocity
+
+        Returns:
+            (boxes, confs, track_ids) for tracks that are currently visible
+        """
+        self.boxes = self.boxes + self.velocity
+        self.frames_since_update += 1
+        return self._visible()
+
+    def update(self, boxes, confs):
+        """
+        Associate fresh detections with tracks
+
+        Returns:
+            (boxes, confs, track_ids) in detection order
+        """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        confs = np.asarray(confs, dtype=np.float32)
+        # Tracks were already advanced by predict() on skipped frames
+        steps = max(self.frames_since_update, 1)
+
+        det_ids = np.zeros(len(boxes), dtype=np.int64)
+        matched_tracks = set()
+        if len(self.boxes) and len(boxes):
+            ious = iou_matrix(self.boxes, boxes)
+            # Greedy: best remaining pair first
+            for flat in np.argsort(-ious, axis=None):
+                t, d = divmod(int(flat), len(boxes))
+                if ious[t, d] < self.iou_threshold:
+                    break
+                if t in matched_tracks or det_ids[d]:
+                    continue
+                matched_tracks.add(t)
+                det_ids[d] = self.ids[t]
+
+        # Refresh velocity of matched tracks from their last confirmed position
+        old_boxes = self.boxes - self.velocity * steps
+        new_velocity = np.zeros((len(boxes), 4), dtype=np.float32)
+        id_to_track = {int(track_id): t for t, track_id in enumerate(self.ids)}
+        for d, track_id in enumerate(det_ids):
+            if track_id:
+                t = id_to_track[int(track_id)]
+                measured = (boxes[d] - old_boxes[t]) / steps
+                new_velocity[d] = self.smoothing * measured + (1 - self.smoothing) * self.velocity[t]
+            else:
+                det_ids[d] = self.next_id
+                self.next_id += 1
+
+        # Unmatched tracks coast for a few rounds in case the detector missed them
+        lost = [t for t in range(len(self.ids)) if t not in matched_tracks
+                and self.missed[t] < self.max_missed]
+        self.boxes = np.vstack((boxes, self.boxes[lost])) if lost else boxes
+        self.confs = np.concatenate((confs, self.confs[lost])) if lost else confs
+        self.velocity = np.vstack((new_velocity, self.velocity[lost])) if lost else new_velocity
+        self.ids = np.concatenate((det_ids, self.ids[lost]))
+        self.missed = np.concatenate((np.zeros(len(boxes), dtype=np.int64), self.missed[lost] + 1))
+        self.frames_since_update = 0
+        return boxes, confs, det_ids
+
+    def _visible(self):
+        # Coasting tracks are kept for association but not reported
+        visible = self.missed == 0
+        return self.boxes[visible], self.confs[visible], self.ids[visible]
+
+
+class IntervalDetector:
+    """
+    Runs a detector every N frames and tracks boxes in between
+
+    With interval='auto' N follows the measured inference time so that
+    inference keeps up with target_fps, and drops back to 1 for a frame
+    whenever the last detection started or lost tracks.
+    """
+
+    def __init__(self, detect_fn, interval=1, target_fps=30.0, max_interval=10, tracker=None):
+        """
+        Args:
+            detect_fn: frame -> (boxes, confs)
+            interval: Detect every N frames, or 'auto'
+            target_fps: Output rate the adaptive interval aims for
+            max_interval: Upper bound for the adaptive interval
+            tracker: IoUTracker to use (default: a new one)
+        """
+        self.detect_fn = detect_fn
+        self.adaptive = interval == 'auto'
+        self.interval = 1 if self.adaptive else max(1, int(interval))
+        self.target_fps = target_fps
+        self.max_interval = max_interval
+        self.tracker = tracker or IoUTracker()
+        self.inference_time = None  # Moving average, seconds
+        self.since_detection = None
+        self.inferred = 0
+        self.tracked = 0
+
+    def process(self, frame, detections=None):
+        """
+        Detect or track one frame
+
+        Args:
+            frame: Input frame
+            detections: Known (boxes, confs) for this frame, e.g. from a cache,
+                used instead of running the detector
+
+        Returns:
+            (boxes, confs, track_ids, inferred)
+        """
+        if detections is not None:
+            boxes, confs, ids = self.tracker.update(*detections)
+            self.since_detection = 0
+            return boxes, confs, ids, False
+
+        if self.since_detection is not None and self.since_detection + 1 < self.interval:
+            self.since_detection += 1
+            self.tracked += 1
+            boxes, confs, ids = self.tracker.predict()
+            return boxes, confs, ids, False
+
+        start = time.time()
+        known_ids = set(self.tracker.ids.tolist())
+        boxes, confs, ids = self.tracker.update(*self.detect_fn(frame))
+        elapsed = time.time() - start
+        self.inference_time = elapsed if self.inference_time is None else 0.8 * self.inference_time + 0.2 * elapsed
+        self.since_detection = 0
+        self.inferred += 1
+
+        if self.adaptive:
+            self.interval = max(1, min(self.max_interval, math.ceil(self.inference_time * self.target_fps)))
+            if set(ids.tolist()) != known_ids:
+                # Scene is changing, look again on the next frame
+                self.interval = 1
+        return boxes, confs, ids, True
+
+    def stats(self):
+        frames = self.inferred + self.tracked
+        return {
+            'interval': 'auto' if self.adaptive else self.interval,
+            'current_interval': self.interval,
+            'inferred_frames': self.inferred,
+            'tracked_frames': self.tracked,
+            'inference_ratio': self.inferred / frames if frames else 0.0,
+            'active_tracks': int(len(self.tracker.ids))
+        }
+
+
+def parse_interval(value):
+    """Parse a detect-every option: positive int or 'auto'"""
+    if value in (None, ''):
+        return 1
+    if str(value).lower() == 'auto':
+        return 'auto'
+    interval = int(value)
+    if interval < 1:
+        raise ValueError('detect_every must be >= 1 or "auto"')
+    return interval
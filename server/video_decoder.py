@@ -0,0 +1,490 @@
+"""
+Long-lived video decoder handles for frame-by-frame detection endpoints
+Keeps cv2.VideoCapture objects open between requests so sequential reads
+can grab() forward instead of reopening and seeking the container, and
+decodes upcoming frames ahead of strided playback on a background thread
+"""
+
+import cv2
+import time
+from collections import OrderedDict
+from threading import Thread, Lock, Condition
+
+
+class DecoderHandle:
+    """A single open VideoCapture that remembers its decode position"""
+
+    def __init__(self, path):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.position = 0  # Index of the frame the next read() returns
+        self.last_used = time.time()
+        self.index = None  # Optional SeekIndex for keyframe-aligned seeks
+
+    def is_opened(self):
+        return self.cap.isOpened()
+
+    def seek(self, frame_number):
+        """Position the decoder so the next read() returns frame_number"""
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        self.position = frame_number
+
+    def read(self, frame_number, max_grab_ahead=60):
+        """
+        Read a frame, grabbing forward when it is a short hop ahead
+
+        Args:
+            frame_number: Frame index to read (already wrapped to the video length)
+            max_grab_ahead: Largest forward gap covered by grab() before seeking
+
+        Returns:
+            (ret, frame) like cv2.VideoCapture.read()
+        """
+        if self.index is not None:
+            # Seek to the nearest keyframe only when one lies between the
+            # current position and the target, then decode forward
+            seek_to, grabs = self.index.frames_to_decode(frame_number, self.position)
+            if seek_to is not None:
+                self.seek(seek_to)
+        else:
+            gap = frame_number - self.position
+            if self.position >= 0 and 0 <= gap <= max_grab_ahead:
+                grabs = gap
+            else:
+                self.seek(frame_number)
+                grabs = 0
+
+        # Skipped frames are demuxed and decoded but never converted to BGR
+        for _ in range(grabs):
+            if not self.cap.grab():
+                self.position = -1
+                return False, None
+
+        ret, frame = self.cap.read()
+        # Unknown position after a failed read forces a real seek next time
+        self.position = frame_number + 1 if ret else -1
+        self.last_used = time.time()
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class DecoderPool:
+    """Thread-safe pool of DecoderHandles keyed by video path"""
+
+    def __init__(self, idle_timeout=60.0, max_handles_per_path=4, max_grab_ahead=60):
+        """
+        Args:
+            idle_timeout: Seconds an unused handle stays open before eviction
+            max_handles_per_path: Upper bound on idle handles kept per video
+            max_grab_ahead: Forward gap (frames) read with grab() instead of seek
+        """
+        self.idle_timeout = idle_timeout
+        self.max_handles_per_path = max_handles_per_path
+        self.max_grab_ahead = max_grab_ahead
+        self._idle = {}  # path -> list of idle handles
+        self._indexes = {}  # path -> SeekIndex
+        self._lock = Lock()
+        self._reaper = None
+
+    def _start_reaper(self):
+        """Start the background thread that closes idle handles"""
+        if self._reaper is not None:
+            return
+        self._reaper = Thread(target=self._reap_loop, daemon=True)
+        self._reaper.start()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(max(self.idle_timeout / 2, 1.0))
+            self.evict_idle()
+
+    def acquire(self, path, frame_number=0):
+        """
+        Take a handle for path out of the pool, preferring the one closest
+        behind frame_number so the read is a short forward grab
+
+        Returns:
+            DecoderHandle owned exclusively by the caller until release()
+        """
+        with self._lock:
+            self._start_reaper()
+            index = self._indexes.get(path)
+            handles = self._idle.get(path, [])
+            best = None
+            for handle in handles:
+                gap = frame_number - handle.position
+                if handle.position >= 0 and 0 <= gap <= self.max_grab_ahead:
+                    if best is None or handle.position > best.position:
+                        best = handle
+            if best is None and handles:
+                # No handle within grab range, reuse the most recent one and seek
+                best = max(handles, key=lambda h: h.last_used)
+            if best is not None:
+                handles.remove(best)
+                best.index = index
+                return best
+
+        # Opening the container happens outside the pool lock
+        handle = DecoderHandle(path)
+        handle.index = index
+        return handle
+
+    def get_index(self, path):
+        with self._lock:
+            return self._indexes.get(path)
+
+    def set_index(self, path, index):
+        """Attach a SeekIndex to every handle opened for path (None to clear)"""
+        with self._lock:
+            if index is None:
+                self._indexes.pop(path, None)
+            else:
+                self._indexes[path] = index
+
+    def release(self, handle):
+        """Return a handle to the pool (or close it if the pool is full)"""
+        handle.last_used = time.time()
+        if not handle.is_opened():
+            handle.release()
+            return
+        with self._lock:
+            handles = self._idle.setdefault(handle.path, [])
+            if len(handles) < self.max_handles_per_path:
+                handles.append(handle)
+                return
+        handle.release()
+
+    def read_frame(self, path, frame_number):
+        """
+        Read frame_number from path, wrapping past the end of the video and
+        falling back to frame 0 if the requested frame can't be decoded
+
+        Returns:
+            (frame, frame_number, total_frames); frame is None on failure
+        """
+        handle = self.acquire(path, frame_number)
+        try:
+            if not handle.is_opened():
+                return None, frame_number, 0
+            total_frames = handle.total_frames
+            if total_frames > 0 and frame_number >= total_frames:
+                frame_number = frame_number % total_frames
+
+            ret, frame = handle.read(frame_number, self.max_grab_ahead)
+            if not ret:
+                frame_number = 0
+                ret, frame = handle.read(0, self.max_grab_ahead)
+            return (frame if ret else None), frame_number, total_frames
+        finally:
+            self.release(handle)
+
+    def evict_idle(self):
+        """Close handles that have been idle longer than idle_timeout"""
+        now = time.time()
+        expired = []
+        with self._lock:
+            for path in list(self._idle):
+                keep = []
+                for handle in self._idle[path]:
+                    if now - handle.last_used > self.idle_timeout:
+                        expired.append(handle)
+                    else:
+                        keep.append(handle)
+                if keep:
+                    self._idle[path] = keep
+                else:
+                    del self._idle[path]
+        for handle in expired:
+            handle.release()
+        return len(expired)
+
+    def invalidate(self, path=None):
+        """Close idle handles for path (or every path when None)"""
+        with self._lock:
+            if path is None:
+                closing = [h for handles in self._idle.values() for h in handles]
+                self._idle = {}
+            else:
+                closing = self._idle.pop(path, [])
+        for handle in closing:
+            handle.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'idle_handles': {path: len(handles) for path, handles in self._idle.items()},
+                'indexed_paths': list(self._indexes)
+            }
+
+
+class ReadAheadBuffer:
+    """
+    Background read-ahead for strided playback (e.g. LiveView asking for
+    frames 0, 10, 20, ...). Once two consecutive requests share a stride the
+    upcoming frames are decoded into a bounded ring buffer so the next
+    request is served without blocking on cap.read()
+    """
+
+    def __init__(self, pool, depth=8, max_bytes=256 * 1024 * 1024, max_stride=120):
+        """
+        Args:
+            pool: DecoderPool used for both foreground misses and read-ahead
+            depth: Maximum number of frames decoded ahead of the last request
+            max_bytes: Memory cap for buffered frames
+            max_stride: Largest stride treated as sequential playback
+        """
+        self.pool = pool
+        self.depth = depth
+        self.max_bytes = max_bytes
+        self.max_stride = max_stride
+
+        self._lock = Lock()
+        self._cond = Condition(self._lock)
+        self._frames = OrderedDict()  # frame_number -> decoded BGR frame
+        self._bytes = 0
+        self._path = None
+        self._total_frames = 0
+        self._generation = 0
+        self._last_request = None
+        self._last_stride = None
+        self._stride = None
+        self._pending = None
+        self._worker = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def _start_worker(self):
+        if self._worker is not None:
+            return
+        self._worker = Thread(target=self._worker_loop, daemon=True)
+        self._worker.start()
+
+    def _clear(self):
+        """Drop buffered frames and playback state (caller holds the lock)"""
+        self._frames.clear()
+        self._bytes = 0
+        self._last_request = None
+        self._last_stride = None
+        self._stride = None
+        self._pending = None
+        self._generation += 1
+
+    def invalidate(self, path=None):
+        """Discard everything buffered, e.g. when the active video changes"""
+        with self._lock:
+            self._clear()
+            self._path = path
+            self._total_frames = 0
+
+    def _track_stride(self, frame_number):
+        """Update the detected stride from the latest request (lock held)"""
+        if self._last_request is not None:
+            stride = frame_number - self._last_request
+            if self._total_frames > 0:
+                stride %= self._total_frames
+            if 0 < stride <= self.max_stride:
+                # Require the same step twice before reading ahead
+                self._stride = stride if stride == self._last_stride else None
+                self._last_stride = stride
+            else:
+                self._stride = None
+                self._last_stride = None
+        self._last_request = frame_number
+
+    def _store(self, frame_number, frame):
+        """Insert a decoded frame, evicting the oldest past the caps (lock held)"""
+        if frame_number in self._frames:
+            return
+        self._frames[frame_number] = frame
+        self._bytes += frame.nbytes
+        while self._frames and (len(self._frames) > self.depth or self._bytes > self.max_bytes):
+            _, old = self._frames.popitem(last=False)
+            self._bytes -= old.nbytes
+
+    def get_frame(self, path, frame_number):
+        """
+        Return a decoded frame, from the buffer when it was read ahead
+
+        Returns:
+            (frame, frame_number, total_frames) like DecoderPool.read_frame()
+        """
+        with self._lock:
+            if path != self._path:
+                self._clear()
+                self._path = path
+                self._total_frames = 0
+            if self._total_frames > 0 and frame_number >= self._total_frames:
+                frame_number = frame_number % self._total_frames
+            self._track_stride(frame_number)
+
+            frame = self._frames.pop(frame_number, None)
+            if frame is not None:
+                self._bytes -= frame.nbytes
+                self.hits += 1
+                total_frames = self._total_frames
+            else:
+                self.misses += 1
+            generation = self._generation
+
+        if frame is None:
+            frame, frame_number, total_frames = self.pool.read_frame(path, frame_number)
+
+        with self._lock:
+            if generation == self._generation:
+                if total_frames > 0:
+                    self._total_frames = total_frames
+                if self._stride:
+                    self._pending = (path, frame_number, self._stride, self._total_frames, generation)
+                    self._start_worker()
+                    self._cond.notify()
+
+        return frame, frame_number, total_frames
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                path, base, stride, total_frames, generation = self._pending
+                self._pending = None
+
+            for k in range(1, self.depth + 1):
+                target = base + stride * k
+                if total_frames > 0:
+                    target %= total_frames
+                with self._lock:
+                    # A newer request or a video switch supersedes this batch
+                    if generation != self._generation or self._pending is not None:
+                        break
+                    if target in self._frames:
+                        continue
+                    if self._bytes >= self.max_bytes:
+                        break
+
+                frame, target, _ = self.pool.read_frame(path, target)
+                if frame is None:
+                    break
+
+                with self._lock:
+                    if generation != self._generation:
+                        break
+                    self._store(target, frame)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'buffered_frames': len(self._frames),
+                'buffered_bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'stride': self._stride
+            }
+
+
+class FrameSampler:
+    """
+    Decode only every Nth frame of a video. Skipped frames are passed with
+    grab() (no BGR conversion), or skipped entirely by seeking to the
+    nearest keyframe when a SeekIndex says that is cheaper.
+    """
+
+    def __init__(self, path, sample_interval=30, index=None, time_budget=None, max_samples=None):
+        """
+        Args:
+            path: Video file to sample
+            sample_interval: Decode one frame out of every sample_interval
+            index: Optional SeekIndex enabling keyframe-aligned seeks
+            time_budget: Stop sampling after this many seconds (None = no limit)
+            max_samples: Stop after this many samples (None = whole video)
+        """
+        self.path = path
+        self.sample_interval = max(1, int(sample_interval))
+        self.index = index
+        self.time_budget = time_budget
+        self.max_samples = max_samples
+
+        self.decoded = 0
+        self.grabbed = 0
+        self.seeks = 0
+        self.read_time = 0.0
+        self.grab_time = 0.0
+        self.seek_time = 0.0
+        self.frames_covered = 0
+        self.truncated = False
+
+    def __iter__(self):
+        """Yield (frame_number, frame) for each sampled frame"""
+        cap = cv2.VideoCapture(self.path)
+        start_time = time.time()
+        position = 0
+        target = 0
+        try:
+            while cap.isOpened():
+                if self.max_samples is not None and self.decoded >= self.max_samples:
+                    break
+                if self.time_budget is not None and time.time() - start_time > self.time_budget:
+                    self.truncated = True
+                    break
+
+                if self.index is not None:
+                    if target >= self.index.total_frames:
+                        break
+                    seek_to, grabs = self.index.frames_to_decode(target, position)
+                else:
+                    seek_to, grabs = None, target - position
+
+                if seek_to is not None:
+                    t0 = time.time()
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, seek_to)
+                    self.seek_time += time.time() - t0
+                    self.seeks += 1
+
+                t0 = time.time()
+                ok = True
+                for _ in range(grabs):
+                    if not cap.grab():
+                        ok = False
+                        break
+                self.grab_time += time.time() - t0
+                self.grabbed += grabs
+                if not ok:
+                    break
+
+                t0 = time.time()
+                ret, frame = cap.read()
+                self.read_time += time.time() - t0
+                if not ret:
+                    break
+
+                self.decoded += 1
+                position = target + 1
+                self.frames_covered = position
+                yield target, frame
+                target += self.sample_interval
+        finally:
+            cap.release()
+
+    def stats(self):
+        """Sampling counters and the estimated decode time saved vs read()-ing every frame"""
+        avg_read = self.read_time / self.decoded if self.decoded else 0.0
+        spent = self.read_time + self.grab_time + self.seek_time
+        full_decode = self.frames_covered * avg_read
+        return {
+            'sample_interval': self.sample_interval,
+            'decoded_frames': self.decoded,
+            'grabbed_frames': self.grabbed,
+            'seeks': self.seeks,
+            'frames_covered': self.frames_covered,
+            'decode_time': spent,
+            'estimated_full_decode_time': full_decode,
+            'estimated_time_saved': max(full_decode - spent, 0.0),
+            'truncated': self.truncated
+        }
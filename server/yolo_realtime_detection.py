@@ -6,18 +6,28 @@ Supports webcam, video files, and saves annotated output with CCTV overlay
 
 import cv2
 import torch
-from ultralytics import YOLO
 import numpy as np
-from datetime import datetime
 import argparse
 import os
 import time
+from collections import deque
+
+from annotation import AnnotationRenderer
+from detection_utils import extract_boxes, bbox_dicts
+from model_backends import BACKENDS, load_model
+from tracking import IntervalDetector, parse_interval
+from motion_gate import MotionGate, GatedDetector
+from tiling import TiledDetector
+from resolution_controller import DEFAULT_LEVELS, ResolutionController, parse_levels
+from inference_scheduler import InferenceTimeout
 
 
 class RealtimeDetector:
     """Real-time people detection with YOLOv8"""
     
-    def __init__(self, model_path='yolov8n.pt', conf_threshold=0.5, iou_threshold=0.45, use_gpu=True):
+    def __init__(self, model_path='yolov8n.pt', conf_threshold=0.5, iou_threshold=0.45, use_gpu=True,
+                 tile_size=None, tile_overlap=0.2, tile_crowd_threshold=0,
+                 target_fps=None, imgsz_levels=DEFAULT_LEVELS, backend='torch', quantize=None):
         """
         Initialize YOLOv8 detector
         
@@ -26,7 +36,15 @@ class RealtimeDetector:
             conf_threshold: Confidence threshold for detections (0.0-1.0)
             iou_threshold: IoU threshold for NMS
             use_gpu: Use GPU if available
+            tile_size: Also detect on overlapping tiles of this size (None = off)
+            tile_overlap: Fraction of a tile shared with its neighbour
+            tile_crowd_threshold: Only tile where the full frame has this many people (0 = everywhere)
+            target_fps: Step the model input size between imgsz_levels to meet this FPS (None = fixed)
+            imgsz_levels: Allowed model input sizes
+            backend: Inference runtime: 'torch', 'onnx' or 'openvino' (exported once and cached)
+            quantize: 'int8' to run an INT8 model calibrated on public/assets frames (CPU, cached)
         """
+        self.model_path = model_path
         self.conf_threshold = conf_threshold
         self.iou_threshold = iou_threshold
         
@@ -39,11 +57,32 @@ class RealtimeDetector:
             print(f"✓ Using CPU")
         
         # Load YOLOv8 model
-        print(f"Loading YOLOv8 model: {model_path}")
-        self.model = YOLO(model_path)
-        self.model.to(self.device)
+        if quantize:
+            # Quantized models run on ONNX Runtime
+            backend = 'onnx'
+        print(f"Loading YOLOv8 model: {model_path} ({backend} backend{', ' + quantize if quantize else ''})")
+        self.backend = backend
+        self.quantize = quantize
+        self.model = load_model(model_path, backend, quantize)
+        if backend == 'torch':
+            self.model.to(self.device)
         print("✓ Model loaded successfully")
         
+        # Tiled inference for small people in high-resolution footage
+        self.tiler = None
+        if tile_size:
+            self.tiler = TiledDetector(self._infer_frames, tile_size=tile_size, overlap=tile_overlap,
+                                       crowd_threshold=tile_crowd_threshold)
+            print(f"✓ Tiled inference: {tile_size}px tiles, {tile_overlap:.0%} overlap")
+        
+        # Model input size chosen from measured latency
+        self.resolution = ResolutionController(imgsz_levels, 1.0 / target_fps if target_fps else None)
+        if target_fps:
+            print(f"✓ Adaptive input size {list(self.resolution.levels)} targeting {target_fps:.1f} FPS")
+        
+        # Draws annotations into a reused buffer
+        self.renderer = AnnotationRenderer()
+        
         # FPS calculation
         self.fps = 0
         self.frame_times = []
@@ -66,38 +105,98 @@ class RealtimeDetector:
         Returns:
             detections: List of (bbox, confidence) tuples
         """
+        return bbox_dicts(*self.detect_boxes(frame))
+    
+    def detect_boxes(self, frame):
+        """
+        Run YOLOv8 detection on frame
+        
+        Args:
+            frame: Input frame (BGR format)
+            
+        Returns:
+            (boxes, confs): float32 xyxy pixel boxes [N, 4] and confidences [N]
+        """
         start_time = time.time()
         
-        # Run inference (class 0 = person)
+        if self.tiler is not None:
+            # Full frame plus tiles in one batch, merged with NMS
+            boxes, confs = self.tiler.detect(frame)
+        else:
+            # Run inference (class 0 = person)
+            results = self.model(
+                frame,
+                classes=[0],  # Only detect people
+                conf=self.conf_threshold,
+                iou=self.iou_threshold,
+                imgsz=self.resolution.imgsz,
+                verbose=False
+            )
+            
+            # Extract detections (one device-to-host copy for all boxes)
+            boxes, confs = extract_boxes(results)
+        
+        # Update FPS calculation and the input size controller
+        elapsed = time.time() - start_time
+        self.resolution.record(elapsed)
+        self.frame_times.append(elapsed)
+        if len(self.frame_times) > self.max_frame_times:
+            self.frame_times.pop(0)
+        
+        return boxes, confs
+    
+    def _infer_frames(self, frames):
+        """One forward pass over frames, returning per-frame (boxes, confs)"""
         results = self.model(
-            frame,
-            classes=[0],  # Only detect people
+            frames,
+            classes=[0],
             conf=self.conf_threshold,
             iou=self.iou_threshold,
+            imgsz=self.resolution.imgsz,
             verbose=False
         )
+        return [extract_boxes([result]) for result in results]
+    
+    def detect_people_batch(self, frames, batch_size=8):
+        """
+        Run YOLOv8 detection on several frames, batch_size frames per forward pass
         
-        # Extract detections
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                # Get bounding box coordinates
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                confidence = float(box.conf[0])
-                
-                detections.append({
-                    'bbox': (int(x1), int(y1), int(x2), int(y2)),
-                    'confidence': confidence
-                })
+        Args:
+            frames: List of input frames (BGR format)
+            batch_size: Number of frames per model call
+            
+        Returns:
+            List of per-frame detection lists (same format as detect_people)
+        """
+        if self.tiler is not None:
+            # Each frame's tiles already make a batch
+            return [self.detect_people(frame) for frame in frames]
         
-        # Update FPS calculation
-        elapsed = time.time() - start_time
-        self.frame_times.append(elapsed)
-        if len(self.frame_times) > self.max_frame_times:
-            self.frame_times.pop(0)
+        all_detections = []
         
-        return detections
+        for i in range(0, len(frames), batch_size):
+            batch = frames[i:i + batch_size]
+            start_time = time.time()
+            
+            # Run inference on the whole batch (class 0 = person)
+            results = self.model(
+                batch,
+                classes=[0],
+                conf=self.conf_threshold,
+                iou=self.iou_threshold,
+                imgsz=self.resolution.imgsz,
+                verbose=False
+            )
+            
+            for result in results:
+                all_detections.append(bbox_dicts(*extract_boxes([result])))
+            
+            # Spread batch time over its frames for FPS calculation
+            per_frame = (time.time() - start_time) / len(batch)
+            self.frame_times.extend([per_frame] * len(batch))
+            del self.frame_times[:-self.max_frame_times]
+        
+        return all_detections
     
     def draw_detections(self, frame, detections):
         """
@@ -108,45 +207,18 @@ class RealtimeDetector:
             detections: List of detection dictionaries
             
         Returns:
-            annotated_frame: Frame with drawn detections
+            annotated_frame: Frame with drawn detections (reused buffer,
+            overwritten by the next annotated frame)
         """
-        annotated = frame.copy()
-        
-        for det in detections:
-            x1, y1, x2, y2 = det['bbox']
-            confidence = det['confidence']
-            
-            # Draw bounding box
-            color = (0, 255, 0)  # Green
-            thickness = 2
-            cv2.rectangle(annotated, (x1, y1), (x2, y2), color, thickness)
-            
-            # Draw label with confidence
-            label = f"Person {confidence:.2f}"
-            label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-            label_y = max(y1, label_size[1] + 10)
-            
-            # Draw label background
-            cv2.rectangle(
-                annotated,
-                (x1, label_y - label_size[1] - 10),
-                (x1 + label_size[0], label_y + 5),
-                color,
-                -1
-            )
-            
-            # Draw label text
-            cv2.putText(
-                annotated,
-                label,
-                (x1, label_y - 5),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                (0, 0, 0),
-                1
-            )
-        
-        return annotated
+        track_ids = None
+        if detections and 'track_id' in detections[0]:
+            track_ids = [det['track_id'] for det in detections]
+        return self.renderer.draw_detections(
+            frame,
+            [det['bbox'] for det in detections],
+            [det['confidence'] for det in detections],
+            track_ids
+        )
     
     def draw_cctv_overlay(self, frame, people_count):
         """
@@ -157,50 +229,61 @@ class RealtimeDetector:
             people_count: Number of people detected
             
         Returns:
-            frame_with_overlay: Frame with CCTV overlay
+            frame_with_overlay: Frame with CCTV overlay (reused buffer,
+            overwritten by the next annotated frame)
         """
-        overlay = frame.copy()
-        h, w = frame.shape[:2]
-        
-        # Semi-transparent black bar at top
-        cv2.rectangle(overlay, (0, 0), (w, 80), (0, 0, 0), -1)
-        frame = cv2.addWeighted(frame, 0.7, overlay, 0.3, 0)
-        
-        # Current timestamp
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Calculate FPS
-        current_fps = self.calculate_fps()
-        
-        # Draw text information
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        
-        # Timestamp (left)
-        cv2.putText(frame, f"CCTV - {timestamp}", (10, 30), 
-                   font, 0.6, (255, 255, 255), 2)
-        
-        # People count (center)
-        count_text = f"PEOPLE: {people_count}"
-        count_size = cv2.getTextSize(count_text, font, 0.8, 2)[0]
-        count_x = (w - count_size[0]) // 2
-        cv2.putText(frame, count_text, (count_x, 30), 
-                   font, 0.8, (0, 255, 0), 2)
-        
-        # FPS (right)
-        fps_text = f"FPS: {current_fps:.1f}"
-        fps_size = cv2.getTextSize(fps_text, font, 0.6, 2)[0]
-        fps_x = w - fps_size[0] - 10
-        cv2.putText(frame, fps_text, (fps_x, 30), 
-                   font, 0.6, (0, 255, 255), 2)
-        
-        # Device info (bottom of top bar)
         device_info = f"Device: {self.device.upper()} | Conf: {self.conf_threshold} | IoU: {self.iou_threshold}"
-        cv2.putText(frame, device_info, (10, 60), 
-                   font, 0.4, (200, 200, 200), 1)
-        
-        return frame
+        return self.renderer.draw_overlay(frame, people_count, self.calculate_fps(), device_info)
+    
+    def _read_frames(self, cap):
+        """Frames from cap until it ends"""
+        while cap.isOpened():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+    
+    def _pipelined(self, frames, pool):
+        """
+        Keep every worker busy: submit frames ahead and yield (frame, (boxes, confs))
+        in frame order as results come back; frames that time out are skipped
+        """
+        depth = pool.stats()['slots']
+        pending = deque()
+        last_output = time.time()
+        
+        def finish():
+            nonlocal last_output
+            frame, future = pending.popleft()
+            try:
+                detections = pool.wait(future)
+            except InferenceTimeout:
+                print("✗ Inference worker timed out, skipping frame")
+                return None
+            # Frames complete in parallel, so FPS and the latency the
+            # resolution controller sees are the output interval
+            now = time.time()
+            self.frame_times.append(now - last_output)
+            del self.frame_times[:-self.max_frame_times]
+            self.resolution.record(now - last_output)
+            last_output = now
+            return frame, detections
+        
+        for frame in frames:
+            # Waits for a free shared-memory slot rather than dropping frames
+            pending.append((frame, pool.submit(frame, self.conf_threshold, self.iou_threshold,
+                                               imgsz=self.resolution.imgsz, block=True)))
+            if len(pending) >= depth:
+                result = finish()
+                if result is not None:
+                    yield result
+        while pending:
+            result = finish()
+            if result is not None:
+                yield result
     
-    def process_video(self, source, output_path=None, display=True):
+    def process_video(self, source, output_path=None, display=True, detect_every=1, motion_gate=None,
+                      inference_workers=0):
         """
         Process video source with real-time detection
         
@@ -208,6 +291,10 @@ class RealtimeDetector:
             source: Video file path, webcam index (0), or None for default webcam
             output_path: Path to save annotated video (optional)
             display: Display video in window
+            detect_every: Run YOLO every N frames (or 'auto') and track boxes in between
+            motion_gate: Optional MotionGate; static frames reuse the last detections
+            inference_workers: Run detection in N worker processes fed through shared
+                memory, several frames in flight (0 = in-process)
         """
         # Open video source
         if source is None or source == 'webcam':
@@ -248,16 +335,55 @@ class RealtimeDetector:
         frame_count = 0
         total_people = 0
         
+        detect = self.detect_boxes
+        if motion_gate is not None:
+            detect = GatedDetector(self.detect_boxes, motion_gate)
+        
+        interval_detector = None
+        if detect_every != 1 or motion_gate is not None:
+            interval_detector = IntervalDetector(detect, interval=detect_every,
+                                                 target_fps=fps_original or 30.0)
+        
+        frames = ((frame, None) for frame in self._read_frames(cap))
+        pool = None
+        if inference_workers > 0:
+            if interval_detector is not None or self.tiler is not None:
+                # Tracking, gating and tiling depend on the previous frame or batch tiles
+                print("✗ --inference-workers runs full-frame detection only; using the in-process model")
+            else:
+                from inference_workers import InferenceWorkerPool
+                pool = InferenceWorkerPool(
+                    self.model_path,
+                    workers=inference_workers,
+                    backend=self.backend,
+                    quantize=self.quantize,
+                    device=self.device,
+                    # Some webcams report 0x0 until the first frame
+                    max_frame_bytes=max(width * height, 1920 * 1080) * 3
+                )
+                frames = self._pipelined(self._read_frames(cap), pool)
+        
         try:
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
+            for frame, pooled in frames:
                 frame_count += 1
                 
                 # Run detection
-                detections = self.detect_people(frame)
+                if pooled is not None:
+                    detections = bbox_dicts(*pooled)
+                elif interval_detector is not None:
+                    start_time = time.time()
+                    boxes, confs, track_ids, inferred = interval_detector.process(frame)
+                    if motion_gate is not None and inferred:
+                        inferred = detect.last_inferred
+                    if not inferred:
+                        # Tracked frames count toward FPS too
+                        self.frame_times.append(time.time() - start_time)
+                        del self.frame_times[:-self.max_frame_times]
+                    detections = bbox_dicts(boxes, confs)
+                    for det, track_id in zip(detections, track_ids.tolist()):
+                        det['track_id'] = track_id
+                else:
+                    detections = self.detect_people(frame)
                 people_count = len(detections)
                 total_people += people_count
                 
@@ -290,13 +416,16 @@ class RealtimeDetector:
                 if total_frames > 0 and frame_count % 30 == 0:
                     progress = (frame_count / total_frames) * 100
                     avg_people = total_people / frame_count
-                    print(f"Progress: {progress:.1f}% | Frame: {frame_count}/{total_frames} | Avg People: {avg_people:.1f}")
+                    print(f"Progress: {progress:.1f}% | Frame: {frame_count}/{total_frames} | "
+                          f"Avg People: {avg_people:.1f} | imgsz: {self.resolution.imgsz}")
         
         except KeyboardInterrupt:
             print("\n✓ Interrupted by user")
         
         finally:
             # Cleanup
+            if pool is not None:
+                pool.close()
             cap.release()
             if writer:
                 writer.release()
@@ -311,7 +440,62 @@ class RealtimeDetector:
             print(f"Total People Detected: {total_people}")
             if frame_count > 0:
                 print(f"Average People per Frame: {total_people/frame_count:.2f}")
+            if interval_detector is not None:
+                stats = interval_detector.stats()
+                print(f"Inferred Frames: {stats['inferred_frames']} | Tracked Frames: {stats['tracked_frames']}")
+            if pool is not None:
+                stats = pool.stats()
+                print(f"Inference Workers: {stats['workers']} | Avg Latency: {stats['average_latency'] * 1000:.1f} ms "
+                      f"| Timed Out: {stats['timeouts']}")
+            if motion_gate is not None:
+                stats = motion_gate.stats()
+                print(f"Motion Gate: {stats['inferred_frames']} inferred | {stats['skipped_frames']} skipped "
+                      f"({stats['skip_ratio'] * 100:.1f}%)")
             print(f"{'='*60}\n")
+    
+    def process_video_parallel(self, source, workers):
+        """
+        Analyze a video file across worker processes (no display or output video)
+        
+        Args:
+            source: Video file path
+            workers: Number of worker processes, each with its own model
+        """
+        from parallel_analysis import analyze_video_parallel
+        
+        print(f"\n{'='*60}")
+        print(f"Processing: {os.path.basename(source)}")
+        print(f"Workers: {workers}")
+        print(f"{'='*60}\n")
+        
+        start_time = time.time()
+        results = analyze_video_parallel(
+            source,
+            self.model_path,
+            conf_threshold=self.conf_threshold,
+            iou_threshold=self.iou_threshold,
+            workers=workers,
+            device=self.device,
+            backend=self.backend,
+            quantize=self.quantize
+        )
+        elapsed = time.time() - start_time
+        
+        frame_count = len(results)
+        total_people = sum(len(boxes) for _, boxes, _ in results)
+        
+        # Print summary
+        print(f"\n{'='*60}")
+        print("Detection Summary:")
+        print(f"{'='*60}")
+        print(f"Frames Processed: {frame_count}")
+        print(f"Total People Detected: {total_people}")
+        if frame_count > 0:
+            print(f"Average People per Frame: {total_people/frame_count:.2f}")
+            print(f"Throughput: {frame_count/elapsed:.1f} frames/s")
+        print(f"{'='*60}\n")
+        
+        return results
 
 
 def main():
@@ -336,6 +520,30 @@ Examples:
   # Adjust detection parameters
   python yolo_realtime_detection.py --source webcam --conf 0.6 --iou 0.5 --no-gpu
 
+  # Run YOLO every 3rd frame and track people in between
+  python yolo_realtime_detection.py --source video.mp4 --detect-every 3
+
+  # Skip inference while a fixed camera view is static
+  python yolo_realtime_detection.py --source video.mp4 --motion-gate
+
+  # Find small people in 4K crowd footage with 640px tiles
+  python yolo_realtime_detection.py --source crowd_4k.mp4 --tile-size 640 --tile-overlap 0.2
+
+  # Run on OpenVINO on a CPU-only node
+  python yolo_realtime_detection.py --source video.mp4 --backend openvino --no-gpu
+
+  # INT8 model calibrated on public/assets videos (built once, then cached)
+  python yolo_realtime_detection.py --source video.mp4 --quantize int8 --no-gpu
+
+  # Trade input resolution for speed to hold 15 FPS on a busy machine
+  python yolo_realtime_detection.py --source webcam --target-fps 15
+
+  # Analyze a video file on 8 worker processes
+  python yolo_realtime_detection.py --source video.mp4 --no-display --workers 8
+
+  # Display/save while 4 worker processes run detection (frames via shared memory)
+  python yolo_realtime_detection.py --source video.mp4 --inference-workers 4 --no-gpu
+
 Controls:
   q - Quit
   s - Save current frame
@@ -352,10 +560,36 @@ Controls:
                        help='Confidence threshold (default: 0.5)')
     parser.add_argument('--iou', type=float, default=0.45,
                        help='IoU threshold for NMS (default: 0.45)')
+    parser.add_argument('--backend', type=str, default='torch', choices=BACKENDS,
+                       help='Inference runtime; onnx/openvino are exported once and cached (default: torch)')
+    parser.add_argument('--quantize', type=str, default=None, choices=['int8'],
+                       help='Serve an INT8 ONNX model calibrated on public/assets frames (default: off)')
     parser.add_argument('--no-gpu', action='store_true',
                        help='Disable GPU even if available')
     parser.add_argument('--no-display', action='store_true',
                        help='Disable video display window')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Analyze video files in N parallel processes (requires --no-display)')
+    parser.add_argument('--inference-workers', type=int, default=0,
+                       help='Run detection in N worker processes fed through shared memory (default: 0 = in-process)')
+    parser.add_argument('--detect-every', type=parse_interval, default=1,
+                       help='Run YOLO every N frames and track in between, or "auto" (default: 1)')
+    parser.add_argument('--tile-size', type=int, default=None,
+                       help='Also detect on overlapping tiles of this size in pixels (default: off)')
+    parser.add_argument('--tile-overlap', type=float, default=0.2,
+                       help='Fraction of overlap between tiles (default: 0.2)')
+    parser.add_argument('--tile-crowd', type=int, default=0,
+                       help='Only tile where the full frame already has N people (default: 0 = everywhere)')
+    parser.add_argument('--target-fps', type=float, default=None,
+                       help='Lower/raise the model input size to hold this FPS (default: fixed size)')
+    parser.add_argument('--imgsz-levels', type=parse_levels, default=DEFAULT_LEVELS,
+                       help='Comma-separated input sizes for --target-fps (default: 320,416,512,640)')
+    parser.add_argument('--motion-gate', action='store_true',
+                       help='Skip inference on static frames and reuse the last detections')
+    parser.add_argument('--motion-threshold', type=float, default=0.01,
+                       help='Fraction of changed pixels that counts as motion (default: 0.01)')
+    parser.add_argument('--motion-refresh', type=int, default=30,
+                       help='Force inference after N skipped frames (default: 30)')
     
     args = parser.parse_args()
     
@@ -371,14 +605,32 @@ Controls:
         model_path=args.model,
         conf_threshold=args.conf,
         iou_threshold=args.iou,
-        use_gpu=not args.no_gpu
+        use_gpu=not args.no_gpu,
+        tile_size=args.tile_size,
+        tile_overlap=args.tile_overlap,
+        tile_crowd_threshold=args.tile_crowd,
+        target_fps=args.target_fps,
+        imgsz_levels=args.imgsz_levels,
+        backend=args.backend,
+        quantize=args.quantize
     )
     
+    # Parallel analysis only applies to files without display or output video
+    if args.workers > 1:
+        if isinstance(source, str) and args.no_display and not args.output:
+            detector.process_video_parallel(source, args.workers)
+            return
+        print("✗ --workers needs a video file, --no-display and no --output; running sequentially")
+    
     # Process video
     detector.process_video(
         source=source,
         output_path=args.output,
-        display=not args.no_display
+        display=not args.no_display,
+        detect_every=args.detect_every,
+        motion_gate=MotionGate(threshold=args.motion_threshold, refresh_interval=args.motion_refresh)
+        if args.motion_gate else None,
+        inference_workers=args.inference_workers
     )
 
 